@@ -0,0 +1,54 @@
+"""Measure per-request Basic auth overhead with and without the verified-credential cache.
+
+Usage: python benchmarks/auth_overhead.py [--requests N]
+
+Times verify_authorization() on its own and a full GET through the Flask
+test client, so the share of request latency spent in auth is visible.
+"""
+import argparse
+import base64
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+os.chdir(tempfile.mkdtemp())  # keep the scratch erp_system.db out of the repo
+
+import erp_system  # noqa: E402
+
+HEADER = 'Basic ' + base64.b64encode(b'admin:admin123').decode()
+
+
+def per_call_ms(func, count):
+    started = time.perf_counter()
+    for _ in range(count):
+        func()
+    return (time.perf_counter() - started) / count * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--requests', type=int, default=50)
+    args = parser.parse_args()
+
+    client = erp_system.app.test_client()
+    headers = {'Authorization': HEADER}
+    erp_system.auth_cache.clear()
+    cold = per_call_ms(lambda: erp_system.verify_authorization(HEADER, cache=None), args.requests)
+    warm = per_call_ms(lambda: erp_system.verify_authorization(HEADER), args.requests * 100)
+
+    def uncached_request():
+        erp_system.auth_cache.clear()
+        client.get('/api/stats/pool', headers=headers)
+
+    uncached = per_call_ms(uncached_request, args.requests)
+    cached = per_call_ms(lambda: client.get('/api/stats/pool', headers=headers), args.requests * 10)
+
+    print(f"{'':<26}{'no cache':>12}{'cache':>12}")
+    print(f"{'verify_authorization ms':<26}{cold:>12.3f}{warm:>12.4f}")
+    print(f"{'GET /api/stats/pool ms':<26}{uncached:>12.3f}{cached:>12.3f}")
+
+
+if __name__ == '__main__':
+    main()
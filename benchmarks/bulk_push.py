@@ -0,0 +1,65 @@
+"""Benchmark soap_api.push_orders against the local 4D stub with injected latency.
+
+Usage: python benchmarks/bulk_push.py [--records N] [--latency MS] [--workers 1,4,8,16]
+                                      [--customers N] [--customer-cache]
+
+Each record is one ws_wes_kunde_save followed by one ws_wes_order_save;
+workers=1 is the old strictly sequential flow. With --customers the
+records cycle through that many repeat customers, and --customer-cache
+lets FourDClient skip unchanged customers.
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+import soap_api  # noqa: E402
+from stub_4d_server import start_stub_server  # noqa: E402
+
+
+def make_records(count, customers=None):
+    for i in range(count):
+        c = i % customers if customers else i
+        yield {
+            'customer': dict(betrieb_id=1, kunde_vorname=f'Kunde{c}', kunde_nachname='Beispiel',
+                             kunde_email=f'kunde{c}@example.test', webshop_identification='Shopify'),
+            'order': dict(betrieb_id=1, order_date='2025-12-01', order_total=f'{10 + i % 90}.99'),
+        }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--records', type=int, default=200)
+    parser.add_argument('--latency', type=float, default=20.0, help='stub delay per request in ms')
+    parser.add_argument('--workers', default='1,4,8,16')
+    parser.add_argument('--fail-every', type=int, default=0, help='stub answers every n-th request with 503')
+    parser.add_argument('--customers', type=int, default=0, help='distinct customers (default: one per record)')
+    parser.add_argument('--customer-cache', action='store_true', help='use a fresh CustomerIdCache per run')
+    args = parser.parse_args()
+
+    server, url = start_stub_server(latency=args.latency / 1000, fail_every=args.fail_every)
+    baseline = None
+    for workers in [int(w) for w in args.workers.split(',')]:
+        cache = None
+        if args.customer_cache:
+            cache = soap_api.CustomerIdCache(os.path.join(tempfile.mkdtemp(), 'customers.db'))
+        client = soap_api.FourDClient(url, pool_size=workers, backoff=0.05, customer_cache=cache)
+        sent = len(server.received)
+        started = time.perf_counter()
+        results = soap_api.push_orders(make_records(args.records, args.customers), client,
+                                       max_workers=workers, busy_backoff=0.05)
+        elapsed = time.perf_counter() - started
+        client.close()
+        ok = sum(r['status'] == 'success' for r in results)
+        rate = args.records / elapsed
+        baseline = baseline or rate
+        print(f'workers={workers:>3}: {rate:8.1f} records/sec ({rate / baseline:5.1f}x)'
+              f'  {ok}/{len(results)} succeeded, {len(server.received) - sent} SOAP calls')
+    server.shutdown()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,63 @@
+"""Compare FourDClient against one-off requests.post calls on the local 4D stub.
+
+Usage: python benchmarks/fourd_client.py [--calls N] [--latency MS]
+
+The one-off variant mirrors the old soap_api.py script: a fresh connection
+and a hand-formatted envelope per call.
+"""
+import argparse
+import os
+import sys
+import time
+
+import requests
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+import soap_api  # noqa: E402
+from stub_4d_server import start_stub_server  # noqa: E402
+
+CUSTOMER = dict(betrieb_id=1, kunde_anrede='Herr', kunde_vorname='Alice', kunde_nachname='Beispiel',
+                kunde_firmenname='Example & Söhne GmbH', kunde_strasse_nr='Beispielweg 1', kunde_plz='12345',
+                kunde_ort='Musterstadt', kunde_land='Deutschland', kunde_land_iso='DE',
+                kunde_telefon='+49 111 2222', kunde_email='alice.beispiel@example.test',
+                webshop_identification='Shopify')
+
+
+def one_off_call(url):
+    body = ''.join(f'<{k}>{v}</{k}>' for k, v in CUSTOMER.items())
+    envelope = ('<SOAP-ENV:Envelope xmlns:SOAP-ENV="http://schemas.xmlsoap.org/soap/envelope/" '
+                'xmlns:tns="http://www.4d.com/namespace/default"><SOAP-ENV:Body><tns:ws_wes_kunde_save>'
+                f'{body}</tns:ws_wes_kunde_save></SOAP-ENV:Body></SOAP-ENV:Envelope>')
+    r = requests.post(url, data=envelope.encode('utf-8'), auth=soap_api.auth, timeout=30,
+                      headers={'Content-Type': 'text/xml; charset=utf-8',
+                               'SOAPAction': 'A_WebService#ws_wes_kunde_save'})
+    return r.text
+
+
+def calls_per_second(func, calls):
+    started = time.perf_counter()
+    for _ in range(calls):
+        func()
+    return calls / (time.perf_counter() - started)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--calls', type=int, default=500)
+    parser.add_argument('--latency', type=float, default=0.0, help='stub delay per request in ms')
+    args = parser.parse_args()
+
+    server, url = start_stub_server(latency=args.latency / 1000)
+    client = soap_api.FourDClient(url)
+    one_off = calls_per_second(lambda: one_off_call(url), args.calls)
+    pooled = calls_per_second(lambda: client.save_customer(**CUSTOMER), args.calls)
+    client.close()
+    server.shutdown()
+
+    print(f'one-off requests.post: {one_off:,.0f} calls/sec')
+    print(f'FourDClient (session): {pooled:,.0f} calls/sec ({pooled / one_off:.2f}x)')
+
+
+if __name__ == '__main__':
+    main()
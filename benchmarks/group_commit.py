@@ -0,0 +1,96 @@
+"""Measure create_order throughput and latency with group commit off and at several batch windows.
+
+Usage: python benchmarks/group_commit.py [--threads N] [--orders K] [--windows off,0,1,2,5] [--synchronous FULL]
+
+Each run uses a fresh database and N threads placing K orders in total
+against one product stocked with exactly K units, so every order must
+succeed. The run fails if stock or invoices do not add up. --synchronous
+FULL makes every commit fsync, which is the case group commit targets;
+the default NORMAL matches the server's WAL settings.
+"""
+import argparse
+import json
+import os
+import sqlite3
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+os.chdir(tempfile.mkdtemp())  # keep the scratch databases out of the repo
+
+import erp_system  # noqa: E402
+
+
+def run(label, window, args):
+    path = f'group_commit_{label}.db'
+    erp_system.configure_storage(path, batch_window=window, batch_size=args.batch_size)
+    erp_system.storage.set_max_connections(args.threads)
+    erp_system.init_db()
+    product_id = json.loads(erp_system.add_product('Hot SKU', 'HOT-1', 2.5, args.orders))['id']
+
+    per_thread = args.orders // args.threads
+    latencies, failures = [], []
+    start_gate = threading.Barrier(args.threads)
+
+    def worker():
+        mine = []
+        start_gate.wait()
+        for _ in range(per_thread):
+            started = time.perf_counter()
+            result = json.loads(erp_system.create_order(1, product_id, 1))
+            mine.append(time.perf_counter() - started)
+            if result['status'] != 'success' or result['total'] != 2.5:
+                failures.append(result)
+        latencies.extend(mine)
+
+    threads = [threading.Thread(target=worker) for _ in range(args.threads)]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+    batcher = erp_system.storage.default.write_batcher
+    batches = batcher.stats()['batches'] if batcher is not None else None
+    erp_system.storage.close_all()
+
+    conn = sqlite3.connect(path)
+    stock = conn.execute('SELECT stock FROM products WHERE id = ?', (product_id,)).fetchone()[0]
+    orders = conn.execute('SELECT COUNT(*) FROM orders').fetchone()[0]
+    invoiced = conn.execute('SELECT COUNT(*) FROM invoices').fetchone()[0]
+    conn.close()
+    placed = per_thread * args.threads
+    assert not failures, failures[:5]
+    assert orders == invoiced == placed and stock == args.orders - placed, (orders, invoiced, stock)
+
+    latencies.sort()
+    p50, p99 = latencies[len(latencies) // 2], latencies[int(len(latencies) * 0.99)]
+    batch = f'{placed / batches:6.1f}' if batches else '     -'
+    print(f'{label:>7s} {placed / elapsed:10,.0f} {p50 * 1000:8.2f} {p99 * 1000:8.2f} {batch}')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--threads', type=int, default=32)
+    parser.add_argument('--orders', type=int, default=6400)
+    parser.add_argument('--windows', default='off,0,1,2,5,10',
+                        help='comma-separated batch windows in ms; "off" commits every order on its own')
+    parser.add_argument('--batch-size', type=int, default=erp_system.WRITE_BATCH_SIZE)
+    parser.add_argument('--synchronous', default='NORMAL', choices=('NORMAL', 'FULL'))
+    args = parser.parse_args()
+
+    erp_system.ConnectionPool.PRAGMAS = tuple(
+        f'PRAGMA synchronous={args.synchronous}' if pragma.startswith('PRAGMA synchronous') else pragma
+        for pragma in erp_system.ConnectionPool.PRAGMAS)
+
+    print(f'threads={args.threads} orders={args.orders} synchronous={args.synchronous}')
+    print(f'{"window":>7s} {"orders/s":>10s} {"p50 ms":>8s} {"p99 ms":>8s} {"batch":>6s}')
+    for label in args.windows.split(','):
+        label = label.strip()
+        run(label if label == 'off' else f'{label}ms', None if label == 'off' else float(label) / 1000, args)
+
+
+if __name__ == '__main__':
+    main()
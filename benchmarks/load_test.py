@@ -0,0 +1,138 @@
+"""Load-test erp_system.py in dev and production serving modes.
+
+Usage: python benchmarks/load_test.py [--modes dev,production] [--clients N] [--duration S] [--workers N] [--threads N]
+
+Each mode is started as a subprocess on a fresh database, seeded through the
+REST API, and then driven by --clients keep-alive clients issuing a mix of
+REST list, single-product, order and SOAP requests. Reports RPS and
+p50/p99 latency per mode. Non-200 responses and SOAP faults count as
+errors. Production mode needs gunicorn installed.
+"""
+import argparse
+import base64
+import os
+import signal
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+import requests
+
+ERP_SYSTEM = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'erp_system.py')
+AUTH = ('admin', 'admin123')
+SOAP_HEADERS = {'Content-Type': 'text/xml; charset=utf-8',
+                'Authorization': 'Basic ' + base64.b64encode(b'admin:admin123').decode()}
+SOAP_GET_PRODUCTS = ('<soap:Envelope xmlns:soap="http://schemas.xmlsoap.org/soap/envelope/"><soap:Body>'
+                     '<GetProducts xmlns="http://erpsystem.local/soap"><limit>50</limit></GetProducts>'
+                     '</soap:Body></soap:Envelope>')
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def start_server(mode, port, workers, threads):
+    args = [sys.executable, os.path.abspath(ERP_SYSTEM), '--port', str(port)]
+    if mode == 'production':
+        args += ['--production', '--workers', str(workers), '--threads', str(threads)]
+    proc = subprocess.Popen(args, cwd=tempfile.mkdtemp(), stdout=subprocess.DEVNULL,
+                            stderr=subprocess.DEVNULL, start_new_session=True)
+    base = f'http://127.0.0.1:{port}'
+    for _ in range(200):
+        try:
+            requests.get(f'{base}/login', timeout=1)
+            return proc, base
+        except requests.ConnectionError:
+            time.sleep(0.05)
+    stop_server(proc)
+    raise RuntimeError(f'{mode} server did not start')
+
+
+def stop_server(proc):
+    # the dev server's reloader runs the app in a child process
+    os.killpg(proc.pid, signal.SIGTERM)
+    proc.wait()
+
+
+def seed(base):
+    session = requests.Session()
+    session.auth = AUTH
+    customers = session.post(f'{base}/api/customers/batch', json=[
+        {'name': f'Customer {i}', 'email': f'c{i}@example.test', 'phone': '555-0100'} for i in range(50)]).json()
+    products = session.post(f'{base}/api/products/batch', json=[
+        {'name': f'Product {i}', 'sku': f'SKU-{i}', 'price': 10 + i, 'stock': 1_000_000} for i in range(50)]).json()
+    return ([r['id'] for r in customers['results']], [r['id'] for r in products['results']])
+
+
+def client(base, customer_ids, product_ids, deadline, latencies, errors):
+    session = requests.Session()
+    session.auth = AUTH
+    i = 0
+    while time.perf_counter() < deadline:
+        kind = i % 10
+        started = time.perf_counter()
+        try:
+            if kind < 4:
+                r = session.get(f'{base}/api/products', params={'limit': 50})
+            elif kind < 6:
+                r = session.get(f'{base}/api/products/{product_ids[i % len(product_ids)]}')
+            elif kind < 7:
+                r = session.get(f'{base}/api/customers', params={'limit': 50})
+            elif kind < 8:
+                r = session.post(f'{base}/api/orders', json={'customer_id': customer_ids[i % len(customer_ids)],
+                                                             'product_id': product_ids[i % len(product_ids)],
+                                                             'quantity': 1})
+            else:
+                r = session.post(f'{base}/soap', data=SOAP_GET_PRODUCTS, headers=SOAP_HEADERS)
+            if r.status_code != 200:
+                errors.append(r.status_code)
+            elif b'soap:Fault' in r.content:
+                errors.append('soap:Fault')
+        except requests.RequestException as e:
+            errors.append(type(e).__name__)
+        latencies.append(time.perf_counter() - started)
+        i += 1
+
+
+def run(mode, clients, duration, workers, threads):
+    proc, base = start_server(mode, free_port(), workers, threads)
+    try:
+        customer_ids, product_ids = seed(base)
+        latencies, errors = [], []
+        deadline = time.perf_counter() + duration
+        workers = [threading.Thread(target=client, args=(base, customer_ids, product_ids, deadline,
+                                                          latencies, errors)) for _ in range(clients)]
+        started = time.perf_counter()
+        for w in workers:
+            w.start()
+        for w in workers:
+            w.join()
+        elapsed = time.perf_counter() - started
+    finally:
+        stop_server(proc)
+
+    quantiles = statistics.quantiles(latencies, n=100)
+    print(f'{mode:>10}: {len(latencies) / elapsed:8.1f} req/s  p50 {quantiles[49] * 1000:7.2f} ms  '
+          f'p99 {quantiles[98] * 1000:7.2f} ms  errors {len(errors)}')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--modes', default='dev,production')
+    parser.add_argument('--clients', type=int, default=16)
+    parser.add_argument('--duration', type=float, default=10.0)
+    parser.add_argument('--workers', type=int, default=2, help='server processes in production mode')
+    parser.add_argument('--threads', type=int, default=8, help='request slots per worker in production mode')
+    args = parser.parse_args()
+    for mode in args.modes.split(','):
+        run(mode, args.clients, args.duration, args.workers, args.threads)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,72 @@
+"""Stress create_order with many threads ordering the same product.
+
+Usage: python benchmarks/order_contention.py [--threads N] [--stock S]
+
+Every thread orders one unit at a time until the product is sold out. The
+run fails if stock goes negative, more units are sold than were stocked, or
+an order is missing its invoice. It then prints the order throughput.
+"""
+import argparse
+import json
+import os
+import sqlite3
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+os.chdir(tempfile.mkdtemp())  # keep the scratch erp_system.db out of the repo
+
+import erp_system  # noqa: E402
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--threads', type=int, default=32)
+    parser.add_argument('--stock', type=int, default=5000)
+    args = parser.parse_args()
+
+    erp_system.init_db()
+    product_id = json.loads(erp_system.add_product('Hot SKU', 'HOT-1', 9.99, args.stock))['id']
+    sold, failures = [0] * args.threads, []
+    start_gate = threading.Barrier(args.threads)
+
+    def worker(slot):
+        start_gate.wait()
+        while True:
+            result = json.loads(erp_system.create_order(1, product_id, 1))
+            if result['status'] == 'success':
+                sold[slot] += 1
+            elif result['message'] == 'Insufficient stock':
+                return
+            else:
+                failures.append(result['message'])
+                return
+
+    threads = [threading.Thread(target=worker, args=(slot,)) for slot in range(args.threads)]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+
+    conn = sqlite3.connect(erp_system.DB_PATH)
+    stock = conn.execute('SELECT stock FROM products WHERE id = ?', (product_id,)).fetchone()[0]
+    orders = conn.execute('SELECT COUNT(*) FROM orders WHERE product_id = ?', (product_id,)).fetchone()[0]
+    invoiced = conn.execute('SELECT COUNT(*) FROM invoices JOIN orders ON orders.id = invoices.order_id '
+                            'WHERE orders.product_id = ?', (product_id,)).fetchone()[0]
+    conn.close()
+
+    assert not failures, failures[:5]
+    assert stock == 0, f'stock ended at {stock}'
+    assert sum(sold) == orders == args.stock, f'sold {sum(sold)}, {orders} orders for {args.stock} units'
+    assert invoiced == orders, f'{orders - invoiced} orders without an invoice'
+
+    print(f'threads={args.threads} orders={orders} elapsed={elapsed:.2f}s '
+          f'orders/sec={orders / elapsed:,.0f} pool={erp_system.repository.stats()}')
+
+
+if __name__ == '__main__':
+    main()
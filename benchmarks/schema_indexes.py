@@ -0,0 +1,103 @@
+"""Time common lookups before and after the index/timestamp migrations.
+
+Usage: python benchmarks/schema_indexes.py [--orders N] [--repeat R]
+
+Seeds a scratch database at schema version 1 (tables only), times each
+query, applies the remaining migrations and times the same lookups again.
+"""
+import argparse
+import os
+import random
+import sqlite3
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+os.chdir(tempfile.mkdtemp())  # keep the scratch databases out of the repo
+
+import erp_system  # noqa: E402
+
+STATUSES = ('pending', 'paid', 'shipped', 'cancelled')
+EPOCH = datetime(2024, 1, 1)
+
+
+def seed(conn, orders, customers, products):
+    def stamp(i, total):
+        return (EPOCH + timedelta(seconds=i * 365 * 86400 // total)).isoformat()
+
+    conn.executemany('INSERT INTO customers (name, email, phone, created_at) VALUES (?, ?, ?, ?)',
+                     ((f'Customer {i}', f'c{i}@example.test', '+49 111', stamp(i, customers))
+                      for i in range(customers)))
+    conn.executemany('INSERT INTO products (name, sku, price, stock, created_at) VALUES (?, ?, ?, ?, ?)',
+                     ((f'Product {i}', f'SKU-{i:07d}', 9.99, 1000, stamp(i, products)) for i in range(products)))
+    conn.executemany('INSERT INTO orders (customer_id, product_id, quantity, total_price, status, created_at) '
+                     'VALUES (?, ?, ?, ?, ?, ?)',
+                     ((random.randint(1, customers), random.randint(1, products), 1, 9.99,
+                       STATUSES[i % len(STATUSES)], stamp(i, orders)) for i in range(orders)))
+    conn.executemany('INSERT INTO invoices (order_id, amount, status, created_at) VALUES (?, ?, ?, ?)',
+                     ((i, 9.99, 'pending', stamp(i, orders)) for i in range(1, orders + 1)))
+    conn.commit()
+
+
+def queries(args, migrated):
+    day = random.randint(0, 360)
+    start = EPOCH + timedelta(days=day)
+    end = start + timedelta(days=1)
+    if migrated:
+        date_range = ('SELECT COUNT(*) FROM orders WHERE status = ? AND created_ts >= ? AND created_ts < ?',
+                      ('paid', int(start.timestamp() * 1000), int(end.timestamp() * 1000)))
+    else:
+        date_range = ('SELECT COUNT(*) FROM orders WHERE status = ? AND created_at >= ? AND created_at < ?',
+                      ('paid', start.isoformat(), end.isoformat()))
+    return {
+        'product by sku': ('SELECT id FROM products WHERE sku = ?',
+                           (f'SKU-{random.randrange(args.products):07d}',)),
+        'orders by customer': ('SELECT COUNT(*) FROM orders WHERE customer_id = ?',
+                               (random.randint(1, args.customers),)),
+        'orders by product': ('SELECT COUNT(*) FROM orders WHERE product_id = ?',
+                              (random.randint(1, args.products),)),
+        'orders by status+day': date_range,
+        'invoice by order': ('SELECT id FROM invoices WHERE order_id = ?', (random.randint(1, args.orders),)),
+    }
+
+
+def time_queries(conn, args, migrated):
+    totals = {}
+    for _ in range(args.repeat):
+        for name, (sql, params) in queries(args, migrated).items():
+            started = time.perf_counter()
+            conn.execute(sql, params).fetchall()
+            totals[name] = totals.get(name, 0.0) + time.perf_counter() - started
+    return {name: total / args.repeat * 1000 for name, total in totals.items()}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--orders', type=int, default=1_000_000)
+    parser.add_argument('--customers', type=int, default=50_000)
+    parser.add_argument('--products', type=int, default=5_000)
+    parser.add_argument('--repeat', type=int, default=20)
+    args = parser.parse_args()
+
+    conn = sqlite3.connect('schema_bench.db')
+    erp_system.migrate(conn, target=1)
+    started = time.perf_counter()
+    seed(conn, args.orders, args.customers, args.products)
+    print(f'seeded {args.orders:,} orders in {time.perf_counter() - started:.1f}s')
+
+    before = time_queries(conn, args, migrated=False)
+    started = time.perf_counter()
+    version = erp_system.migrate(conn)
+    print(f'migrated to version {version} in {time.perf_counter() - started:.1f}s')
+    after = time_queries(conn, args, migrated=True)
+    conn.close()
+
+    print(f"{'query':<24}{'before ms':>12}{'after ms':>12}{'speedup':>10}")
+    for name in before:
+        print(f'{name:<24}{before[name]:>12.3f}{after[name]:>12.3f}{before[name] / after[name]:>9.0f}x')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,75 @@
+"""Seed a scratch erp_system database with a reproducible data set.
+
+Usage: python benchmarks/seed_data.py DB_PATH [--customers N] [--products N] [--orders N] [--seed S]
+
+Rows are generated from a fixed random seed and bulk-inserted in one
+transaction after the schema is migrated, so the same arguments always
+produce the same database.
+"""
+import argparse
+import os
+import random
+import sqlite3
+import sys
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+import erp_system  # noqa: E402
+
+STATUSES = ('pending', 'paid', 'shipped', 'cancelled')
+EPOCH = datetime(2024, 1, 1)
+STOCK = 1_000_000_000  # large enough that benchmarks never run out
+
+
+def _stamps(i, total):
+    moment = EPOCH + timedelta(seconds=i * 365 * 86400 // max(total, 1))
+    return moment.isoformat(), int(moment.timestamp() * 1000)
+
+
+def seed(db_path, customers=1_000, products=200, orders=5_000, seed=42):
+    """Create ``db_path`` at the current schema version and fill it; returns the row counts."""
+    rng = random.Random(seed)
+    conn = sqlite3.connect(db_path)
+    erp_system.migrate(conn)
+    conn.execute('BEGIN')
+    conn.executemany('INSERT INTO customers (name, email, phone, created_at, created_ts) VALUES (?, ?, ?, ?, ?)',
+                     ((f'Customer {i}', f'customer{i}@example.test', f'+49 {rng.randrange(10**9):09d}',
+                       *_stamps(i, customers)) for i in range(customers)))
+    prices = [round(rng.uniform(1, 500), 2) for _ in range(products)]
+    conn.executemany('INSERT INTO products (name, sku, price, stock, created_at, created_ts) VALUES (?, ?, ?, ?, ?, ?)',
+                     ((f'Product {i}', f'SKU-{i:07d}', prices[i], STOCK, *_stamps(i, products))
+                      for i in range(products)))
+    order_rows = []
+    for i in range(orders):
+        product = rng.randrange(products)
+        quantity = rng.randint(1, 5)
+        order_rows.append((rng.randint(1, customers), product + 1, quantity, round(prices[product] * quantity, 2),
+                           STATUSES[i % len(STATUSES)], *_stamps(i, orders)))
+    conn.executemany('INSERT INTO orders (customer_id, product_id, quantity, total_price, status, created_at, '
+                     'created_ts) VALUES (?, ?, ?, ?, ?, ?, ?)', order_rows)
+    conn.executemany('INSERT INTO invoices (order_id, amount, status, created_at, created_ts) VALUES (?, ?, ?, ?, ?)',
+                     ((i + 1, row[3], 'pending', row[5], row[6]) for i, row in enumerate(order_rows)))
+    conn.commit()
+    conn.close()
+    return {'customers': customers, 'products': products, 'orders': orders}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('db_path')
+    parser.add_argument('--customers', type=int, default=1_000)
+    parser.add_argument('--products', type=int, default=200)
+    parser.add_argument('--orders', type=int, default=5_000)
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+    if os.path.exists(args.db_path):
+        parser.error(f'{args.db_path} already exists')
+    started = time.perf_counter()
+    counts = seed(args.db_path, args.customers, args.products, args.orders, args.seed)
+    print(f'seeded {counts} into {args.db_path} in {time.perf_counter() - started:.1f}s')
+
+
+if __name__ == '__main__':
+    main()
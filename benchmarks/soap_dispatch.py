@@ -0,0 +1,98 @@
+"""Compare the SOAP operation dispatcher against the old substring/find chain.
+
+Usage: python benchmarks/soap_dispatch.py [--header-size N] [--seconds S]
+
+Only request parsing and operation selection are timed; no database work is
+done, so the numbers show the dispatch overhead per request.
+"""
+import argparse
+import os
+import sys
+import time
+import xml.etree.ElementTree as ET
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+import erp_system  # noqa: E402
+
+NS = '{http://erpsystem.local/soap}'
+
+
+def legacy_dispatch(body):
+    """The pre-dispatcher chain: decode, substring checks, full-tree find per field."""
+    soap_request = body.decode('utf-8')
+    if 'AddCustomer' in soap_request:
+        root = ET.fromstring(soap_request)
+        return 'AddCustomer', (root.find('.//' + NS + 'name').text,
+                               root.find('.//' + NS + 'email').text,
+                               root.find('.//' + NS + 'phone').text)
+    elif 'GetCustomers' in soap_request:
+        return 'GetCustomers', ()
+    elif 'AddProduct' in soap_request:
+        root = ET.fromstring(soap_request)
+        return 'AddProduct', (root.find('.//' + NS + 'name').text,
+                              root.find('.//' + NS + 'sku').text,
+                              float(root.find('.//' + NS + 'price').text),
+                              int(root.find('.//' + NS + 'stock').text))
+    elif 'GetProducts' in soap_request:
+        return 'GetProducts', ()
+    elif 'CreateOrder' in soap_request:
+        root = ET.fromstring(soap_request)
+        return 'CreateOrder', (int(root.find('.//' + NS + 'customer_id').text),
+                               int(root.find('.//' + NS + 'product_id').text),
+                               int(root.find('.//' + NS + 'quantity').text))
+    elif 'GetOrders' in soap_request:
+        return 'GetOrders', ()
+    return None, ()
+
+
+def dispatcher(body):
+    operation, params = erp_system.parse_soap_request(body)
+    return erp_system.SOAP_OPERATIONS[operation], params
+
+
+def envelope(operation, fields, header=''):
+    parts = ''.join(f'<erp:{k}>{v}</erp:{k}>' for k, v in fields)
+    return (f'<?xml version="1.0" encoding="UTF-8"?>'
+            f'<soapenv:Envelope xmlns:soapenv="http://schemas.xmlsoap.org/soap/envelope/" '
+            f'xmlns:erp="http://erpsystem.local/soap">'
+            f'<soapenv:Header>{header}</soapenv:Header>'
+            f'<soapenv:Body><erp:{operation}>{parts}</erp:{operation}></soapenv:Body>'
+            f'</soapenv:Envelope>').encode('utf-8')
+
+
+def requests_per_second(func, body, seconds):
+    count, deadline = 0, time.perf_counter() + seconds
+    start = time.perf_counter()
+    while time.perf_counter() < deadline:
+        for _ in range(100):
+            func(body)
+        count += 100
+    return count / (time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--header-size', type=int, default=200,
+                        help='number of filler elements in soap:Header for the large case')
+    parser.add_argument('--seconds', type=float, default=1.0)
+    args = parser.parse_args()
+
+    filler = ''.join(f'<erp:meta>{i}</erp:meta>' for i in range(args.header_size))
+    cases = {
+        'AddCustomer': envelope('AddCustomer', [('name', 'Alice'), ('email', 'a@example.test'), ('phone', '1')]),
+        'CreateOrder': envelope('CreateOrder', [('customer_id', 1), ('product_id', 2), ('quantity', 3)]),
+        'GetOrders': envelope('GetOrders', [('limit', 100)]),
+        'CreateOrder+header': envelope('CreateOrder', [('customer_id', 1), ('product_id', 2), ('quantity', 3)],
+                                       filler),
+    }
+
+    print(f"{'case':<22}{'legacy req/s':>16}{'dispatcher req/s':>20}{'speedup':>10}")
+    for name, body in cases.items():
+        legacy = requests_per_second(legacy_dispatch, body, args.seconds)
+        current = requests_per_second(dispatcher, body, args.seconds)
+        print(f'{name:<22}{legacy:>16,.0f}{current:>20,.0f}{current / legacy:>9.2f}x')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,70 @@
+"""Benchmark FourDClient's streaming response parser on large synthetic 4D responses.
+
+Usage: python benchmarks/soap_response_parse.py [--calls N] [--items 1000,10000,100000]
+
+Compares the old approach (read the whole body, ET.fromstring, search for
+kunde_id) with FourDClient.save_customer, which parses the streamed body
+incrementally and stops once kunde_id is found. Responses carry an
+optional_data array of --items entries placed after kunde_id (early stop
+possible) or before it (full parse, but still streamed). Peak memory is
+measured with tracemalloc and includes the in-process stub's allocations.
+"""
+import argparse
+import os
+import sys
+import time
+import tracemalloc
+from xml.etree import ElementTree as ET
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+import soap_api  # noqa: E402
+from stub_4d_server import start_stub_server  # noqa: E402
+
+CUSTOMER = dict(betrieb_id=1, kunde_vorname='Alice', kunde_nachname='Beispiel',
+                kunde_email='alice@example.test', webshop_identification='Shopify')
+
+
+def whole_body(client):
+    response = client.session.post(client.endpoint, data=soap_api.KUNDE_SAVE.render(CUSTOMER),
+                                   timeout=client.timeout,
+                                   headers={'Content-Type': 'text/xml; charset=utf-8',
+                                            'SOAPAction': soap_api.KUNDE_SAVE.soap_action})
+    root = ET.fromstring(response.text)
+    return int(root.find('.//kunde_id').text)
+
+
+def measure(func, calls):
+    started = time.perf_counter()
+    for _ in range(calls):
+        func()
+    elapsed = time.perf_counter() - started
+    tracemalloc.start()
+    func()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return elapsed / calls * 1000, peak / 1024
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--calls', type=int, default=20)
+    parser.add_argument('--items', default='1000,10000,100000')
+    args = parser.parse_args()
+
+    for pad_before in (False, True):
+        for items in [int(n) for n in args.items.split(',')]:
+            server, url = start_stub_server(padding=items, pad_before=pad_before)
+            with soap_api.FourDClient(url) as client:
+                size = items * len('<item>x</item>')
+                old_ms, old_kb = measure(lambda: whole_body(client), args.calls)
+                new_ms, new_kb = measure(lambda: client.save_customer(**CUSTOMER), args.calls)
+            server.shutdown()
+            where = 'before' if pad_before else 'after'
+            print(f'{items:>7} items {where:>6} kunde_id (~{size / 1024:,.0f} KiB): '
+                  f'whole body {old_ms:7.2f} ms, {old_kb:8,.0f} KiB peak | '
+                  f'streaming {new_ms:7.2f} ms, {new_kb:8,.0f} KiB peak ({old_ms / new_ms:.1f}x)')
+
+
+if __name__ == '__main__':
+    main()
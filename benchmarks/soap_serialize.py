@@ -0,0 +1,67 @@
+"""Compare precompiled SOAP response templates against the old f-string envelopes.
+
+Usage: python benchmarks/soap_serialize.py [--seconds S]
+
+Each case serializes a GetCustomers-style JSON payload of the given row
+count into a complete response body (bytes, as sent on the wire) and
+reports the output throughput in MB/s.
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+import erp_system  # noqa: E402
+
+
+def legacy_envelope(result):
+    """The pre-template response: indented f-string, no escaping, encoded by Flask."""
+    response = f'''<?xml version="1.0" encoding="UTF-8"?>
+        <soap:Envelope xmlns:soap="http://schemas.xmlsoap.org/soap/envelope/">
+            <soap:Body>
+                <GetCustomersResponse xmlns="http://erpsystem.local/soap">
+                    <customers>{result}</customers>
+                </GetCustomersResponse>
+            </soap:Body>
+        </soap:Envelope>'''
+    return response.encode('utf-8')
+
+
+def template_envelope(result):
+    return erp_system.SOAP_TEMPLATES['GetCustomers'].render(result)
+
+
+def payload(rows, special):
+    name = 'Smith & Sons <GmbH>' if special else 'Smith and Sons GmbH'
+    return json.dumps([{'id': i, 'name': name, 'email': f'c{i}@example.test', 'phone': '+49 111'}
+                       for i in range(rows)])
+
+
+def megabytes_per_second(func, result, seconds):
+    produced, deadline = 0, time.perf_counter() + seconds
+    start = time.perf_counter()
+    while time.perf_counter() < deadline:
+        produced += len(func(result))
+    return produced / (time.perf_counter() - start) / 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--seconds', type=float, default=1.0)
+    args = parser.parse_args()
+
+    print(f"{'rows':>8}{'escaping':>10}{'legacy MB/s':>14}{'template MB/s':>16}")
+    for rows in (1, 100, 10000):
+        for special in (False, True):
+            result = payload(rows, special)
+            legacy = megabytes_per_second(legacy_envelope, result, args.seconds)
+            current = megabytes_per_second(template_envelope, result, args.seconds)
+            print(f"{rows:>8}{'yes' if special else 'no':>10}{legacy:>14,.1f}{current:>16,.1f}")
+    print('legacy output is not escaped; rows with "&" or "<" produce invalid XML')
+
+
+if __name__ == '__main__':
+    main()
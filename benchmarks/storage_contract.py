@@ -0,0 +1,143 @@
+"""Run the repository contract against the SQLite backend and, given a DSN, the PostgreSQL backend.
+
+Usage: python benchmarks/storage_contract.py [--postgres-dsn DSN | --embedded-postgres] [--rows N]
+
+Every backend gets a fresh shard and the same checks: insert ids, atomic
+stock reservation and its rejections, partially accepted order batches,
+keyset pages and filters, streamed reads, product lookups, the change log
+and its compaction, the tenant summary and shard discovery. It then times a streamed read of
+all orders. Point --postgres-dsn at a scratch database (a local server or a
+throwaway container), or pass --embedded-postgres to start a private server
+with pgserver (``pip install pgserver``); the checks create and drop their
+own schemas.
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+os.chdir(tempfile.mkdtemp())  # keep the scratch shard files out of the repo
+
+import erp_system  # noqa: E402
+
+ORDER_COLUMNS = erp_system.LIST_COLUMNS['orders']
+PRODUCT_COLUMNS = erp_system.LIST_COLUMNS['products']
+
+
+def check_contract(repo, rows):
+    assert repo.migrate() == repo.migrate(), 'migrate is not idempotent'
+
+    customer_ids = repo.insert('customers', [(f'C{i}', f'c{i}@example.com', '1', '2024-01-01T00:00:00', 1000 + i)
+                                             for i in range(3)])
+    assert customer_ids == sorted(customer_ids) and len(set(customer_ids)) == 3, customer_ids
+    assert repo.insert('customers', []) == []
+    first, second = repo.insert('products', [('P1', 'SKU-1', 2.5, 10, '2024-01-01T00:00:00', 1000),
+                                             ('P2', 'SKU-2', 4.0, 1, '2024-01-02T00:00:00', 2000)])
+    (lone,) = repo.insert('products', [('P3', 'SKU-3', 1.0, 0, '2024-01-03T00:00:00', 3000)])
+    assert first < second < lone
+
+    order_id, total, stock = repo.place_order(customer_ids[0], first, 4, '2024-01-05T00:00:00', 5000)
+    assert (total, stock) == (10.0, 6), (total, stock)
+    for product_id, message in ((lone, 'Insufficient stock'), (10 ** 9, 'Product not found')):
+        try:
+            repo.place_order(customer_ids[0], product_id, 1, '2024-01-05T00:00:00', 5000)
+        except erp_system.OrderRejected as e:
+            assert str(e) == message, e
+        else:
+            raise AssertionError(f'order for {message!r} was accepted')
+
+    results, rejected, stocks = repo.place_orders(
+        [(0, (customer_ids[1], first, 1)), (1, (customer_ids[1], second, 2)), (2, (customer_ids[1], 10 ** 9, 1)),
+         (3, (customer_ids[2], second, 1))], '2024-01-06T00:00:00', 6000)
+    assert set(results) == {0, 3} and results[0]['total'] == 2.5 and results[3]['total'] == 4.0, results
+    assert rejected == {1: 'Insufficient stock', 2: 'Product not found'}, rejected
+    assert stocks == {first: 5, second: 0}, stocks
+    assert results[0]['id'] > order_id and results[3]['id'] > results[0]['id']
+
+    page = repo.list_page('orders', ORDER_COLUMNS, 2)
+    assert [row['id'] for row in page] == [order_id, results[0]['id']], page
+    assert repo.list_page('orders', ORDER_COLUMNS, 10, after_id=page[-1]['id'])[0]['id'] == results[3]['id']
+    assert len(repo.list_page('orders', ('id', 'status'), 10, status='pending', created_from=6000)) == 2
+    assert repo.list_page('orders', ORDER_COLUMNS, 10, created_to=5000) == []
+    assert repo.list_page('products', PRODUCT_COLUMNS, 10)[0] == {
+        'id': first, 'name': 'P1', 'sku': 'SKU-1', 'price': 2.5, 'stock': 5, }
+    assert [row['id'] for row in repo.iter_rows('orders', ('id',), 2)] == [order_id, results[0]['id'],
+                                                                           results[3]['id']]
+
+    assert repo.get_product(sku='SKU-2')['id'] == second
+    assert repo.get_product(first)['stock'] == 5
+    assert repo.get_product(10 ** 9) is None
+
+    token, changed, changes = repo.changes_since(0, ['products', 'orders'], 100)
+    assert changed == 6 and [row['id'] for row in changes['products']] == [lone, first, second], changes
+    assert repo.changes_since(token, ['products'], 100)[1:] == (0, {'products': []})
+    deleted, min_since = repo.compact_changes(1)
+    assert deleted > 0 and min_since > 0, (deleted, min_since)
+    try:
+        repo.changes_since(0, ['products'], 100)
+    except erp_system.ChangeTokenExpired as e:
+        assert e.min_since == min_since, e
+    else:
+        raise AssertionError('an expired change token was accepted')
+    assert repo.changes_since(min_since, list(erp_system.CHANGE_TABLES), 100)[1] >= 1
+    assert repo.compact_changes(100) == (0, min_since)
+
+    summary = repo.summary()
+    assert (summary['customers'], summary['products'], summary['orders']) == (3, 3, 3), summary
+    assert summary['revenue'] == 16.5 and summary['by_status']['pending']['orders'] == 3, summary
+    assert repo.summary(created_from=6000)['orders'] == 2
+
+    ids, rejected = repo.insert_products([(0, ('P1b', 'SKU-1', 1.0, 1, '2024-01-04T00:00:00', 4000)),
+                                          (1, ('P4', 'SKU-4', 1.0, 1, '2024-01-04T00:00:00', 4000)),
+                                          (2, ('P4b', 'SKU-4', 1.0, 1, '2024-01-04T00:00:00', 4000))])
+    assert list(ids) == [1] and ids[1] > lone, ids
+    assert rejected == {0: 'SKU already exists: SKU-1', 2: 'SKU already exists: SKU-4'}, rejected
+
+    stream_ids = repo.insert('orders', [(customer_ids[0], first, 1, 1.0, 'paid', '2024-01-07T00:00:00', 7000)
+                                        for _ in range(rows)])
+    assert len(stream_ids) == rows and stream_ids[-1] - stream_ids[0] == rows - 1
+    started = time.perf_counter()
+    count = sum(1 for _ in repo.iter_rows('orders', ORDER_COLUMNS, erp_system.STREAM_BATCH_SIZE))
+    assert count == rows + 3, count
+    return count / (time.perf_counter() - started)
+
+
+def run(backend, location, template, rows, **options):
+    router = erp_system.StorageRouter(location, template, backend=backend, **options)
+    try:
+        router.default.repository.migrate()
+        rate = check_contract(router.shard(7, create=True).repository, rows)
+        assert 7 in router.tenant_ids(), router.tenant_ids()
+        print(f'{backend:9s} contract ok, streamed {rows + 3} orders at {rate:,.0f} rows/s')
+    finally:
+        router.close_all()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--postgres-dsn', help='e.g. postgresql://postgres@localhost/erp_test')
+    parser.add_argument('--embedded-postgres', action='store_true', help='run PostgreSQL from the pgserver package')
+    parser.add_argument('--rows', type=int, default=20000, help='orders to stream at the end')
+    args = parser.parse_args()
+    if args.embedded_postgres:
+        import pgserver
+        args.postgres_dsn = pgserver.get_server(tempfile.mkdtemp(), cleanup_mode='stop').get_uri()
+
+    run('sqlite', 'contract.db', 'contract_{betrieb_id}.db', args.rows)
+    if args.postgres_dsn:
+        prefix = f'contract_{os.getpid()}'
+        try:
+            run('postgres', f'{prefix}_default', prefix + '_{betrieb_id}', args.rows, dsn=args.postgres_dsn)
+        finally:
+            import psycopg
+            with psycopg.connect(args.postgres_dsn, autocommit=True) as conn:
+                for schema in (f'{prefix}_default', f'{prefix}_7'):
+                    conn.execute(f'DROP SCHEMA IF EXISTS {schema} CASCADE')
+    else:
+        print('postgres  skipped (pass --postgres-dsn to run it)')
+
+
+if __name__ == '__main__':
+    main()
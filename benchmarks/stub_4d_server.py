@@ -0,0 +1,108 @@
+"""Local stand-in for the 4D SOAP server used by soap_api.FourDClient.
+
+Usage: python benchmarks/stub_4d_server.py [--port P] [--latency MS]
+
+Answers ws_wes_kunde_save with an incrementing kunde_id and
+ws_wes_order_save with an incrementing order_id, over HTTP/1.1 keep-alive.
+``latency`` adds a fixed delay per request to mimic the remote server;
+``fail_every`` answers every n-th request with a 503; ``padding`` adds an
+``optional_data`` array of that many items after (or, with ``pad_before``,
+before) the id.
+"""
+import argparse
+import itertools
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+RESPONSE = ('<?xml version="1.0" encoding="UTF-8"?>'
+            '<SOAP-ENV:Envelope xmlns:SOAP-ENV="http://schemas.xmlsoap.org/soap/envelope/"'
+            ' xmlns:ns1="http://www.4d.com/namespace/default"><SOAP-ENV:Body>'
+            '<ns1:{operation}Response>{fields}</ns1:{operation}Response>'
+            '</SOAP-ENV:Body></SOAP-ENV:Envelope>')
+
+FAULT = ('<?xml version="1.0" encoding="UTF-8"?>'
+         '<SOAP-ENV:Envelope xmlns:SOAP-ENV="http://schemas.xmlsoap.org/soap/envelope/"><SOAP-ENV:Body>'
+         '<SOAP-ENV:Fault><faultcode>SOAP-ENV:Client</faultcode><faultstring>{message}</faultstring>'
+         '</SOAP-ENV:Fault></SOAP-ENV:Body></SOAP-ENV:Envelope>')
+
+
+class Stub4DHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    disable_nagle_algorithm = True
+
+    def do_POST(self):
+        server = self.server
+        body = self.rfile.read(int(self.headers.get('Content-Length', 0)))
+        count = next(server.requests)
+        if server.latency:
+            time.sleep(server.latency)
+
+        if server.fail_every and count % server.fail_every == 0:
+            return self._reply(503, b'Service Unavailable')
+
+        action = self.headers.get('SOAPAction', '').strip('"').rpartition('#')[2]
+        if action == 'ws_wes_kunde_save':
+            fields = f'<kunde_id>{next(server.kunde_ids)}</kunde_id>'
+        elif action == 'ws_wes_order_save':
+            fields = f'<order_id>{next(server.order_ids)}</order_id>'
+        else:
+            return self._reply(500, FAULT.format(message=f'Unknown operation {action}').encode())
+        if server.padding:
+            padding = f'<optional_data>{"<item>x</item>" * server.padding}</optional_data>'
+            fields = padding + fields if server.pad_before else fields + padding
+        with server.lock:
+            server.received.append((action, body))
+        self._reply(200, RESPONSE.format(operation=action, fields=fields).encode())
+
+    def _reply(self, status, payload):
+        self.send_response(status)
+        self.send_header('Content-Type', 'text/xml; charset=utf-8')
+        self.send_header('Content-Length', str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class Stub4DServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def handle_error(self, request, client_address):
+        # clients may drop a connection mid-response (e.g. an abandoned large body)
+        pass
+
+
+def start_stub_server(port=0, latency=0.0, fail_every=0, padding=0, pad_before=False):
+    """Start the stub in a daemon thread and return ``(server, endpoint_url)``."""
+    server = Stub4DServer(('127.0.0.1', port), Stub4DHandler)
+    server.latency = latency
+    server.fail_every = fail_every
+    server.padding = padding
+    server.pad_before = pad_before
+    server.requests = itertools.count(1)
+    server.kunde_ids = itertools.count(1000)
+    server.order_ids = itertools.count(5000)
+    server.lock = threading.Lock()
+    server.received = []
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f'http://127.0.0.1:{server.server_address[1]}/4DSOAP/'
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--port', type=int, default=8080)
+    parser.add_argument('--latency', type=float, default=0.0, help='added delay per request in ms')
+    args = parser.parse_args()
+    server, url = start_stub_server(args.port, args.latency / 1000)
+    print(f'stub 4D server listening on {url}')
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == '__main__':
+    main()
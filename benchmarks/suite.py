@@ -0,0 +1,360 @@
+"""Reproducible benchmark suite for the data functions and the REST/SOAP surfaces.
+
+Usage:
+    python benchmarks/suite.py run [--scale small|medium|large] [--only TEXT] [--output FILE]
+    python benchmarks/suite.py compare BASELINE.json CURRENT.json [--threshold 0.15]
+
+``run`` seeds a scratch database (see seed_data.py) and times three groups:
+``micro`` calls the data functions directly, ``client`` goes through the
+Flask test client, and ``server`` talks HTTP to a real local server
+(including order creation under contention). Results are written as JSON
+with environment metadata. ``compare`` prints the p50 change per benchmark
+and exits with status 1 if any got slower than the threshold.
+"""
+import argparse
+import base64
+import json
+import os
+import platform
+import sqlite3
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime
+
+import requests
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(HERE, '..'))
+os.chdir(tempfile.mkdtemp())  # keep the scratch databases out of the repo
+
+import erp_system  # noqa: E402
+from seed_data import seed  # noqa: E402
+
+SCALES = {
+    'small': {'customers': 1_000, 'products': 200, 'orders': 5_000, 'iterations': 200},
+    'medium': {'customers': 10_000, 'products': 1_000, 'orders': 100_000, 'iterations': 500},
+    'large': {'customers': 50_000, 'products': 5_000, 'orders': 1_000_000, 'iterations': 500},
+}
+AUTH = ('admin', 'admin123')
+HEADERS = {'Authorization': 'Basic ' + base64.b64encode(b'admin:admin123').decode()}
+SOAP_HEADERS = dict(HEADERS, **{'Content-Type': 'text/xml; charset=utf-8'})
+CONTENTION_THREADS = 16
+
+BENCHMARKS = []
+
+
+def benchmark(group, name, iterations=None):
+    """Register ``func(ctx, i)`` as one timed operation; ``iterations`` overrides the scale default."""
+    def register(func):
+        BENCHMARKS.append((group, name, iterations, func))
+        return func
+    return register
+
+
+def soap_envelope(operation, **params):
+    fields = ''.join(f'<erp:{k}>{v}</erp:{k}>' for k, v in params.items())
+    return (f'<soap:Envelope xmlns:soap="http://schemas.xmlsoap.org/soap/envelope/" '
+            f'xmlns:erp="{erp_system.ERP_NS}"><soap:Body><erp:{operation}>{fields}'
+            f'</erp:{operation}></soap:Body></soap:Envelope>').encode('utf-8')
+
+
+def summarize(timings, wall):
+    timings = sorted(timings)
+    quantiles = statistics.quantiles(timings, n=100) if len(timings) > 1 else timings * 99
+    return {
+        'iterations': len(timings),
+        'ops_per_sec': round(len(timings) / wall, 1),
+        'mean_ms': round(statistics.fmean(timings) * 1000, 4),
+        'p50_ms': round(quantiles[49] * 1000, 4),
+        'p99_ms': round(quantiles[98] * 1000, 4),
+    }
+
+
+def measure(func, ctx, iterations):
+    for i in range(min(10, iterations)):
+        func(ctx, i)
+    timings = []
+    started = time.perf_counter()
+    for i in range(iterations):
+        t = time.perf_counter()
+        func(ctx, i)
+        timings.append(time.perf_counter() - t)
+    return summarize(timings, time.perf_counter() - started)
+
+
+def _check(response):
+    body = response.data if hasattr(response, 'data') else response.content
+    if response.status_code != 200:
+        raise RuntimeError(f'HTTP {response.status_code}: {body[:200]!r}')
+    return body
+
+
+# ---- micro: data functions ----
+
+@benchmark('micro', 'add_customer')
+def _(ctx, i):
+    erp_system.add_customer(f'Bench {i}', f'bench{i}@example.test', '+49 1')
+
+
+@benchmark('micro', 'get_customers page=500')
+def _(ctx, i):
+    erp_system.get_customers(limit=500)
+
+
+@benchmark('micro', 'get_customers keyset deep page=100')
+def _(ctx, i):
+    erp_system.get_customers(after_id=ctx['customers'] // 2, limit=100)
+
+
+@benchmark('micro', 'get_products page=500 (cached)')
+def _(ctx, i):
+    erp_system.get_products(limit=500)
+
+
+@benchmark('micro', 'get_products page=500 (uncached)')
+def _(ctx, i):
+    erp_system.product_cache.invalidate()
+    erp_system.get_products(limit=500)
+
+
+@benchmark('micro', 'get_product by id')
+def _(ctx, i):
+    erp_system.get_product(product_id=i % ctx['products'] + 1)
+
+
+@benchmark('micro', 'get_product by sku')
+def _(ctx, i):
+    erp_system.get_product(sku=f'SKU-{i % ctx["products"]:07d}')
+
+
+@benchmark('micro', 'create_order')
+def _(ctx, i):
+    erp_system.create_order(i % ctx['customers'] + 1, i % ctx['products'] + 1, 1)
+
+
+@benchmark('micro', 'get_orders page=500')
+def _(ctx, i):
+    erp_system.get_orders(limit=500)
+
+
+@benchmark('micro', 'get_orders status+day filter')
+def _(ctx, i):
+    day = 1704067200000 + (i % 360) * 86400000
+    erp_system.get_orders(status='paid', created_from=day, created_to=day + 86400000, limit=500)
+
+
+@benchmark('micro', 'get_changes page=500')
+def _(ctx, i):
+    erp_system.get_changes(since=0, limit=500, tables='orders')
+
+
+@benchmark('micro', 'add_customers_batch x100', iterations=50)
+def _(ctx, i):
+    erp_system.add_customers_batch([{'name': f'Batch {i}-{n}', 'email': f'b{i}.{n}@example.test', 'phone': '1'}
+                                    for n in range(100)])
+
+
+# ---- client: Flask test client ----
+
+def _get(ctx, path):
+    response = ctx['client'].get(path, headers=HEADERS)
+    _check(response)
+    response.close()
+
+
+def _soap(ctx, body):
+    response = ctx['client'].post('/soap', data=body, headers=SOAP_HEADERS)
+    _check(response)
+    response.close()
+
+
+@benchmark('client', 'GET /api/customers?limit=100')
+def _(ctx, i):
+    _get(ctx, '/api/customers?limit=100')
+
+
+@benchmark('client', 'GET /api/orders?status=paid&limit=100')
+def _(ctx, i):
+    _get(ctx, '/api/orders?status=paid&limit=100')
+
+
+@benchmark('client', 'GET /api/products/<id>')
+def _(ctx, i):
+    _get(ctx, f'/api/products/{i % ctx["products"] + 1}')
+
+
+@benchmark('client', 'GET /api/orders?stream=ndjson (all)', iterations=5)
+def _(ctx, i):
+    _get(ctx, '/api/orders?stream=ndjson')
+
+
+@benchmark('client', 'POST /api/orders')
+def _(ctx, i):
+    response = ctx['client'].post('/api/orders', headers=HEADERS, json={
+        'customer_id': i % ctx['customers'] + 1, 'product_id': i % ctx['products'] + 1, 'quantity': 1})
+    _check(response)
+    response.close()
+
+
+for _size in (10, 100, 1000):
+    benchmark('client', f'SOAP GetOrders limit={_size}')(
+        lambda ctx, i, body=soap_envelope('GetOrders', limit=_size): _soap(ctx, body))
+
+
+@benchmark('client', 'SOAP AddCustomer')
+def _(ctx, i):
+    _soap(ctx, soap_envelope('AddCustomer', name=f'Soap {i}', email=f's{i}@example.test', phone='1'))
+
+
+# ---- server: real HTTP server ----
+
+@benchmark('server', 'GET /api/products?limit=100')
+def _(ctx, i):
+    _check(ctx['session'].get(f'{ctx["url"]}/api/products?limit=100'))
+
+
+@benchmark('server', 'SOAP GetOrders limit=100')
+def _(ctx, i):
+    _check(ctx['session'].post(f'{ctx["url"]}/soap', data=soap_envelope('GetOrders', limit=100),
+                               headers={'Content-Type': 'text/xml; charset=utf-8'}))
+
+
+def order_contention(ctx, iterations):
+    """``CONTENTION_THREADS`` clients POST orders for the same product at once."""
+    timings, errors = [], []
+    lock = threading.Lock()
+    gate = threading.Barrier(CONTENTION_THREADS)
+
+    def client():
+        session = requests.Session()
+        session.auth = AUTH
+        local = []
+        gate.wait()
+        for n in range(iterations // CONTENTION_THREADS):
+            t = time.perf_counter()
+            result = session.post(f'{ctx["url"]}/api/orders', json={'customer_id': n % ctx['customers'] + 1,
+                                                                   'product_id': 1, 'quantity': 1}).json()
+            local.append(time.perf_counter() - t)
+            if result.get('status') != 'success':
+                errors.append(result)
+        with lock:
+            timings.extend(local)
+
+    threads = [threading.Thread(target=client) for _ in range(CONTENTION_THREADS)]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    if errors:
+        raise RuntimeError(f'{len(errors)} orders failed, e.g. {errors[0]}')
+    return summarize(timings, time.perf_counter() - started)
+
+
+def start_server(app):
+    from werkzeug.serving import WSGIRequestHandler, make_server
+
+    class QuietHandler(WSGIRequestHandler):
+        def log_request(self, *args, **kwargs):
+            pass
+
+    server = make_server('127.0.0.1', 0, erp_system.ConcurrencyLimiter(app, CONTENTION_THREADS), threaded=True,
+                         request_handler=QuietHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f'http://127.0.0.1:{server.server_port}'
+
+
+def environment():
+    try:
+        commit = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=HERE, capture_output=True,
+                                text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {'commit': commit, 'python': platform.python_version(), 'sqlite': sqlite3.sqlite_version,
+            'platform': platform.platform(), 'cpus': os.cpu_count(), 'timestamp': datetime.now().isoformat()}
+
+
+def run(args):
+    scale = SCALES[args.scale]
+    db_path = os.path.abspath('suite.db')
+    started = time.perf_counter()
+    seed(db_path, scale['customers'], scale['products'], scale['orders'], args.seed)
+    print(f'seeded {args.scale} data set in {time.perf_counter() - started:.1f}s')
+
+    app = erp_system.create_app({'DB_PATH': db_path})
+    server, url = start_server(app)
+    session = requests.Session()
+    session.auth = AUTH
+    ctx = dict(scale, client=app.test_client(), url=url, session=session)
+
+    results = {}
+    selected = [b for b in BENCHMARKS if args.only.lower() in f'{b[0]}: {b[1]}'.lower()]
+    for group, name, iterations, func in selected:
+        key = f'{group}: {name}'
+        results[key] = measure(func, ctx, iterations or scale['iterations'])
+        print(f'{key:<52}{results[key]["p50_ms"]:>10.3f} ms p50{results[key]["ops_per_sec"]:>12,.0f} ops/s')
+    key = f'server: POST /api/orders x{CONTENTION_THREADS} threads, one product'
+    if args.only.lower() in key.lower():
+        results[key] = order_contention(ctx, scale['iterations'] * 2)
+        print(f'{key:<52}{results[key]["p50_ms"]:>10.3f} ms p50{results[key]["ops_per_sec"]:>12,.0f} ops/s')
+    server.shutdown()
+
+    report = {'environment': environment(), 'scale': dict(scale, name=args.scale, seed=args.seed),
+              'results': results}
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f'wrote {args.output}')
+
+
+def compare(args):
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    with open(args.current) as f:
+        current = json.load(f)
+    if baseline['scale'] != current['scale']:
+        print(f'warning: scales differ ({baseline["scale"]} vs {current["scale"]})')
+
+    regressions = 0
+    print(f"{'benchmark':<52}{'base p50':>10}{'now p50':>10}{'change':>9}")
+    for key, now in current['results'].items():
+        base = baseline['results'].get(key)
+        if base is None:
+            print(f'{key:<52}{"-":>10}{now["p50_ms"]:>10.3f}{"new":>9}')
+            continue
+        change = now['p50_ms'] / base['p50_ms'] - 1
+        flag = ''
+        if change > args.threshold:
+            regressions += 1
+            flag = '  REGRESSION'
+        print(f'{key:<52}{base["p50_ms"]:>10.3f}{now["p50_ms"]:>10.3f}{change:>+8.0%}{flag}')
+    print(f'{regressions} regression(s) above {args.threshold:.0%}')
+    return 1 if regressions else 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    sub = parser.add_subparsers(dest='command', required=True)
+    run_parser = sub.add_parser('run')
+    run_parser.add_argument('--scale', choices=SCALES, default='small')
+    run_parser.add_argument('--seed', type=int, default=42)
+    run_parser.add_argument('--only', default='', help='run benchmarks whose "group: name" contains this text')
+    run_parser.add_argument('--output', help='write results as JSON')
+    compare_parser = sub.add_parser('compare')
+    compare_parser.add_argument('baseline')
+    compare_parser.add_argument('current')
+    compare_parser.add_argument('--threshold', type=float, default=0.15, help='allowed p50 slowdown (0.15 = 15%%)')
+    args = parser.parse_args()
+
+    if args.command == 'run':
+        run(args)
+    else:
+        sys.exit(compare(args))
+
+
+if __name__ == '__main__':
+    main()
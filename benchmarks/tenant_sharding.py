@@ -0,0 +1,82 @@
+"""Compare order write throughput with every tenant in one database versus one shard per tenant.
+
+Usage: python benchmarks/tenant_sharding.py [--tenants N] [--threads-per-tenant T] [--orders K]
+
+Each tenant gets T threads placing K orders in total. In the "shared" run all
+threads write to the default database, so they take turns on its single
+write lock; in the "sharded" run each tenant's threads write to their own
+file through use_tenant(). The run fails if any order is lost.
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+os.chdir(tempfile.mkdtemp())  # keep the scratch shard files out of the repo
+
+import erp_system  # noqa: E402
+
+
+def run(tenant_ids, threads_per_tenant, orders_per_tenant):
+    """Place the orders; ``tenant_ids`` of None means every tenant shares the default shard."""
+    products = {}
+    for betrieb_id in tenant_ids:
+        if betrieb_id is not None:
+            erp_system.create_tenant(betrieb_id)
+        with erp_system.use_tenant(betrieb_id):
+            result = json.loads(erp_system.add_product(f'SKU {betrieb_id}', f'SKU-{betrieb_id}-{time.monotonic_ns()}',
+                                                       1.0, orders_per_tenant))
+            products[betrieb_id] = result['id']
+
+    failures = []
+    start_gate = threading.Barrier(len(tenant_ids) * threads_per_tenant)
+
+    def worker(betrieb_id, count):
+        with erp_system.use_tenant(betrieb_id):
+            start_gate.wait()
+            for _ in range(count):
+                result = json.loads(erp_system.create_order(1, products[betrieb_id], 1))
+                if result['status'] != 'success':
+                    failures.append(result['message'])
+
+    per_thread = orders_per_tenant // threads_per_tenant
+    threads = [threading.Thread(target=worker, args=(betrieb_id, per_thread))
+               for betrieb_id in tenant_ids for _ in range(threads_per_tenant)]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+    assert not failures, failures[:5]
+    return len(threads) * per_thread, elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--tenants', type=int, default=4)
+    parser.add_argument('--threads-per-tenant', type=int, default=4)
+    parser.add_argument('--orders', type=int, default=2000, help='orders per tenant')
+    args = parser.parse_args()
+
+    erp_system.configure_storage()
+    erp_system.storage.set_max_connections(args.threads_per_tenant * args.tenants)
+    erp_system.init_db()
+
+    shared_orders, shared_elapsed = run([None] * 1, args.threads_per_tenant * args.tenants,
+                                        args.orders * args.tenants)
+    sharded_orders, sharded_elapsed = run(list(range(1, args.tenants + 1)), args.threads_per_tenant, args.orders)
+
+    print(f'shared   orders={shared_orders} elapsed={shared_elapsed:.2f}s '
+          f'orders/sec={shared_orders / shared_elapsed:,.0f}')
+    print(f'sharded  orders={sharded_orders} elapsed={sharded_elapsed:.2f}s '
+          f'orders/sec={sharded_orders / sharded_elapsed:,.0f} '
+          f'({shared_elapsed / sharded_elapsed:.2f}x, tenants={args.tenants})')
+
+
+if __name__ == '__main__':
+    main()
@@ -1,32 +1,463 @@
-from zeep import Client
-from zeep.wsdl import wsdl
-from zeep.xsd import Schema
-from lxml import etree
-from flask import Flask, render_template_string, request, jsonify
+from flask import (Blueprint, Flask, Response, current_app, make_response, render_template, request, jsonify,
+                   stream_with_context)
 from flask_cors import CORS
+import click
+from werkzeug.wsgi import ClosingIterator
+from concurrent.futures import Future, ThreadPoolExecutor
+import glob
+import re
+import argparse
 import json
+import os
 from datetime import datetime
 import sqlite3
+import queue
+import random
+import threading
+import time
+from contextlib import contextmanager
 from functools import wraps
 import base64
+import hashlib
+import hmac
+from collections import OrderedDict, deque
+from bisect import bisect_left
+import cProfile
+import heapq
+import io
+import pstats
 
 # ==================== SOAP SERVICE ====================
-app = Flask(__name__)
-CORS(app)
+# Routes live on this blueprint; create_app() builds the Flask app around it.
+bp = Blueprint('erp', __name__, cli_group=None)
 
 # Basic Authentication Configuration
+# Passwords are stored as scrypt hashes (see hash_password); the demo accounts
+# are admin/admin123, user/user123 and manager/manager123.
 VALID_USERS = {
-    'admin': 'admin123',
-    'user': 'user123',
-    'manager': 'manager123'
+    'admin': 'scrypt$16384$8$1$a8e5ef729f493f2df4a3da6c671c6fa0$'
+             'da604e9fb3fd7faa69fcf0f20833e235da0f203bde7e9c3ca51e14c9528c63d1',
+    'user': 'scrypt$16384$8$1$821eece9ba4483d42dddb2947ed40617$'
+            'f05cb674455b4d951bf123f444aaa605fe978ebf7047f513da2fc1f87d7c1012',
+    'manager': 'scrypt$16384$8$1$87528826bb99bcfcd9893510dbb164f3$'
+               'c5b8c82e5d02c09184b5929d97d3931d2ed9f6780a60dd1f66157c43dc402192',
 }
 
 
-# Database initialization
-def init_db():
-    conn = sqlite3.connect('erp_system.db')
-    c = conn.cursor()
+DB_PATH = 'erp_system.db'
+
+
+# ==================== METRICS ====================
+
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304, 16777216)
+ROW_BUCKETS = (0, 1, 10, 50, 100, 500, 1000, 5000, 10000, 50000)
+
+
+def _label_value(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+class Counter:
+    """Monotonic counter per label set, rendered in Prometheus text format."""
+
+    kind = 'counter'
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = labelnames
+        self._lock = threading.Lock()
+        self._values = {}
+
+    def inc(self, labels=(), amount=1):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def _labels(self, labels, extra=''):
+        pairs = [f'{name}="{_label_value(value)}"' for name, value in zip(self.labelnames, labels)]
+        if extra:
+            pairs.append(extra)
+        return '{' + ','.join(pairs) + '}' if pairs else ''
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.documentation}', f'# TYPE {self.name} {self.kind}']
+        with self._lock:
+            values = list(self._values.items())
+        for labels, value in sorted(values):
+            lines.append(f'{self.name}{self._labels(labels)} {value}')
+        return lines
+
+
+class Histogram(Counter):
+    """Fixed-bucket histogram per label set; one lock and a bisect per observation."""
+
+    kind = 'histogram'
+
+    def __init__(self, name, documentation, labelnames=(), buckets=LATENCY_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(buckets)
+
+    def observe(self, value, labels=()):
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._values.get(labels)
+            if series is None:
+                series = self._values[labels] = [0] * (len(self.buckets) + 3)
+            series[index] += 1
+            series[-2] += value
+            series[-1] += 1
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.documentation}', f'# TYPE {self.name} {self.kind}']
+        with self._lock:
+            values = [(labels, list(series)) for labels, series in self._values.items()]
+        for labels, series in sorted(values):
+            cumulative = 0
+            for bound, count in zip(self.buckets + ('+Inf',), series):
+                cumulative += count
+                bucket = self._labels(labels, f'le="{bound}"')
+                lines.append(f'{self.name}_bucket{bucket} {cumulative}')
+            lines.append(f'{self.name}_sum{self._labels(labels)} {series[-2]}')
+            lines.append(f'{self.name}_count{self._labels(labels)} {series[-1]}')
+        return lines
+
+
+REQUEST_SECONDS = Histogram('erp_request_duration_seconds', 'Request latency by operation (REST route or SOAP operation).',
+                            ('operation',))
+PHASE_SECONDS = Histogram('erp_request_phase_seconds',
+                          'Time spent per request phase (auth, parse, db, serialize, other).', ('operation', 'phase'))
+RESPONSES = Counter('erp_responses_total', 'Responses by operation and HTTP status.', ('operation', 'status'))
+REQUEST_BYTES = Histogram('erp_request_size_bytes', 'Request body size.', ('operation',), SIZE_BUCKETS)
+RESPONSE_BYTES = Histogram('erp_response_size_bytes', 'Response body size (buffered responses only).',
+                           ('operation',), SIZE_BUCKETS)
+DB_ROWS = Histogram('erp_db_rows_returned', 'Rows returned by list queries.', ('table',), ROW_BUCKETS)
+DB_POOL_WAIT = Histogram('erp_db_pool_wait_seconds', 'Time spent waiting to check out a connection.')
+
+METRICS = (REQUEST_SECONDS, PHASE_SECONDS, RESPONSES, REQUEST_BYTES, RESPONSE_BYTES, DB_ROWS, DB_POOL_WAIT)
+
+_request_metrics = threading.local()
+
+
+def record_phase(phase, seconds):
+    """Add ``seconds`` to ``phase`` of the current request; a no-op outside instrumented requests."""
+    phases = getattr(_request_metrics, 'phases', None)
+    if phases is not None:
+        phases[phase] = phases.get(phase, 0.0) + seconds
+
+
+def to_json(payload):
+    """``json.dumps`` that counts towards the request's ``serialize`` phase."""
+    started = time.perf_counter()
+    text = json.dumps(payload)
+    record_phase('serialize', time.perf_counter() - started)
+    return text
+
+
+def set_operation(name):
+    """Label the current request's metrics with ``name`` instead of its route."""
+    _request_metrics.operation = name
+
+
+class RequestProfiler:
+    """Opt-in sampling profiler that keeps the ``keep`` slowest profiled requests.
+
+    A ``sample_rate`` fraction of requests runs under ``cProfile``. When a
+    profiled request is among the slowest seen so far, its top functions are
+    kept for ``/api/stats/slowest`` and, with ``dump_dir``, its raw profile
+    is written there as a ``.prof`` file (only the current ``keep`` files
+    are retained).
+    """
+
+    def __init__(self, sample_rate=0.0, keep=10, dump_dir=None):
+        self.sample_rate = sample_rate
+        self.keep = keep
+        self.dump_dir = dump_dir
+        self._lock = threading.Lock()
+        self._slowest = []
+        self._seq = 0
+
+    def maybe_start(self):
+        if self.sample_rate <= 0 or random.random() >= self.sample_rate:
+            return None
+        profile = cProfile.Profile()
+        profile.enable()
+        return profile
+
+    def finish(self, profile, operation, seconds):
+        profile.disable()
+        profile.create_stats()
+        if not profile.stats:
+            return
+        with self._lock:
+            if len(self._slowest) >= self.keep and seconds <= self._slowest[0][0]:
+                return
+            self._seq += 1
+            seq = self._seq
+        out = io.StringIO()
+        pstats.Stats(profile, stream=out).sort_stats('cumulative').print_stats(25)
+        entry = {'operation': operation, 'duration_ms': round(seconds * 1000, 3),
+                 'at': datetime.now().isoformat(), 'profile': out.getvalue()}
+        if self.dump_dir:
+            os.makedirs(self.dump_dir, exist_ok=True)
+            path = os.path.join(self.dump_dir, f'{seq:06d}_{int(seconds * 1000)}ms.prof')
+            profile.dump_stats(path)
+            entry['file'] = path
+        with self._lock:
+            heapq.heappush(self._slowest, (seconds, seq, entry))
+            evicted = heapq.heappop(self._slowest)[2] if len(self._slowest) > self.keep else {}
+        if evicted.get('file'):
+            os.remove(evicted['file'])
+
+    def slowest(self):
+        with self._lock:
+            return [entry for _, _, entry in sorted(self._slowest, reverse=True)]
+
+
+request_profiler = RequestProfiler()
+
+
+def _start_request_metrics():
+    _request_metrics.started = time.perf_counter()
+    _request_metrics.phases = {}
+    _request_metrics.operation = None
+    _request_metrics.profile = request_profiler.maybe_start()
+
+
+def _finish_request_metrics(response):
+    """Attach the observation to the response; it runs when the body is closed, so streams are included."""
+    state = _request_metrics
+    started, phases, profile = state.started, state.phases, state.profile
+    rule = request.url_rule
+    operation = state.operation or f'{request.method} {rule.rule if rule is not None else "<unmatched>"}'
+    request_size = request.content_length or 0
+
+    def observe():
+        elapsed = time.perf_counter() - started
+        if state.phases is phases:
+            state.phases = None
+        if profile is not None:
+            request_profiler.finish(profile, operation, elapsed)
+        labels = (operation,)
+        REQUEST_SECONDS.observe(elapsed, labels)
+        RESPONSES.inc((operation, str(response.status_code)))
+        REQUEST_BYTES.observe(request_size, labels)
+        if not response.is_streamed:
+            RESPONSE_BYTES.observe(response.content_length or 0, labels)
+        for phase, seconds in phases.items():
+            PHASE_SECONDS.observe(seconds, (operation, phase))
+        PHASE_SECONDS.observe(max(0.0, elapsed - sum(phases.values())), (operation, 'other'))
+
+    response.call_on_close(observe)
+    return response
+
+
+def _stats_lines(prefix, labelled_stats, counters=()):
+    """Render ``[(labels, stats_dict), ...]`` as one TYPE line and one sample per label set per key."""
+    samples = {}
+    for labels, stats in labelled_stats:
+        for key, value in stats.items():
+            if isinstance(value, (int, float)):
+                samples.setdefault(key, []).append(f'{labels} {value}')
+    lines = []
+    for key, values in samples.items():
+        name = f'{prefix}_{key}_total' if key in counters else f'{prefix}_{key}'
+        lines.append(f'# TYPE {name} {"counter" if key in counters else "gauge"}')
+        lines += [name + value for value in values]
+    return lines
+
+
+def render_metrics():
+    """Prometheus text exposition of all request metrics plus pool, cache and limiter counters."""
+    lines = []
+    for metric in METRICS:
+        lines += metric.render()
+    shards = [(f'{{shard="{_label_value(shard.name)}"}}', shard) for shard in storage.loaded()]
+    lines += _stats_lines('erp_db_pool', [(labels, shard.repository.stats()) for labels, shard in shards],
+                          ('hits', 'misses', 'waits'))
+    lines += _stats_lines('erp_product_cache', [(labels, shard.product_cache.stats()) for labels, shard in shards],
+                          ('hits', 'misses', 'response_hits', 'response_misses', 'evictions'))
+    lines += _stats_lines('erp_write_batch', [(labels, shard.write_batcher.stats()) for labels, shard in shards
+                                              if shard.write_batcher is not None], ('batches', 'items'))
+    lines += _stats_lines('erp_auth_cache', [('', auth_cache.stats())], ('hits', 'misses'))
+    if request_limiter is not None:
+        lines += _stats_lines('erp_request_slots', request_limiter.stats(), ('rejected',))
+    return '\n'.join(lines) + '\n'
+
+
+# ==================== DATABASE CONNECTION POOL ====================
+
+class ConnectionPool:
+    """Bounded pool of long-lived SQLite connections.
+
+    Connections are opened once, tuned with WAL and the pragmas below, and
+    handed back to the pool after each use instead of being closed. A thread
+    gets its previous connection back when it is idle, and nested
+    ``connection()`` blocks in the same thread share one connection.
+    """
+
+    PRAGMAS = (
+        'PRAGMA journal_mode=WAL',
+        'PRAGMA synchronous=NORMAL',
+        'PRAGMA cache_size=-20000',
+        'PRAGMA mmap_size=268435456',
+        'PRAGMA temp_store=MEMORY',
+    )
+
+    def __init__(self, path, max_connections=8, timeout=30.0, cached_statements=256):
+        self.path = path
+        self.max_connections = max_connections
+        self.timeout = timeout
+        self.cached_statements = cached_statements
+        self._cond = threading.Condition()
+        self._idle = []
+        self._open = 0
+        self._local = threading.local()
+        self._hits = 0
+        self._misses = 0
+        self._waits = 0
+
+    def _connect(self):
+        # cached_statements is sqlite3's per-connection prepared statement cache
+        conn = sqlite3.connect(self.path, timeout=self.timeout, check_same_thread=False,
+                               cached_statements=self.cached_statements)
+        for pragma in self.PRAGMAS:
+            conn.execute(pragma)
+        return conn
+
+    def _acquire(self):
+        preferred = getattr(self._local, 'last', None)
+        with self._cond:
+            while True:
+                if preferred is not None and preferred in self._idle:
+                    self._idle.remove(preferred)
+                    self._hits += 1
+                    return preferred
+                if self._idle:
+                    self._hits += 1
+                    return self._idle.pop()
+                if self._open < self.max_connections:
+                    self._open += 1
+                    self._misses += 1
+                    break
+                self._waits += 1
+                if not self._cond.wait(self.timeout):
+                    raise sqlite3.OperationalError('Timed out waiting for a database connection')
+        try:
+            return self._connect()
+        except Exception:
+            with self._cond:
+                self._open -= 1
+                self._cond.notify()
+            raise
+
+    def _release(self, conn, discard=False):
+        with self._cond:
+            if discard:
+                self._open -= 1
+            else:
+                self._idle.append(conn)
+            self._cond.notify()
+        if discard:
+            conn.close()
+
+    @contextmanager
+    def connection(self):
+        """Check out a connection; uncommitted work is rolled back on error."""
+        conn = getattr(self._local, 'active', None)
+        if conn is not None:
+            yield conn
+            return
+
+        started = time.perf_counter()
+        conn = self._acquire()
+        acquired = time.perf_counter()
+        DB_POOL_WAIT.observe(acquired - started)
+        self._local.active = conn
+        discard = False
+        try:
+            yield conn
+        except BaseException:
+            try:
+                conn.rollback()
+            except sqlite3.Error:
+                discard = True
+            raise
+        finally:
+            self._local.active = None
+            self._local.last = None if discard else conn
+            self._release(conn, discard)
+            record_phase('db', time.perf_counter() - acquired)
+
+    def stats(self):
+        with self._cond:
+            return {
+                'hits': self._hits,
+                'misses': self._misses,
+                'waits': self._waits,
+                'open_connections': self._open,
+                'idle_connections': len(self._idle),
+                'max_connections': self.max_connections,
+            }
+
+    def close_all(self):
+        with self._cond:
+            idle, self._idle = self._idle, []
+            self._open -= len(idle)
+        for conn in idle:
+            conn.close()
+
+
+class ShardAttribute:
+    """Module-level stand-in for one attribute of the current thread's shard.
+
+    Cheaper than werkzeug's ``LocalProxy``: only attribute reads are
+    forwarded, which is all the data functions do with these objects.
+    """
+
+    __slots__ = ('_name',)
 
+    def __init__(self, name):
+        self._name = name
+
+    def __getattr__(self, attr):
+        return getattr(getattr(getattr(_tenant, 'shard', None) or storage.default, self._name), attr)
+
+
+# The repository of the current tenant's shard (see StorageRouter); the
+# default shard outside tenant-routed requests.
+repository = ShardAttribute('repository')
+
+WRITE_RETRIES = 5
+WRITE_RETRY_BACKOFF = 0.01
+
+
+def _now():
+    """Return the current time as ``(created_at, created_ts)``: ISO text and epoch milliseconds."""
+    now = datetime.now()
+    return now.isoformat(), int(now.timestamp() * 1000)
+
+
+def _timestamp(value):
+    """Convert a ``created_from``/``created_to`` filter (epoch ms or ISO date/time) to epoch ms."""
+    value = str(value)
+    if value.lstrip('-').isdigit():
+        return int(value)
+    return int(datetime.fromisoformat(value).timestamp() * 1000)
+
+
+def _is_busy(error):
+    code = getattr(error, 'sqlite_errorcode', None)
+    if code is not None:
+        return code in (sqlite3.SQLITE_BUSY, sqlite3.SQLITE_LOCKED)
+    return 'locked' in str(error) or 'busy' in str(error)
+
+
+# ==================== SCHEMA MIGRATIONS ====================
+# Each migration runs once, in order, inside its own transaction; the number
+# of migrations applied is tracked in PRAGMA user_version.
+
+def _migration_base_tables(c):
     c.execute('''CREATE TABLE IF NOT EXISTS customers
                  (id INTEGER PRIMARY KEY, name TEXT, email TEXT, phone TEXT, created_at TEXT)''')
 
@@ -40,18 +471,807 @@ def init_db():
     c.execute('''CREATE TABLE IF NOT EXISTS invoices
                  (id INTEGER PRIMARY KEY, order_id INTEGER, amount REAL, status TEXT, created_at TEXT)''')
 
-    conn.commit()
-    conn.close()
 
+def _migration_numeric_timestamps(c):
+    # created_at stays as ISO text for display; created_ts (epoch milliseconds) is what gets filtered and indexed
+    for table in ('customers', 'products', 'orders', 'invoices'):
+        c.execute(f'ALTER TABLE {table} ADD COLUMN created_ts INTEGER')
+        c.execute(f"UPDATE {table} SET created_ts = "
+                  f"CAST(ROUND((julianday(created_at, 'utc') - 2440587.5) * 86400000) AS INTEGER)")
+
+
+def _migration_indexes(c):
+    c.execute('SELECT sku FROM products GROUP BY sku HAVING COUNT(*) > 1 LIMIT 5')
+    duplicates = [row[0] for row in c.fetchall()]
+    if duplicates:
+        raise RuntimeError(f"Cannot add unique index on products.sku; duplicate SKUs: {', '.join(map(str, duplicates))}")
+    c.execute('CREATE UNIQUE INDEX IF NOT EXISTS idx_products_sku ON products(sku)')
+    c.execute('CREATE INDEX IF NOT EXISTS idx_orders_customer_id ON orders(customer_id)')
+    c.execute('CREATE INDEX IF NOT EXISTS idx_orders_product_id ON orders(product_id)')
+    c.execute('CREATE INDEX IF NOT EXISTS idx_orders_status_created ON orders(status, created_ts)')
+    c.execute('CREATE INDEX IF NOT EXISTS idx_invoices_order_id ON invoices(order_id)')
+
+
+CHANGE_TABLES = ('customers', 'products', 'orders')
+
+
+def _migration_change_log(c):
+    # Triggers record every insert/update, whichever code path wrote the row
+    c.execute('''CREATE TABLE IF NOT EXISTS changes
+                 (seq INTEGER PRIMARY KEY AUTOINCREMENT, table_name TEXT NOT NULL, row_id INTEGER NOT NULL,
+                  op TEXT NOT NULL)''')
+    c.execute('CREATE INDEX IF NOT EXISTS idx_changes_table_seq ON changes(table_name, seq)')
+    for table in CHANGE_TABLES:
+        c.execute(f"INSERT INTO changes (table_name, row_id, op) SELECT '{table}', id, 'insert' FROM {table} ORDER BY id")
+        for op, event in (('insert', 'INSERT'), ('update', 'UPDATE')):
+            c.execute(f'''CREATE TRIGGER IF NOT EXISTS track_{table}_{op} AFTER {event} ON {table}
+                          BEGIN
+                              INSERT INTO changes (table_name, row_id, op) VALUES ('{table}', NEW.id, '{op}');
+                          END''')
+    # Tokens below min_since point at change rows that compact_changes has deleted
+    c.execute('CREATE TABLE IF NOT EXISTS change_retention (min_since INTEGER NOT NULL)')
+    c.execute('INSERT INTO change_retention (min_since) VALUES (0)')
+
+
+MIGRATIONS = [
+    _migration_base_tables,
+    _migration_numeric_timestamps,
+    _migration_indexes,
+    _migration_change_log,
+]
+
+
+def migrate(conn, target=None):
+    """Apply pending migrations up to ``target`` (default: all) and return the schema version."""
+    target = len(MIGRATIONS) if target is None else target
+    version = conn.execute('PRAGMA user_version').fetchone()[0]
+    while version < target:
+        conn.execute('BEGIN IMMEDIATE')
+        # another process may have migrated while we waited for the write lock
+        version = conn.execute('PRAGMA user_version').fetchone()[0]
+        if version >= target:
+            conn.rollback()
+            break
+        MIGRATIONS[version](conn.cursor())
+        version += 1
+        conn.execute(f'PRAGMA user_version = {version}')
+        conn.commit()
+    return version
+
+
+# Database initialization
+def init_db():
+    """Migrate the current shard's schema and return its version."""
+    return repository.migrate()
+
+
+# ==================== REPOSITORIES ====================
+# Storage for customers, products, orders and invoices. The data functions
+# below keep caching, change feeds and JSON encoding; repositories only
+# read and write rows, so the backend can be swapped by configuration.
+
+INSERT_COLUMNS = {
+    'customers': ('name', 'email', 'phone', 'created_at', 'created_ts'),
+    'products': ('name', 'sku', 'price', 'stock', 'created_at', 'created_ts'),
+    'orders': ('customer_id', 'product_id', 'quantity', 'total_price', 'status', 'created_at', 'created_ts'),
+    'invoices': ('order_id', 'amount', 'status', 'created_at', 'created_ts'),
+}
+
+
+class OrderRejected(ValueError):
+    """An order failed the stock check ("Insufficient stock" or "Product not found")."""
+
+
+class ChangeTokenExpired(ValueError):
+    """A change token points at entries that ``compact_changes`` has deleted."""
+
+    def __init__(self, since, min_since):
+        super().__init__(f"Change token {since} has expired; reload and continue from {min_since}")
+        self.min_since = min_since
+
+
+class Repository:
+    """Interface for storage backends; see SQLiteRepository and PostgresRepository.
+
+    List filters arrive validated, with ``created_from``/``created_to``
+    already converted to epoch milliseconds.
+    """
+
+    location = None
+
+    def migrate(self):
+        """Bring the schema up to date and return its version."""
+        raise NotImplementedError
+
+    def insert(self, table, rows):
+        """Insert ``INSERT_COLUMNS[table]`` value tuples in one transaction and return their ids in order."""
+        raise NotImplementedError
+
+    def insert_products(self, rows):
+        """Insert ``(index, values)`` product rows in one transaction, skipping SKUs already taken.
+
+        A SKU is taken if it exists in the table or an earlier row of the
+        batch uses it. Returns ``({index: id}, {index: rejection message})``.
+        """
+        raise NotImplementedError
+
+    def place_order(self, customer_id, product_id, quantity, created_at, created_ts):
+        """Reserve stock, insert the order and its invoice; return ``(order_id, total_price, stock_left)``.
+
+        Raises OrderRejected when the product is missing or short of stock.
+        """
+        raise NotImplementedError
+
+    def place_orders(self, rows, created_at, created_ts):
+        """Place ``(index, (customer_id, product_id, quantity))`` rows in one transaction.
+
+        Returns ``({index: {"id", "total"}}, {index: rejection message},
+        {product_id: stock_left})``.
+        """
+        raise NotImplementedError
+
+    def list_page(self, table, columns, limit, **filters):
+        """Return up to ``limit`` rows with ``id > after_id``, ordered by id, as dicts.
+
+        ``filters`` are ``after_id``, ``status``, ``created_from`` and ``created_to``.
+        """
+        raise NotImplementedError
+
+    def iter_rows(self, table, columns, batch_size, **filters):
+        """Yield every matching row as a dict; the read starts on the first ``next()``."""
+        raise NotImplementedError
+
+    def get_product(self, product_id=None, sku=None):
+        raise NotImplementedError
+
+    def changes_since(self, since, tables, limit):
+        """Return ``(token, changed, {table: [current rows]})`` for about ``limit`` rows changed after ``since``.
+
+        ``changed`` counts distinct changed rows and is at least ``limit``
+        when more are waiting. ``token`` is opaque to callers: the last seq
+        read for SQLite, a transaction id for PostgreSQL. Raises
+        ChangeTokenExpired if ``since`` is below ``min_since``.
+        """
+        raise NotImplementedError
+
+    def table_version(self, table):
+        """A value that changes whenever rows of ``table`` (one of CHANGE_TABLES) change, in any process."""
+        raise NotImplementedError
+
+    def compact_changes(self, keep):
+        """Shrink the change log and return ``(deleted, min_since)``.
+
+        Entries superseded by a later change to the same row are deleted,
+        then all but about the newest ``keep``; tokens below the returned
+        ``min_since`` are expired from then on.
+        """
+        raise NotImplementedError
+
+    def summary(self, created_from=None, created_to=None):
+        raise NotImplementedError
+
+    def tenant_ids(self, template):
+        """Tenant ids of the shards that already exist next to this one under ``template``."""
+        raise NotImplementedError
+
+    def set_max_connections(self, max_connections):
+        raise NotImplementedError
+
+    def stats(self):
+        raise NotImplementedError
+
+    def close(self):
+        raise NotImplementedError
+
+
+def _template_ids(template, names):
+    pattern = re.escape(template).replace(re.escape('{betrieb_id}'), r'(\d+)')
+    return {int(m.group(1)) for name in names for m in [re.fullmatch(pattern, name)] if m}
+
+
+class SQLRepository(Repository):
+    """Queries shared by the SQL backends.
+
+    Subclasses provide ``connection()``, ``transaction(work)`` (run
+    ``work(cursor)`` in a write transaction and commit) and ``_insert``, and
+    set ``PARAM`` to the driver's placeholder.
+    """
+
+    PARAM = '?'
+    LOCK_ROWS = ''
+
+    def _placeholders(self, count):
+        return ', '.join([self.PARAM] * count)
+
+    def _insert_sql(self, table):
+        columns = INSERT_COLUMNS[table]
+        return f"INSERT INTO {table} ({', '.join(columns)}) VALUES ({self._placeholders(len(columns))})"
+
+    def _cursor(self, conn, streaming=False):
+        return conn.cursor()
+
+    def insert(self, table, rows):
+        if not rows:
+            return []
+        return self.transaction(lambda c: self._insert(c, table, rows))
+
+    def insert_products(self, rows):
+        def work(c):
+            skus = list({values[1] for _, values in rows})
+            taken = set()
+            for start in range(0, len(skus), 500):
+                chunk = skus[start:start + 500]
+                c.execute(f"SELECT sku FROM products WHERE sku IN ({self._placeholders(len(chunk))})", chunk)
+                taken.update(row[0] for row in c.fetchall())
+
+            accepted, rejected = [], {}
+            for index, values in rows:
+                if values[1] in taken:
+                    rejected[index] = f"SKU already exists: {values[1]}"
+                else:
+                    taken.add(values[1])
+                    accepted.append((index, values))
+            ids = self._insert(c, 'products', [values for _, values in accepted]) if accepted else []
+            return dict(zip((index for index, _ in accepted), ids)), rejected
+
+        return self.transaction(work)
+
+    def place_order(self, customer_id, product_id, quantity, created_at, created_ts):
+        p = self.PARAM
+
+        def work(c):
+            # Reserve stock first; the WHERE clause makes the check and decrement one atomic step
+            c.execute(f'UPDATE products SET stock = stock - {p} WHERE id = {p} AND stock >= {p} RETURNING price, stock',
+                      (quantity, product_id, quantity))
+            row = c.fetchone()
+            if row is None:
+                c.execute(f'SELECT 1 FROM products WHERE id = {p}', (product_id,))
+                raise OrderRejected("Insufficient stock" if c.fetchone() is not None else "Product not found")
+            total_price = float(row[0]) * quantity
+            order_id, = self._insert(c, 'orders', [(customer_id, product_id, quantity, total_price, "pending",
+                                                    created_at, created_ts)])
+            c.execute(self._insert_sql('invoices'), (order_id, total_price, "pending", created_at, created_ts))
+            return order_id, total_price, row[1]
+
+        return self.transaction(work)
+
+    def place_orders(self, rows, created_at, created_ts):
+        def work(c):
+            product_ids = list({values[1] for _, values in rows})
+            products = {}
+            for start in range(0, len(product_ids), 500):
+                chunk = product_ids[start:start + 500]
+                c.execute(f"SELECT id, price, stock FROM products WHERE id IN ({self._placeholders(len(chunk))})"
+                          f"{self.LOCK_ROWS}", chunk)
+                products.update((row[0], [row[1], row[2]]) for row in c.fetchall())
+
+            accepted, totals, rejected = [], {}, {}
+            for index, (customer_id, product_id, quantity) in rows:
+                product = products.get(product_id)
+                if product is None:
+                    rejected[index] = "Product not found"
+                elif product[1] < quantity:
+                    rejected[index] = "Insufficient stock"
+                else:
+                    product[1] -= quantity
+                    totals[index] = product[0] * quantity
+                    accepted.append((index, (customer_id, product_id, quantity, totals[index], "pending",
+                                             created_at, created_ts)))
+
+            order_ids = self._insert(c, 'orders', [values for _, values in accepted]) if accepted else []
+            ids = dict(zip((index for index, _ in accepted), order_ids))
+            c.executemany(self._insert_sql('invoices'),
+                          [(ids[index], totals[index], "pending", created_at, created_ts) for index, _ in accepted])
+            touched = {values[1] for _, values in accepted}
+            c.executemany(f'UPDATE products SET stock = {self.PARAM} WHERE id = {self.PARAM}',
+                          [(products[product_id][1], product_id) for product_id in touched])
+            results = {index: {"id": ids[index], "total": totals[index]} for index, _ in accepted}
+            return results, rejected, {product_id: products[product_id][1] for product_id in touched}
+
+        return self.transaction(work)
+
+    def _list_query(self, table, columns, after_id=None, status=None, created_from=None, created_to=None):
+        """Build the keyset-ordered SELECT shared by paged and streamed list reads."""
+        clauses, params = [], []
+        for clause, value in (('id >', after_id), ('status =', status), ('created_ts >=', created_from),
+                              ('created_ts <', created_to)):
+            if value is not None:
+                clauses.append(f'{clause} {self.PARAM}')
+                params.append(value)
+        sql = f"SELECT {', '.join(columns)} FROM {table}"
+        if clauses:
+            sql += ' WHERE ' + ' AND '.join(clauses)
+        return sql + ' ORDER BY id', params
+
+    def list_page(self, table, columns, limit, **filters):
+        sql, params = self._list_query(table, columns, **filters)
+        with self.connection() as conn:
+            c = conn.cursor()
+            c.execute(f'{sql} LIMIT {self.PARAM}', params + [limit])
+            return [dict(zip(columns, row)) for row in c.fetchall()]
+
+    def iter_rows(self, table, columns, batch_size, **filters):
+        sql, params = self._list_query(table, columns, **filters)
+        with self.connection() as conn:
+            c = self._cursor(conn, streaming=True)
+            c.execute(sql, params)
+            while True:
+                batch = c.fetchmany(batch_size)
+                if not batch:
+                    break
+                for row in batch:
+                    yield dict(zip(columns, row))
+
+    def get_product(self, product_id=None, sku=None):
+        column, value = ('sku', sku) if sku is not None else ('id', product_id)
+        with self.connection() as conn:
+            c = conn.cursor()
+            c.execute(f"SELECT {', '.join(LIST_COLUMNS['products'])} FROM products WHERE {column} = {self.PARAM}",
+                      (value,))
+            row = c.fetchone()
+        return None if row is None else dict(zip(LIST_COLUMNS['products'], row))
+
+    @staticmethod
+    def _check_since(c, since):
+        c.execute('SELECT min_since FROM change_retention')
+        min_since = c.fetchone()[0]
+        if since < min_since:
+            raise ChangeTokenExpired(since, min_since)
+
+    def _compact_superseded(self, c):
+        c.execute('DELETE FROM changes WHERE seq NOT IN (SELECT MAX(seq) FROM changes GROUP BY table_name, row_id)')
+        return c.rowcount
+
+    def table_version(self, table):
+        # Seqs commit in order with a single writer; an emptied log falls back to min_since, which is
+        # at least every seq compaction removed, so the version never goes back to an earlier value
+        with self.connection() as conn:
+            c = conn.cursor()
+            c.execute(f'SELECT COALESCE((SELECT MAX(seq) FROM changes WHERE table_name = {self.PARAM}), '
+                      f'(SELECT min_since FROM change_retention))', (table,))
+            return str(c.fetchone()[0])
+
+    def compact_changes(self, keep):
+        p = self.PARAM
+
+        def work(c):
+            deleted = self._compact_superseded(c)
+            c.execute(f'SELECT seq FROM changes ORDER BY seq DESC LIMIT 1 OFFSET {p}', (keep,))
+            row = c.fetchone()
+            if row is not None:
+                c.execute(f'DELETE FROM changes WHERE seq <= {p}', (row[0],))
+                deleted += c.rowcount
+                c.execute(f'UPDATE change_retention SET min_since = {p}', (row[0],))
+            c.execute('SELECT min_since FROM change_retention')
+            return deleted, c.fetchone()[0]
+
+        return self.transaction(work)
+
+    def changes_since(self, since, tables, limit):
+        with self.connection() as conn:
+            c = conn.cursor()
+            self._check_since(c, since)
+            c.execute(f"SELECT table_name, row_id, MAX(seq) AS last_seq FROM changes "
+                      f"WHERE seq > {self.PARAM} AND table_name IN ({self._placeholders(len(tables))}) "
+                      f"GROUP BY table_name, row_id ORDER BY last_seq LIMIT {self.PARAM}", [since] + tables + [limit])
+            changed = c.fetchall()
+            changes = self._changed_rows(c, tables, changed)
+        return (changed[-1][2] if changed else since), len(changed), changes
+
+    def _changed_rows(self, c, tables, changed):
+        """Read the current state of the ``(table_name, row_id, ...)`` rows in ``changed``, per table."""
+        changes = {}
+        for table in tables:
+            ids = [row[1] for row in changed if row[0] == table]
+            columns = LIST_COLUMNS[table]
+            rows = {}
+            for start in range(0, len(ids), 500):
+                chunk = ids[start:start + 500]
+                c.execute(f"SELECT {', '.join(columns)} FROM {table} WHERE id IN ({self._placeholders(len(chunk))})",
+                          chunk)
+                rows.update((row[0], dict(zip(columns, row))) for row in c.fetchall())
+            changes[table] = [rows[row_id] for row_id in ids if row_id in rows]
+        return changes
+
+    def summary(self, created_from=None, created_to=None):
+        where, params = '', []
+        if created_from is not None:
+            where += f' AND created_ts >= {self.PARAM}'
+            params.append(created_from)
+        if created_to is not None:
+            where += f' AND created_ts < {self.PARAM}'
+            params.append(created_to)
+        with self.connection() as conn:
+            c = conn.cursor()
+            c.execute('SELECT COUNT(*) FROM customers')
+            customers = c.fetchone()[0]
+            c.execute('SELECT COUNT(*) FROM products')
+            products = c.fetchone()[0]
+            c.execute(f'SELECT status, COUNT(*), SUM(total_price) FROM orders WHERE 1 = 1{where} GROUP BY status',
+                      params)
+            by_status = {status: {'orders': count, 'revenue': round(revenue or 0.0, 2)}
+                         for status, count, revenue in c.fetchall()}
+        return {'customers': customers, 'products': products,
+                'orders': sum(s['orders'] for s in by_status.values()),
+                'revenue': round(sum(s['revenue'] for s in by_status.values()), 2), 'by_status': by_status}
+
+
+class SQLiteRepository(SQLRepository):
+    """The SQLite file at ``path``, through a ConnectionPool.
+
+    Writes take the database lock up front (``BEGIN IMMEDIATE``) so reads
+    inside a write cannot be invalidated by another writer; SQLITE_BUSY is
+    retried with jittered exponential backoff.
+    """
+
+    def __init__(self, path, max_connections=8):
+        self.location = path
+        self.pool = ConnectionPool(path, max_connections)
+
+    def connection(self):
+        return self.pool.connection()
+
+    def transaction(self, work, retries=WRITE_RETRIES, backoff=WRITE_RETRY_BACKOFF):
+        for attempt in range(retries + 1):
+            try:
+                with self.pool.connection() as conn:
+                    conn.execute('BEGIN IMMEDIATE')
+                    result = work(conn.cursor())
+                    conn.commit()
+                    return result
+            except sqlite3.OperationalError as e:
+                if attempt == retries or not _is_busy(e):
+                    raise
+            time.sleep(backoff * (2 ** attempt) * (0.5 + random.random()))
+
+    def _insert(self, c, table, rows):
+        # Rowids are assigned consecutively because the caller holds the write lock
+        if len(rows) == 1:
+            c.execute(self._insert_sql(table), rows[0])
+            return [c.lastrowid]
+        c.executemany(self._insert_sql(table), rows)
+        last_id = c.execute('SELECT last_insert_rowid()').fetchone()[0]
+        return list(range(last_id - len(rows) + 1, last_id + 1))
+
+    def migrate(self):
+        with self.pool.connection() as conn:
+            return migrate(conn)
+
+    def tenant_ids(self, template):
+        return _template_ids(template, glob.glob(template.format(betrieb_id='*')))
+
+    def set_max_connections(self, max_connections):
+        self.pool.max_connections = max(self.pool.max_connections, max_connections)
+
+    def stats(self):
+        return self.pool.stats()
+
+    def close(self):
+        self.pool.close_all()
+
+
+# The final SQLite schema (after MIGRATIONS) in PostgreSQL types; one list of
+# statements per schema version. Change seqs are assigned at insert time, so
+# they can commit out of order; changes also record their transaction id,
+# which PostgresRepository.changes_since pages by instead.
+POSTGRES_MIGRATIONS = [
+    [
+        'CREATE TABLE customers (id BIGSERIAL PRIMARY KEY, name TEXT, email TEXT, phone TEXT, '
+        'created_at TEXT, created_ts BIGINT)',
+        'CREATE TABLE products (id BIGSERIAL PRIMARY KEY, name TEXT, sku TEXT, price DOUBLE PRECISION, '
+        'stock INTEGER, created_at TEXT, created_ts BIGINT)',
+        'CREATE TABLE orders (id BIGSERIAL PRIMARY KEY, customer_id BIGINT, product_id BIGINT, quantity INTEGER, '
+        'total_price DOUBLE PRECISION, status TEXT, created_at TEXT, created_ts BIGINT)',
+        'CREATE TABLE invoices (id BIGSERIAL PRIMARY KEY, order_id BIGINT, amount DOUBLE PRECISION, status TEXT, '
+        'created_at TEXT, created_ts BIGINT)',
+        'CREATE UNIQUE INDEX idx_products_sku ON products(sku)',
+        'CREATE INDEX idx_orders_customer_id ON orders(customer_id)',
+        'CREATE INDEX idx_orders_product_id ON orders(product_id)',
+        'CREATE INDEX idx_orders_status_created ON orders(status, created_ts)',
+        'CREATE INDEX idx_invoices_order_id ON invoices(order_id)',
+        'CREATE TABLE changes (seq BIGSERIAL PRIMARY KEY, table_name TEXT NOT NULL, row_id BIGINT NOT NULL, '
+        'op TEXT NOT NULL, txid xid8 NOT NULL DEFAULT pg_current_xact_id())',
+        'CREATE INDEX idx_changes_table_seq ON changes(table_name, seq)',
+        'CREATE INDEX idx_changes_txid ON changes(txid)',
+        'CREATE TABLE change_retention (min_since BIGINT NOT NULL)',
+        'INSERT INTO change_retention (min_since) VALUES (0)',
+        '''CREATE FUNCTION track_change() RETURNS trigger LANGUAGE plpgsql AS $$
+           BEGIN
+               INSERT INTO changes (table_name, row_id, op) VALUES (TG_TABLE_NAME, NEW.id, lower(TG_OP));
+               RETURN NULL;
+           END $$''',
+    ] + [f'CREATE TRIGGER track_{table} AFTER INSERT OR UPDATE ON {table} '
+         f'FOR EACH ROW EXECUTE FUNCTION track_change()' for table in CHANGE_TABLES],
+]
+
+
+class PostgresRepository(SQLRepository):
+    """A schema in a PostgreSQL database, through a psycopg 3 connection pool.
+
+    Every pooled connection has ``search_path`` set to ``schema``, so each
+    shard is one schema of the same database. Streamed reads use a
+    server-side (named) cursor, so exports fetch ``batch_size`` rows at a
+    time from the server, and inserts get their ids back with RETURNING.
+    Requires ``pip install "psycopg[binary,pool]"``.
+    """
+
+    PARAM = '%s'
+    LOCK_ROWS = ' FOR UPDATE'
+
+    def __init__(self, schema='public', max_connections=8, dsn=None, timeout=30.0):
+        try:
+            from psycopg_pool import ConnectionPool as PostgresPool
+        except ImportError:
+            raise RuntimeError('The postgres backend needs psycopg: pip install "psycopg[binary,pool]"') from None
+        if not re.fullmatch(r'[a-z_][a-z0-9_]*', schema):
+            raise ValueError(f'Invalid schema name: {schema!r}')
+        self.location = schema
+        self.pool = PostgresPool(dsn, min_size=1, max_size=max_connections, timeout=timeout, name=f'erp-{schema}',
+                                 kwargs={'options': f'-c search_path={schema}'}, open=True)
+
+    @contextmanager
+    def connection(self):
+        """Check out a connection; the transaction commits on a clean exit and rolls back on error."""
+        started = time.perf_counter()
+        with self.pool.connection() as conn:
+            acquired = time.perf_counter()
+            DB_POOL_WAIT.observe(acquired - started)
+            try:
+                yield conn
+            finally:
+                record_phase('db', time.perf_counter() - acquired)
+
+    def transaction(self, work):
+        with self.connection() as conn:
+            return work(conn.cursor())
+
+    def _cursor(self, conn, streaming=False):
+        return conn.cursor(name=f'erp_stream_{id(conn):x}') if streaming else conn.cursor()
+
+    def _insert(self, c, table, rows):
+        sql = self._insert_sql(table) + ' RETURNING id'
+        if len(rows) == 1:
+            c.execute(sql, rows[0])
+            return [c.fetchone()[0]]
+        c.executemany(sql, rows, returning=True)
+        ids = [c.fetchone()[0]]
+        while c.nextset():
+            ids.append(c.fetchone()[0])
+        return ids
+
+    def migrate(self):
+        with self.connection() as conn:
+            conn.execute(f'CREATE SCHEMA IF NOT EXISTS {self.location}')
+            conn.execute('CREATE TABLE IF NOT EXISTS schema_version (version INTEGER NOT NULL)')
+            # Serializes concurrent migrators; released when this transaction commits
+            conn.execute('LOCK TABLE schema_version IN EXCLUSIVE MODE')
+            row = conn.execute('SELECT version FROM schema_version').fetchone()
+            if row is None:
+                conn.execute('INSERT INTO schema_version (version) VALUES (0)')
+            version = 0 if row is None else row[0]
+            while version < len(POSTGRES_MIGRATIONS):
+                for statement in POSTGRES_MIGRATIONS[version]:
+                    conn.execute(statement)
+                version += 1
+            conn.execute('UPDATE schema_version SET version = %s', (version,))
+        return version
+
+    def changes_since(self, since, tables, limit):
+        """Page the change log by writing transaction instead of seq.
+
+        Only transactions older than the oldest one still running (the
+        snapshot's xmin) are read, since all of them have committed or
+        rolled back; so a seq committed late is never skipped. The token is
+        that xmin, or on a full page the last transaction id read, whose
+        rows are then sent again on the next call.
+        """
+        in_tables = self._placeholders(len(tables))
+        with self.connection() as conn:
+            c = conn.cursor()
+            self._check_since(c, since)
+            c.execute('SELECT pg_snapshot_xmin(pg_current_snapshot())::text::bigint')
+            xmin = c.fetchone()[0]
+            c.execute(f"SELECT table_name, row_id, MAX(txid)::text::bigint AS last_txid FROM changes "
+                      f"WHERE txid >= %s::text::xid8 AND txid < %s::text::xid8 AND table_name IN ({in_tables}) "
+                      f"GROUP BY table_name, row_id ORDER BY last_txid, MAX(seq) LIMIT %s",
+                      [since, xmin] + tables + [limit])
+            changed = c.fetchall()
+            token = xmin
+            if len(changed) == limit:
+                token = changed[-1][2]
+                if changed[0][2] == token:
+                    # one transaction fills the page: send all of it and move past it
+                    c.execute(f"SELECT table_name, row_id, MAX(txid)::text::bigint FROM changes "
+                              f"WHERE txid >= %s::text::xid8 AND txid < %s::text::xid8 AND table_name IN ({in_tables}) "
+                              f"GROUP BY table_name, row_id HAVING MAX(txid) = %s::text::xid8 ORDER BY MAX(seq)",
+                              [token, xmin] + tables + [token])
+                    changed = c.fetchall()
+                    token += 1
+            changes = self._changed_rows(c, tables, changed)
+        return max(token, since), len(changed), changes
+
+    def table_version(self, table):
+        # A seq can commit after a higher one, so MAX(seq) alone may not move; any commit either
+        # moves the snapshot's xmin or adds a row at or above it, so those are part of the version
+        with self.connection() as conn:
+            row = conn.execute(
+                'SELECT pg_snapshot_xmin(pg_current_snapshot())::text, '
+                'COALESCE((SELECT MAX(seq) FROM changes WHERE table_name = %s), '
+                '(SELECT min_since FROM change_retention)), '
+                '(SELECT COUNT(*) FROM changes WHERE table_name = %s '
+                'AND txid >= pg_snapshot_xmin(pg_current_snapshot()))', (table, table)).fetchone()
+        return '.'.join(map(str, row))
+
+    def compact_changes(self, keep):
+        # Retention counts transactions below xmin only, so nothing still running is expired
+        def work(c):
+            deleted = self._compact_superseded(c)
+            c.execute('SELECT txid::text::bigint FROM changes WHERE txid < pg_snapshot_xmin(pg_current_snapshot()) '
+                      'ORDER BY txid DESC LIMIT 1 OFFSET %s', (keep,))
+            row = c.fetchone()
+            if row is not None:
+                # page tokens are inclusive: keep that whole transaction and make it the oldest valid token
+                c.execute('DELETE FROM changes WHERE txid < %s::text::xid8', (row[0],))
+                deleted += c.rowcount
+                c.execute('UPDATE change_retention SET min_since = %s', (row[0],))
+            c.execute('SELECT min_since FROM change_retention')
+            return deleted, c.fetchone()[0]
+
+        return self.transaction(work)
+
+    def tenant_ids(self, template):
+        with self.connection() as conn:
+            names = [row[0] for row in conn.execute('SELECT schema_name FROM information_schema.schemata')]
+        return _template_ids(template, names)
+
+    def set_max_connections(self, max_connections):
+        if max_connections > self.pool.max_size:
+            self.pool.resize(self.pool.min_size, max_connections)
+
+    def stats(self):
+        stats = self.pool.get_stats()
+        return {
+            'waits': stats.get('requests_queued', 0),
+            'open_connections': stats.get('pool_size', 0),
+            'idle_connections': stats.get('pool_available', 0),
+            'max_connections': stats.get('pool_max', self.pool.max_size),
+        }
+
+    def close(self):
+        self.pool.close()
+
+
+REPOSITORIES = {
+    'sqlite': SQLiteRepository,
+    'postgres': PostgresRepository,
+}
+
+
+# ==================== CREDENTIAL STORE ====================
+
+AUTH_CACHE_SIZE = 1024
+AUTH_CACHE_TTL = 30.0
+
+
+def hash_password(password, n=2 ** 14, r=8, p=1):
+    """Hash ``password`` as ``scrypt$n$r$p$salt$hash`` for use in a HashedCredentialStore."""
+    salt = os.urandom(16)
+    digest = hashlib.scrypt(password.encode('utf-8'), salt=salt, n=n, r=r, p=p, dklen=32)
+    return f'scrypt${n}${r}${p}${salt.hex()}${digest.hex()}'
+
+
+class CredentialStore:
+    """Interface for username/password verification backends."""
+
+    def verify(self, username, password):
+        raise NotImplementedError
 
-init_db()
+
+class HashedCredentialStore(CredentialStore):
+    """Verifies passwords against a mapping of username to ``hash_password`` strings."""
+
+    # Verified against for unknown users so they cost the same as a wrong password
+    _DUMMY_HASH = 'scrypt$16384$8$1$00000000000000000000000000000000$' + '00' * 32
+
+    def __init__(self, password_hashes):
+        self.password_hashes = password_hashes
+
+    def verify(self, username, password):
+        stored = self.password_hashes.get(username)
+        _, n, r, p, salt, expected = (stored or self._DUMMY_HASH).split('$')
+        digest = hashlib.scrypt(password.encode('utf-8'), salt=bytes.fromhex(salt),
+                                n=int(n), r=int(r), p=int(p), dklen=len(expected) // 2)
+        return hmac.compare_digest(digest, bytes.fromhex(expected)) and stored is not None
+
+
+class VerifiedCredentialCache:
+    """Short-lived, size-bounded cache of Authorization headers that already verified.
+
+    Entries are keyed by the SHA-256 digest of the header, so neither the
+    header nor the password is kept in memory, and looking up a digest
+    reveals nothing about the secret through timing.
+    """
+
+    def __init__(self, max_entries=AUTH_CACHE_SIZE, ttl=AUTH_CACHE_TTL):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+        self._hits = 0
+        self._misses = 0
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self._misses += 1
+                return None
+            if entry[0] <= time.monotonic():
+                del self._entries[key]
+                self._misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self._hits += 1
+            return entry[1]
+
+    def put(self, key, username):
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, username)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            return {'hits': self._hits, 'misses': self._misses, 'entries': len(self._entries)}
+
+
+credential_store = HashedCredentialStore(VALID_USERS)
+auth_cache = VerifiedCredentialCache()
+
+
+def verify_authorization(auth_header, cache=auth_cache):
+    """Return the username for a valid ``Basic`` Authorization header, else ``None``."""
+    started = time.perf_counter()
+    try:
+        return _verify_authorization(auth_header, cache)
+    finally:
+        record_phase('auth', time.perf_counter() - started)
+
+
+def _verify_authorization(auth_header, cache):
+    if not auth_header.startswith('Basic '):
+        return None
+
+    key = hashlib.sha256(auth_header.encode('utf-8')).digest()
+    if cache is not None:
+        username = cache.get(key)
+        if username is not None:
+            return username
+
+    try:
+        # Decode base64 credentials
+        decoded_credentials = base64.b64decode(auth_header[6:], validate=True).decode('utf-8')
+        username, password = decoded_credentials.split(':', 1)
+    except ValueError:
+        return None
+
+    if not check_auth(username, password):
+        return None
+    if cache is not None:
+        cache.put(key, username)
+    return username
 
 
 # ==================== AUTHENTICATION DECORATOR ====================
 
 def check_auth(username, password):
     """Check if username/password combination is valid."""
-    return username in VALID_USERS and VALID_USERS[username] == password
+    return credential_store.verify(username, password)
 
 
 def authenticate():
@@ -62,36 +1282,41 @@ def authenticate():
 
 
 def requires_auth(f):
-    """Decorator to require basic authentication."""
+    """Decorator to require basic authentication; then routes the request to its tenant's shard."""
 
     @wraps(f)
     def decorated(*args, **kwargs):
-        auth = request.authorization
-        if not auth or not check_auth(auth.username, auth.password):
+        username = verify_authorization(request.headers.get('Authorization', ''))
+        if username is None:
             return authenticate()
+        try:
+            select_request_tenant(username, request.headers.get(TENANT_HEADER) or request.args.get('betrieb_id'))
+        except (UnknownTenant, TenantForbidden) as e:
+            return jsonify({'status': 'error', 'message': str(e)}), 400 if isinstance(e, UnknownTenant) else 403
         return f(*args, **kwargs)
 
     return decorated
 
 
-def check_soap_auth(soap_request):
-    """Extract and verify basic auth from SOAP request headers."""
-    auth_header = request.headers.get('Authorization', '')
+def requires_admin(f):
+    """Decorator to require basic authentication as one of ``ADMIN_USERS``."""
 
-    if not auth_header.startswith('Basic '):
-        return False, None
+    @wraps(f)
+    def decorated(*args, **kwargs):
+        username = verify_authorization(request.headers.get('Authorization', ''))
+        if username is None:
+            return authenticate()
+        if username not in current_app.config['ADMIN_USERS']:
+            return jsonify({'status': 'error', 'message': 'Admin access required'}), 403
+        return f(*args, **kwargs)
 
-    try:
-        # Decode base64 credentials
-        encoded_credentials = auth_header[6:]
-        decoded_credentials = base64.b64decode(encoded_credentials).decode('utf-8')
-        username, password = decoded_credentials.split(':', 1)
+    return decorated
 
-        if check_auth(username, password):
-            return True, username
-        return False, None
-    except:
-        return False, None
+
+def check_soap_auth():
+    """Extract and verify basic auth from SOAP request headers."""
+    username = verify_authorization(request.headers.get('Authorization', ''))
+    return username is not None, username
 
 
 # ==================== WSDL & SOAP DEFINITIONS ====================
@@ -152,7 +1377,14 @@ WSDL_CONTENT = '''<?xml version="1.0" encoding="UTF-8"?>
         <part name="result" type="xsd:string"/>
     </message>
 
-    <message name="GetCustomersRequest"/>
+    <message name="GetCustomersRequest">
+        <part name="after_id" type="xsd:int"/>
+        <part name="limit" type="xsd:int"/>
+        <part name="fields" type="xsd:string"/>
+        <part name="created_from" type="xsd:string"/>
+        <part name="created_to" type="xsd:string"/>
+        <part name="stream" type="xsd:boolean"/>
+    </message>
     <message name="GetCustomersResponse">
         <part name="customers" type="xsd:string"/>
     </message>
@@ -167,7 +1399,14 @@ WSDL_CONTENT = '''<?xml version="1.0" encoding="UTF-8"?>
         <part name="result" type="xsd:string"/>
     </message>
 
-    <message name="GetProductsRequest"/>
+    <message name="GetProductsRequest">
+        <part name="after_id" type="xsd:int"/>
+        <part name="limit" type="xsd:int"/>
+        <part name="fields" type="xsd:string"/>
+        <part name="created_from" type="xsd:string"/>
+        <part name="created_to" type="xsd:string"/>
+        <part name="stream" type="xsd:boolean"/>
+    </message>
     <message name="GetProductsResponse">
         <part name="products" type="xsd:string"/>
     </message>
@@ -181,11 +1420,49 @@ WSDL_CONTENT = '''<?xml version="1.0" encoding="UTF-8"?>
         <part name="result" type="xsd:string"/>
     </message>
 
-    <message name="GetOrdersRequest"/>
+    <message name="GetOrdersRequest">
+        <part name="after_id" type="xsd:int"/>
+        <part name="limit" type="xsd:int"/>
+        <part name="fields" type="xsd:string"/>
+        <part name="created_from" type="xsd:string"/>
+        <part name="created_to" type="xsd:string"/>
+        <part name="status" type="xsd:string"/>
+        <part name="stream" type="xsd:boolean"/>
+    </message>
     <message name="GetOrdersResponse">
         <part name="orders" type="xsd:string"/>
     </message>
 
+    <message name="AddCustomersBatchRequest">
+        <part name="customers" type="xsd:string"/>
+    </message>
+    <message name="AddCustomersBatchResponse">
+        <part name="result" type="xsd:string"/>
+    </message>
+
+    <message name="AddProductsBatchRequest">
+        <part name="products" type="xsd:string"/>
+    </message>
+    <message name="AddProductsBatchResponse">
+        <part name="result" type="xsd:string"/>
+    </message>
+
+    <message name="CreateOrdersBatchRequest">
+        <part name="orders" type="xsd:string"/>
+    </message>
+    <message name="CreateOrdersBatchResponse">
+        <part name="result" type="xsd:string"/>
+    </message>
+
+    <message name="GetChangesRequest">
+        <part name="since" type="xsd:int"/>
+        <part name="limit" type="xsd:int"/>
+        <part name="tables" type="xsd:string"/>
+    </message>
+    <message name="GetChangesResponse">
+        <part name="changes" type="xsd:string"/>
+    </message>
+
     <portType name="ERPPortType">
         <operation name="AddCustomer">
             <input message="tns:AddCustomerRequest"/>
@@ -211,6 +1488,22 @@ WSDL_CONTENT = '''<?xml version="1.0" encoding="UTF-8"?>
             <input message="tns:GetOrdersRequest"/>
             <output message="tns:GetOrdersResponse"/>
         </operation>
+        <operation name="AddCustomersBatch">
+            <input message="tns:AddCustomersBatchRequest"/>
+            <output message="tns:AddCustomersBatchResponse"/>
+        </operation>
+        <operation name="AddProductsBatch">
+            <input message="tns:AddProductsBatchRequest"/>
+            <output message="tns:AddProductsBatchResponse"/>
+        </operation>
+        <operation name="CreateOrdersBatch">
+            <input message="tns:CreateOrdersBatchRequest"/>
+            <output message="tns:CreateOrdersBatchResponse"/>
+        </operation>
+        <operation name="GetChanges">
+            <input message="tns:GetChangesRequest"/>
+            <output message="tns:GetChangesResponse"/>
+        </operation>
     </portType>
 
     <binding name="ERPBinding" type="tns:ERPPortType">
@@ -245,6 +1538,26 @@ WSDL_CONTENT = '''<?xml version="1.0" encoding="UTF-8"?>
             <input><soap:body use="literal"/></input>
             <output><soap:body use="literal"/></output>
         </operation>
+        <operation name="AddCustomersBatch">
+            <soap:operation soapAction="AddCustomersBatch"/>
+            <input><soap:body use="literal"/></input>
+            <output><soap:body use="literal"/></output>
+        </operation>
+        <operation name="AddProductsBatch">
+            <soap:operation soapAction="AddProductsBatch"/>
+            <input><soap:body use="literal"/></input>
+            <output><soap:body use="literal"/></output>
+        </operation>
+        <operation name="CreateOrdersBatch">
+            <soap:operation soapAction="CreateOrdersBatch"/>
+            <input><soap:body use="literal"/></input>
+            <output><soap:body use="literal"/></output>
+        </operation>
+        <operation name="GetChanges">
+            <soap:operation soapAction="GetChanges"/>
+            <input><soap:body use="literal"/></input>
+            <output><soap:body use="literal"/></output>
+        </operation>
     </binding>
 
     <service name="ERPService">
@@ -256,668 +1569,1547 @@ WSDL_CONTENT = '''<?xml version="1.0" encoding="UTF-8"?>
 '''
 
 
+# ==================== CHANGE VERSIONS ====================
+
+class TableVersions:
+    """ETags per table, derived from the shard's change log.
+
+    The version is read from the database on every call, so a write made by
+    another worker process (or directly in the database) changes the ETag
+    too; the shard's location is part of the ETag, so tenants never share one.
+    """
+
+    def __init__(self, repository):
+        self.repository = repository
+        self.shard_id = hashlib.sha256(repository.location.encode('utf-8')).hexdigest()[:8]
+
+    def get(self, table):
+        return self.repository.table_version(table)
+
+    def etag(self, table):
+        return f'{self.shard_id}-{table}-{self.get(table)}'
+
+
+table_versions = ShardAttribute('table_versions')
+
+
+# ==================== CHANGE FEED ====================
+
+CHANGE_FEED_SIZE = 10000
+SSE_HEARTBEAT = 15.0
+
+
+class ChangeFeed:
+    """Bounded in-process log of row changes, fanned out to Server-Sent Events clients.
+
+    Each change is serialized once when published; subscribers only wait on
+    a condition and copy the already-encoded events after their last seen
+    sequence number, so connected clients never cause database queries.
+    """
+
+    def __init__(self, max_events=CHANGE_FEED_SIZE):
+        self.seq = 0
+        self._cond = threading.Condition()
+        self._events = deque(maxlen=max_events)
+
+    def publish(self, table, op, row):
+        with self._cond:
+            self.seq += 1
+            self._events.append((self.seq, json.dumps({"seq": self.seq, "table": table, "op": op, "row": row})))
+            self._cond.notify_all()
+
+    def wait(self, after_seq, timeout):
+        """Return events newer than ``after_seq``, waiting up to ``timeout`` for one.
+
+        Returns ``None`` when events after ``after_seq`` were already dropped
+        from the log, in which case the client has to reload.
+        """
+        with self._cond:
+            if self.seq <= after_seq:
+                self._cond.wait(timeout)
+            if not self._events or self.seq <= after_seq:
+                return []
+            if self._events[0][0] > after_seq + 1:
+                return None
+            skip = len(self._events) - (self.seq - after_seq)
+            return [self._events[i] for i in range(skip, len(self._events))]
+
+
+change_feed = ShardAttribute('change_feed')
+
+
+def sse_stream(last_seq=None):
+    """Yield SSE frames for changes after ``last_seq`` (``None`` starts from now)."""
+    yield 'retry: 3000\n\n'
+    if last_seq is None or last_seq > change_feed.seq:
+        last_seq = change_feed.seq
+        yield f'event: hello\ndata: {json.dumps({"seq": last_seq})}\n\n'
+    while True:
+        events = change_feed.wait(last_seq, SSE_HEARTBEAT)
+        if events is None:
+            last_seq = change_feed.seq
+            yield f'event: reset\ndata: {json.dumps({"seq": last_seq})}\n\n'
+        elif not events:
+            yield ': keepalive\n\n'
+        else:
+            last_seq = events[-1][0]
+            yield ''.join(f'id: {seq}\nevent: change\ndata: {payload}\n\n' for seq, payload in events)
+
+
+# ==================== PRODUCT CACHE ====================
+
+PRODUCT_CACHE_SIZE = 4096
+PRODUCT_CACHE_TTL = 10.0
+
+
+class ProductCache:
+    """Read-through cache of product rows (by id and SKU) and serialized product lists.
+
+    Rows live in a size-bounded LRU with a TTL. Every product write bumps
+    ``version``; the TTL bounds staleness from writers in other processes.
+    List responses are stored with the products table version from the
+    change log (see TableVersions) and only served while it is current, so
+    a list is re-queried and re-encoded only after the catalog actually
+    changed, whichever process changed it.
+    """
+
+    def __init__(self, max_entries=PRODUCT_CACHE_SIZE, ttl=PRODUCT_CACHE_TTL, max_responses=64):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.max_responses = max_responses
+        self.version = 0
+        self._lock = threading.Lock()
+        self._rows = OrderedDict()
+        self._skus = {}
+        self._responses = OrderedDict()
+        self._counters = {'hits': 0, 'misses': 0, 'response_hits': 0, 'response_misses': 0, 'evictions': 0}
+
+    def get(self, product_id=None, sku=None):
+        with self._lock:
+            if sku is not None:
+                product_id = self._skus.get(sku)
+            entry = self._rows.get(product_id)
+            if entry is not None and entry[0] > time.monotonic():
+                self._rows.move_to_end(product_id)
+                self._counters['hits'] += 1
+                return entry[1]
+            self._counters['misses'] += 1
+            return None
+
+    def put(self, row, version):
+        """Cache ``row`` unless a write happened since ``version`` was read."""
+        with self._lock:
+            if version != self.version:
+                return
+            self._rows[row['id']] = (time.monotonic() + self.ttl, row)
+            self._rows.move_to_end(row['id'])
+            self._skus[row['sku']] = row['id']
+            while len(self._rows) > self.max_entries:
+                _, (_, evicted) = self._rows.popitem(last=False)
+                self._skus.pop(evicted['sku'], None)
+                self._counters['evictions'] += 1
+
+    def get_response(self, key, version):
+        with self._lock:
+            entry = self._responses.get(key)
+            if entry is not None and entry[0] == version:
+                self._responses.move_to_end(key)
+                self._counters['response_hits'] += 1
+                return entry[1]
+            self._counters['response_misses'] += 1
+            return None
+
+    def put_response(self, key, version, payload):
+        with self._lock:
+            self._responses[key] = (version, payload)
+            self._responses.move_to_end(key)
+            while len(self._responses) > self.max_responses:
+                self._responses.popitem(last=False)
+
+    def invalidate(self, *product_ids):
+        """Drop the given products (and every cached list) after a write."""
+        with self._lock:
+            self.version += 1
+            self._responses.clear()
+            for product_id in product_ids:
+                entry = self._rows.pop(product_id, None)
+                if entry is not None:
+                    self._skus.pop(entry[1]['sku'], None)
+
+    def stats(self):
+        with self._lock:
+            return dict(self._counters, entries=len(self._rows), responses=len(self._responses),
+                        version=self.version)
+
+
+product_cache = ShardAttribute('product_cache')
+
+
+# ==================== GROUP COMMIT ====================
+
+WRITE_BATCH_SIZE = 256
+
+
+class WriteBatcher:
+    """Optional group commit for add_customer and create_order.
+
+    Callers queue a write and wait on a Future. One writer thread per shard
+    takes the first pending write, keeps collecting until ``window``
+    seconds have passed or ``max_items`` writes are queued, and commits
+    each kind in a single transaction, then resolves every caller's future
+    with its own result. ``window=0`` adds no delay and only groups writes
+    that queued up while the previous commit ran.
+    """
+
+    def __init__(self, shard, window=0.002, max_items=WRITE_BATCH_SIZE):
+        self.shard = shard
+        self.window = window
+        self.max_items = max_items
+        self._queue = queue.SimpleQueue()
+        self._lock = threading.Lock()
+        self._thread = None
+        self._batches = 0
+        self._items = 0
+
+    def submit(self, table, values):
+        """Queue an insert into ``table`` ('customers' or 'orders') and return its Future."""
+        future = Future()
+        self._queue.put((table, values, future))
+        if self._thread is None:
+            with self._lock:
+                if self._thread is None:
+                    self._thread = threading.Thread(target=self._run, name=f'write-batcher-{self.shard.name}',
+                                                    daemon=True)
+                    self._thread.start()
+        return future
+
+    def _run(self):
+        _tenant.shard = self.shard  # the caches and change feed of this shard
+        while True:
+            item = self._queue.get()
+            batch = []
+            deadline = time.monotonic() + self.window
+            while item is not None:
+                batch.append(item)
+                if len(batch) >= self.max_items:
+                    break
+                try:
+                    remaining = deadline - time.monotonic()
+                    item = self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait()
+                except queue.Empty:
+                    break
+            if batch:
+                self._flush(batch)
+            if item is None:
+                return
+
+    def _flush(self, batch):
+        created_at, created_ts = _now()
+        for table, commit in (('customers', self._commit_customers), ('orders', self._commit_orders)):
+            writes = [(values, future) for kind, values, future in batch if kind == table]
+            if not writes:
+                continue
+            try:
+                results = commit([values for values, _ in writes], created_at, created_ts)
+            except Exception as e:
+                for _, future in writes:
+                    future.set_exception(e)
+                continue
+            for (_, future), result in zip(writes, results):
+                future.set_result(result)
+        with self._lock:
+            self._batches += 1
+            self._items += len(batch)
+
+    def _commit_customers(self, rows, created_at, created_ts):
+        rows = [(index, values + (created_at, created_ts)) for index, values in enumerate(rows)]
+        ids = dict(enumerate(self.shard.repository.insert('customers', [values for _, values in rows])))
+        _customers_added(rows, ids)
+        return [{"status": "success", "id": ids[index], "message": "Customer added"} for index, _ in rows]
+
+    def _commit_orders(self, rows, created_at, created_ts):
+        rows = list(enumerate(rows))
+        results, rejected, stocks = self.shard.repository.place_orders(rows, created_at, created_ts)
+        if results:
+            _orders_placed(dict(rows), results, stocks)
+        return [{"status": "success", "id": results[index]["id"], "message": "Order created",
+                 "total": results[index]["total"]} if index in results
+                else {"status": "error", "message": rejected[index]} for index, _ in rows]
+
+    def stats(self):
+        with self._lock:
+            return {'batches': self._batches, 'items': self._items, 'queued': self._queue.qsize()}
+
+    def close(self):
+        """Commit what is queued and stop the writer thread."""
+        with self._lock:
+            thread, self._thread = self._thread, None
+        if thread is not None:
+            self._queue.put(None)
+            thread.join()
+
+
+# ==================== STORAGE ROUTER ====================
+
+SHARD_PATH_TEMPLATE = 'erp_tenant_{betrieb_id}.db'
+SHARD_SCHEMA_TEMPLATE = 'tenant_{betrieb_id}'
+TENANT_HEADER = 'X-Betrieb-ID'
+
+
+class UnknownTenant(ValueError):
+    pass
+
+
+class TenantForbidden(PermissionError):
+    pass
+
+
+class Shard:
+    """One tenant's repository with the caches and change feed derived from its rows."""
+
+    def __init__(self, name, repository):
+        self.name = name
+        self.repository = repository
+        self.table_versions = TableVersions(repository)
+        self.change_feed = ChangeFeed()
+        self.product_cache = ProductCache()
+        self.write_batcher = None
+
+
+class StorageRouter:
+    """Maps a ``betrieb_id`` to its own database, so tenants do not share a write lock.
+
+    Requests without a tenant use the default shard at ``default_location``.
+    Tenant shards live at ``location_template`` (a SQLite file, or a schema
+    with the postgres backend). Existing shards are opened on first use;
+    a new one is only created and migrated through ``create_tenant`` (the
+    admin API or the ``create-tenant`` command), or on demand for ids
+    allow-listed in ``tenants``, which also rejects every other id. ``options`` are passed to
+    the ``backend`` repository class (e.g. ``dsn`` for postgres). With
+    ``batch_window`` set, every shard gets a WriteBatcher.
+    """
+
+    def __init__(self, default_location=DB_PATH, location_template=SHARD_PATH_TEMPLATE, tenants=None,
+                 max_connections=8, backend='sqlite', batch_window=None, batch_size=WRITE_BATCH_SIZE, **options):
+        if backend not in REPOSITORIES:
+            raise ValueError(f"Unknown storage backend: {backend!r} (expected one of {', '.join(REPOSITORIES)})")
+        self.location_template = location_template
+        self.tenants = None if tenants is None else frozenset(int(t) for t in tenants)
+        self.max_connections = max_connections
+        self.backend = backend
+        self.batch_window = batch_window
+        self.batch_size = batch_size
+        self.options = options
+        self.default = self._open('default', default_location)
+        self._lock = threading.Lock()
+        self._shards = {}
+
+    def _open(self, name, location):
+        shard = Shard(name, REPOSITORIES[self.backend](location, self.max_connections, **self.options))
+        if self.batch_window is not None:
+            shard.write_batcher = WriteBatcher(shard, self.batch_window, self.batch_size)
+        return shard
+
+    def shard(self, betrieb_id=None, create=False):
+        """Return ``betrieb_id``'s shard; UnknownTenant unless it exists, is allow-listed or ``create`` is set."""
+        if betrieb_id is None:
+            return self.default
+        shard = self._shards.get(betrieb_id)
+        if shard is not None:
+            return shard
+        if self.tenants is not None:
+            if betrieb_id not in self.tenants:
+                raise UnknownTenant(f'Unknown betrieb_id: {betrieb_id}')
+        elif not create and betrieb_id not in self.default.repository.tenant_ids(self.location_template):
+            raise UnknownTenant(f'Unknown betrieb_id: {betrieb_id}')
+        with self._lock:
+            shard = self._shards.get(betrieb_id)
+            if shard is None:
+                shard = self._open(str(betrieb_id), self.location_template.format(betrieb_id=betrieb_id))
+                shard.repository.migrate()
+                self._shards[betrieb_id] = shard
+        return shard
+
+    def tenant_ids(self):
+        """Configured tenants, or every tenant whose shard exists (plus any opened since)."""
+        if self.tenants is not None:
+            return sorted(self.tenants)
+        return sorted(self.default.repository.tenant_ids(self.location_template) | set(self._shards))
+
+    def loaded(self):
+        with self._lock:
+            return [self.default] + list(self._shards.values())
+
+    def set_max_connections(self, max_connections):
+        self.max_connections = max_connections
+        for shard in self.loaded():
+            shard.repository.set_max_connections(max_connections)
+
+    def close_all(self):
+        for shard in self.loaded():
+            if shard.write_batcher is not None:
+                shard.write_batcher.close()
+            shard.repository.close()
+
+
+storage = StorageRouter()
+_tenant = threading.local()
+
+
+def current_shard():
+    return getattr(_tenant, 'shard', None) or storage.default
+
+
+def parse_betrieb_id(value):
+    try:
+        betrieb_id = int(value)
+    except (TypeError, ValueError):
+        raise UnknownTenant(f'Invalid betrieb_id: {value!r}') from None
+    if betrieb_id <= 0:
+        raise UnknownTenant(f'Invalid betrieb_id: {value!r}')
+    return betrieb_id
+
+
+def select_tenant(betrieb_id):
+    """Route the rest of this thread's work (until ``reset_tenant``) to ``betrieb_id``'s existing shard."""
+    _tenant.shard = storage.shard(parse_betrieb_id(betrieb_id)) if betrieb_id not in (None, '') else None
+
+
+def create_tenant(betrieb_id):
+    """Create and migrate ``betrieb_id``'s shard (a no-op if it exists) and return it."""
+    return storage.shard(parse_betrieb_id(betrieb_id), create=True)
+
+
+def select_request_tenant(username, betrieb_id):
+    """Route an authenticated request by ``betrieb_id`` after checking ``username`` may use it.
+
+    With ``USER_TENANTS`` unset, every authenticated user may read and write
+    every tenant. With it set to ``{username: [betrieb_id, ...]}``, listed
+    users may only use their own tenants (not the default shard), other
+    users only the default shard; ``ADMIN_USERS`` may use any.
+    """
+    betrieb_id = None if betrieb_id in (None, '') else parse_betrieb_id(betrieb_id)
+    user_tenants = current_app.config['USER_TENANTS']
+    if user_tenants is not None and username not in current_app.config['ADMIN_USERS']:
+        allowed = user_tenants.get(username)
+        if allowed is None and betrieb_id is not None:
+            raise TenantForbidden(f'No access to betrieb_id {betrieb_id}')
+        if allowed is not None and betrieb_id not in allowed:
+            raise TenantForbidden('No access to this betrieb_id' if betrieb_id is not None
+                                  else f'{TENANT_HEADER} is required')
+    select_tenant(betrieb_id)
+
+
+def reset_tenant(exc=None):
+    _tenant.shard = None
+
+
+@contextmanager
+def use_tenant(betrieb_id):
+    """Run a block (e.g. a script or background job) against one tenant's shard."""
+    previous = getattr(_tenant, 'shard', None)
+    select_tenant(betrieb_id)
+    try:
+        yield current_shard()
+    finally:
+        _tenant.shard = previous
+
+
+def configure_storage(location=DB_PATH, location_template=SHARD_PATH_TEMPLATE, tenants=None, backend='sqlite',
+                      batch_window=None, batch_size=WRITE_BATCH_SIZE, **options):
+    """Replace the storage router (see StorageRouter for the arguments) and close the old one's connections."""
+    global storage
+    old = storage
+    storage = StorageRouter(location, location_template, tenants, old.max_connections, backend,
+                            batch_window, batch_size, **options)
+    old.close_all()
+
+
 # ==================== SOAP SERVICE IMPLEMENTATIONS ====================
 
+DEFAULT_PAGE_SIZE = 500
+MAX_PAGE_SIZE = 5000
+STREAM_BATCH_SIZE = 1000
+STREAM_MODES = ('json', 'ndjson')
+CHANGE_LOG_RETENTION = 100000
+
+# Columns returned by the list endpoints; anything else is rejected in ``fields``
+LIST_COLUMNS = {
+    'customers': ('id', 'name', 'email', 'phone'),
+    'products': ('id', 'name', 'sku', 'price', 'stock'),
+    'orders': ('id', 'customer_id', 'product_id', 'quantity', 'total_price', 'status'),
+}
+OPTIONAL_COLUMNS = ('created_at',)
+
+
+def _select_columns(table, fields):
+    """Resolve a ``fields`` projection to a column list. ``id`` is always kept as the cursor."""
+    if not fields:
+        return LIST_COLUMNS[table]
+    if isinstance(fields, str):
+        fields = [f.strip() for f in fields.split(',') if f.strip()]
+    allowed = LIST_COLUMNS[table] + OPTIONAL_COLUMNS
+    unknown = [f for f in fields if f not in allowed]
+    if unknown:
+        raise ValueError(f"Unknown field(s) for {table}: {', '.join(unknown)}")
+    return ('id',) + tuple(f for f in dict.fromkeys(fields) if f != 'id')
+
+
+def _int_param(name, value):
+    """``int(value)`` for a request parameter; ValueError naming the parameter otherwise."""
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        raise ValueError(f"{name} must be an integer, got {value!r}") from None
+
+
+def _page_size(limit):
+    """Validate a ``limit`` parameter; out-of-range values are rejected, not clamped."""
+    limit = _int_param('limit', limit)
+    if not 1 <= limit <= MAX_PAGE_SIZE:
+        raise ValueError(f"limit must be between 1 and {MAX_PAGE_SIZE}")
+    return limit
+
+
+def _list_filters(table, after_id=None, status=None, created_from=None, created_to=None):
+    """Validate list filters into repository arguments (timestamps as epoch ms)."""
+    if status is not None and table != 'orders':
+        raise ValueError(f"Filtering by status is not supported for {table}")
+    return {'after_id': None if after_id is None else _int_param('after_id', after_id), 'status': status,
+            'created_from': None if created_from is None else _timestamp(created_from),
+            'created_to': None if created_to is None else _timestamp(created_to)}
+
+
+def _list_page(table, after_id=None, limit=None, fields=None, status=None, created_from=None, created_to=None):
+    """Read one keyset page (``id > after_id`` ordered by id) of ``table`` as dicts.
+
+    Callers continue from the ``id`` of the last row returned; a short page
+    means the end of the table was reached. Without a ``limit`` every
+    matching row is returned (read in ``STREAM_BATCH_SIZE`` batches); the
+    HTTP and SOAP list calls stream those instead of calling this.
+    """
+    columns = _select_columns(table, fields)
+    filters = _list_filters(table, after_id, status, created_from, created_to)
+    if limit is None:
+        rows = list(repository.iter_rows(table, columns, STREAM_BATCH_SIZE, **filters))
+    else:
+        rows = repository.list_page(table, columns, _page_size(limit), **filters)
+    DB_ROWS.observe(len(rows), (table,))
+    return rows
+
+
+def iter_rows(table, fields=None, after_id=None, status=None, created_from=None, created_to=None,
+              batch_size=STREAM_BATCH_SIZE):
+    """Return a generator over every matching row of ``table``, read ``batch_size`` rows at a time.
+
+    Arguments are validated eagerly so errors surface before a response
+    starts streaming; only one batch is held in memory at a time.
+    """
+    columns = _select_columns(table, fields)
+    rows = repository.iter_rows(table, columns, batch_size,
+                                **_list_filters(table, after_id, status, created_from, created_to))
+
+    def generate():
+        count = 0
+        for row in rows:
+            count += 1
+            yield row
+        DB_ROWS.observe(count, (table,))
+
+    return generate()
+
+
+def stream_json_array(rows):
+    """Encode ``rows`` as one JSON array, one element at a time."""
+    yield '['
+    first = True
+    for row in rows:
+        if first:
+            first = False
+            yield json.dumps(row)
+        else:
+            yield ',' + json.dumps(row)
+    yield ']'
+
+
+def stream_ndjson(rows):
+    for row in rows:
+        yield json.dumps(row) + '\n'
+
+
 def add_customer(name, email, phone):
     try:
-        conn = sqlite3.connect('erp_system.db')
-        c = conn.cursor()
-        created_at = datetime.now().isoformat()
-        c.execute('INSERT INTO customers (name, email, phone, created_at) VALUES (?, ?, ?, ?)',
-                  (name, email, phone, created_at))
-        conn.commit()
-        customer_id = c.lastrowid
-        conn.close()
+        batcher = current_shard().write_batcher
+        if batcher is not None:
+            return to_json(batcher.submit('customers', (name, email, phone)).result())
+        created_at, created_ts = _now()
+        customer_id, = repository.insert('customers', [(name, email, phone, created_at, created_ts)])
+        change_feed.publish('customers', 'insert', {"id": customer_id, "name": name, "email": email, "phone": phone})
         return json.dumps({"status": "success", "id": customer_id, "message": "Customer added"})
     except Exception as e:
         return json.dumps({"status": "error", "message": str(e)})
 
 
-def get_customers():
+def get_customers(after_id=None, limit=None, fields=None, created_from=None, created_to=None):
     try:
-        conn = sqlite3.connect('erp_system.db')
-        c = conn.cursor()
-        c.execute('SELECT * FROM customers')
-        customers = [{"id": row[0], "name": row[1], "email": row[2], "phone": row[3]} for row in c.fetchall()]
-        conn.close()
-        return json.dumps(customers)
+        customers = _list_page('customers', after_id, limit, fields,
+                               created_from=created_from, created_to=created_to)
+        return to_json(customers)
     except Exception as e:
         return json.dumps({"status": "error", "message": str(e)})
 
 
 def add_product(name, sku, price, stock):
     try:
-        conn = sqlite3.connect('erp_system.db')
-        c = conn.cursor()
-        created_at = datetime.now().isoformat()
-        c.execute('INSERT INTO products (name, sku, price, stock, created_at) VALUES (?, ?, ?, ?, ?)',
-                  (name, sku, price, stock, created_at))
-        conn.commit()
-        product_id = c.lastrowid
-        conn.close()
+        created_at, created_ts = _now()
+        product_id, = repository.insert('products', [(name, sku, price, stock, created_at, created_ts)])
+        product_cache.invalidate()
+        change_feed.publish('products', 'insert',
+                            {"id": product_id, "name": name, "sku": sku, "price": price, "stock": stock})
         return json.dumps({"status": "success", "id": product_id, "message": "Product added"})
     except Exception as e:
         return json.dumps({"status": "error", "message": str(e)})
 
 
-def get_products():
+def get_products(after_id=None, limit=None, fields=None, created_from=None, created_to=None):
+    try:
+        key = (after_id, limit, fields if not isinstance(fields, list) else ','.join(fields), created_from, created_to)
+        # read before the rows, so a concurrent write can only make the stored body look older
+        version = table_versions.get('products')
+        cached = product_cache.get_response(key, version)
+        if cached is not None:
+            return cached
+        products = to_json(_list_page('products', after_id, limit, fields,
+                                         created_from=created_from, created_to=created_to))
+        product_cache.put_response(key, version, products)
+        return products
+    except Exception as e:
+        return json.dumps({"status": "error", "message": str(e)})
+
+
+def get_product(product_id=None, sku=None):
+    """Look up one product by id or SKU through the product cache."""
     try:
-        conn = sqlite3.connect('erp_system.db')
-        c = conn.cursor()
-        c.execute('SELECT * FROM products')
-        products = [{"id": row[0], "name": row[1], "sku": row[2], "price": row[3], "stock": row[4]} for row in
-                    c.fetchall()]
-        conn.close()
-        return json.dumps(products)
+        product = product_cache.get(product_id, sku)
+        if product is None:
+            version = product_cache.version
+            product = repository.get_product(product_id, sku)
+            if product is None:
+                return json.dumps({"status": "error", "message": "Product not found"})
+            product_cache.put(product, version)
+        return to_json(product)
     except Exception as e:
         return json.dumps({"status": "error", "message": str(e)})
 
 
 def create_order(customer_id, product_id, quantity):
     try:
-        conn = sqlite3.connect('erp_system.db')
-        c = conn.cursor()
+        batcher = current_shard().write_batcher
+        if batcher is not None:
+            return to_json(batcher.submit('orders', (int(customer_id), int(product_id), int(quantity))).result())
+        created_at, created_ts = _now()
+        order_id, total_price, stock = repository.place_order(customer_id, product_id, quantity,
+                                                              created_at, created_ts)
+        product_cache.invalidate(product_id)
+        change_feed.publish('orders', 'insert', {"id": order_id, "customer_id": customer_id, "product_id": product_id,
+                                                 "quantity": quantity, "total_price": total_price, "status": "pending"})
+        change_feed.publish('products', 'update', {"id": product_id, "stock": stock})
+        return to_json({"status": "success", "id": order_id, "message": "Order created", "total": total_price})
+    except Exception as e:
+        return json.dumps({"status": "error", "message": str(e)})
 
-        # Get product price
-        c.execute('SELECT price, stock FROM products WHERE id = ?', (product_id,))
-        product = c.fetchone()
 
-        if not product:
-            return json.dumps({"status": "error", "message": "Product not found"})
+def get_changes(since=None, limit=None, tables=None):
+    """Return rows inserted or updated after the change token ``since``, plus the next token.
 
-        price, stock = product
-        if stock < quantity:
-            return json.dumps({"status": "error", "message": "Insufficient stock"})
+    Several changes to one row collapse into a single entry carrying the
+    row's current state. Pass the returned ``token`` back as ``since`` on the
+    next call; ``has_more`` means another page is already waiting.
+    ``compact_changes`` expires old tokens: a ``since`` below the log's
+    ``min_since`` is an error carrying ``min_since``, and the client must
+    reload the full lists before continuing from it.
+    """
+    try:
+        since = _int_param('since', since or 0)
+        limit = DEFAULT_PAGE_SIZE if limit is None else _page_size(limit)
+        if isinstance(tables, str):
+            tables = [t.strip() for t in tables.split(',') if t.strip()]
+        tables = list(tables or CHANGE_TABLES)
+        unknown = [t for t in tables if t not in CHANGE_TABLES]
+        if unknown:
+            raise ValueError(f"Unknown table(s): {', '.join(unknown)}")
+
+        token, changed, changes = repository.changes_since(since, tables, limit)
+        return to_json({"status": "success", "token": token, "has_more": changed >= limit, "changes": changes})
+    except ChangeTokenExpired as e:
+        return json.dumps({"status": "error", "message": str(e), "min_since": e.min_since})
+    except Exception as e:
+        return json.dumps({"status": "error", "message": str(e)})
 
-        total_price = price * quantity
-        created_at = datetime.now().isoformat()
 
-        c.execute(
-            'INSERT INTO orders (customer_id, product_id, quantity, total_price, status, created_at) VALUES (?, ?, ?, ?, ?, ?)',
-            (customer_id, product_id, quantity, total_price, "pending", created_at))
+def compact_changes(keep=CHANGE_LOG_RETENTION):
+    """Compact this shard's change log down to about ``keep`` entries; returns ``(deleted, min_since)``."""
+    return repository.compact_changes(keep)
 
-        # Update stock
-        c.execute('UPDATE products SET stock = stock - ? WHERE id = ?', (quantity, product_id))
 
-        conn.commit()
-        order_id = c.lastrowid
+def get_orders(after_id=None, limit=None, fields=None, status=None, created_from=None, created_to=None):
+    try:
+        orders = _list_page('orders', after_id, limit, fields, status, created_from, created_to)
+        return to_json(orders)
+    except Exception as e:
+        return json.dumps({"status": "error", "message": str(e)})
+
+
+# ==================== CROSS-TENANT READS ====================
+
+def tenant_summary(created_from=None, created_to=None):
+    """Aggregate every shard (queried in parallel) into per-tenant rows and totals."""
+    created_from = None if created_from is None else _timestamp(created_from)
+    created_to = None if created_to is None else _timestamp(created_to)
+    shards = [storage.default] + [storage.shard(betrieb_id) for betrieb_id in storage.tenant_ids()]
+    with ThreadPoolExecutor(max_workers=min(8, len(shards))) as executor:
+        summaries = list(executor.map(lambda shard: shard.repository.summary(created_from, created_to), shards))
+
+    totals = {'customers': 0, 'products': 0, 'orders': 0, 'revenue': 0.0, 'by_status': {}}
+    for summary in summaries:
+        for key in ('customers', 'products', 'orders', 'revenue'):
+            totals[key] += summary[key]
+        for status, values in summary['by_status'].items():
+            total = totals['by_status'].setdefault(status, {'orders': 0, 'revenue': 0.0})
+            total['orders'] += values['orders']
+            total['revenue'] = round(total['revenue'] + values['revenue'], 2)
+    totals['revenue'] = round(totals['revenue'], 2)
+    return {'status': 'success', 'totals': totals,
+            'tenants': [dict(summary, betrieb_id=None if shard is storage.default else int(shard.name))
+                        for shard, summary in zip(shards, summaries)]}
+
+
+# ==================== BATCH OPERATIONS ====================
+
+def _batch_rows(items, fields):
+    """Validate batch records, returning ``(index, values)`` rows and per-index errors."""
+    rows, errors = [], {}
+    for index, item in enumerate(items):
+        try:
+            rows.append((index, tuple(convert(item[name]) for name, convert in fields)))
+        except KeyError as e:
+            errors[index] = f"Missing field: {e.args[0]}"
+        except (TypeError, ValueError):
+            errors[index] = "Invalid record"
+    return rows, errors
+
+
+def _batch_result(count, results, errors):
+    items = []
+    for index in range(count):
+        if index in errors:
+            items.append({"index": index, "status": "error", "message": errors[index]})
+        else:
+            items.append({"index": index, "status": "success", **results[index]})
+    failed = len(errors)
+    status = "success" if not failed else ("error" if failed == count else "partial")
+    return to_json({"status": status, "succeeded": count - failed, "failed": failed, "results": items})
+
+
+def _customers_added(rows, ids):
+    """Publish inserted ``(index, (name, email, phone, ...))`` rows once their ids are committed."""
+    for index, (name, email, phone, _, _) in rows:
+        change_feed.publish('customers', 'insert', {"id": ids[index], "name": name, "email": email, "phone": phone})
+
+
+def _orders_placed(rows_by_index, results, stocks):
+    """Invalidate and publish after place_orders committed ``results``."""
+    product_cache.invalidate(*stocks)
+    for index, result in results.items():
+        customer_id, product_id, quantity = rows_by_index[index]
+        change_feed.publish('orders', 'insert', {
+            "id": result["id"], "customer_id": customer_id, "product_id": product_id, "quantity": quantity,
+            "total_price": result["total"], "status": "pending"})
+    for product_id, stock in stocks.items():
+        change_feed.publish('products', 'update', {"id": product_id, "stock": stock})
+
+
+def add_customers_batch(customers):
+    try:
+        if not isinstance(customers, list):
+            return json.dumps({"status": "error", "message": "Expected a list of customers"})
+        rows, errors = _batch_rows(customers, (('name', str), ('email', str), ('phone', str)))
+        created_at, created_ts = _now()
+        rows = [(index, values + (created_at, created_ts)) for index, values in rows]
+        ids = dict(zip((index for index, _ in rows), repository.insert('customers', [values for _, values in rows])))
+        _customers_added(rows, ids)
+        return _batch_result(len(customers), {index: {"id": id_} for index, id_ in ids.items()}, errors)
+    except Exception as e:
+        return json.dumps({"status": "error", "message": str(e)})
 
-        # Create invoice
-        c.execute('INSERT INTO invoices (order_id, amount, status, created_at) VALUES (?, ?, ?, ?)',
-                  (order_id, total_price, "pending", created_at))
-        conn.commit()
-        conn.close()
 
-        return json.dumps({"status": "success", "id": order_id, "message": "Order created", "total": total_price})
+def add_products_batch(products):
+    """Create many products in one transaction; records whose SKU is already taken are reported, not raised."""
+    try:
+        if not isinstance(products, list):
+            return json.dumps({"status": "error", "message": "Expected a list of products"})
+        rows, errors = _batch_rows(products, (('name', str), ('sku', str), ('price', float), ('stock', int)))
+        created_at, created_ts = _now()
+        rows = [(index, values + (created_at, created_ts)) for index, values in rows]
+        ids, rejected = repository.insert_products(rows) if rows else ({}, {})
+        errors.update(rejected)
+        product_cache.invalidate()
+        for index, (name, sku, price, stock, _, _) in rows:
+            if index in ids:
+                change_feed.publish('products', 'insert',
+                                    {"id": ids[index], "name": name, "sku": sku, "price": price, "stock": stock})
+        return _batch_result(len(products), {index: {"id": id_} for index, id_ in ids.items()}, errors)
     except Exception as e:
         return json.dumps({"status": "error", "message": str(e)})
 
 
-def get_orders():
+def create_orders_batch(orders):
+    """Create many orders in one transaction; orders that fail the stock check are reported, not raised."""
     try:
-        conn = sqlite3.connect('erp_system.db')
-        c = conn.cursor()
-        c.execute('SELECT * FROM orders')
-        orders = [{"id": row[0], "customer_id": row[1], "product_id": row[2], "quantity": row[3], "total_price": row[4],
-                   "status": row[5]} for row in c.fetchall()]
-        conn.close()
-        return json.dumps(orders)
+        if not isinstance(orders, list):
+            return json.dumps({"status": "error", "message": "Expected a list of orders"})
+        rows, errors = _batch_rows(orders, (('customer_id', int), ('product_id', int), ('quantity', int)))
+        rows_by_index = dict(rows)
+        created_at, created_ts = _now()
+        results, rejected, stocks = repository.place_orders(rows, created_at, created_ts)
+        errors.update(rejected)
+        if results:
+            _orders_placed(rows_by_index, results, stocks)
+        return _batch_result(len(orders), results, errors)
     except Exception as e:
         return json.dumps({"status": "error", "message": str(e)})
 
 
 # ==================== SOAP ENDPOINT WITH AUTH ====================
 
-@app.route('/soap', methods=['POST'])
+SOAP_ENV_NS = 'http://schemas.xmlsoap.org/soap/envelope/'
+ERP_NS = 'http://erpsystem.local/soap'
+
+
+class SoapFault(Exception):
+    """Raised by the dispatcher or an operation handler to answer with a SOAP fault."""
+
+    def __init__(self, code, message):
+        super().__init__(message)
+        self.code = code
+        self.message = message
+
+
+def _local_name(tag):
+    return tag.rpartition('}')[2]
+
+
+_soap_parsers = threading.local()
+
+
+def _soap_parser():
+    # lxml parsers must not be shared between threads
+    parser = getattr(_soap_parsers, 'parser', None)
+    if parser is None:
+        from lxml import etree
+        parser = _soap_parsers.parser = etree.XMLParser(resolve_entities=False, no_network=True)
+    return parser
+
+
+def parse_soap_request(body):
+    """Parse a SOAP request once and return ``(operation, params)``.
+
+    ``operation`` is the qualified name (``{namespace}Name``) of the first
+    child of ``soap:Body`` and ``params`` maps the local names of its direct
+    children to their text. Only direct children are visited, never the
+    whole tree.
+    """
+    from lxml import etree  # imported on first SOAP request, not at startup
+
+    try:
+        envelope = etree.fromstring(body, _soap_parser())
+    except etree.XMLSyntaxError as e:
+        raise SoapFault('Client', f'Malformed SOAP request: {e}')
+
+    body_tag = f'{{{SOAP_ENV_NS}}}Body'
+    for section in envelope:
+        if section.tag == body_tag:
+            for operation in section:
+                if isinstance(operation.tag, str):
+                    params = {_local_name(child.tag): child.text
+                              for child in operation if isinstance(child.tag, str)}
+                    return operation.tag, params
+            break
+    raise SoapFault('Client', 'SOAP Body does not contain an operation')
+
+
+SOAP_OPERATIONS = {}
+
+
+def soap_operation(name, namespace=ERP_NS):
+    """Register a handler for the SOAP operation ``{namespace}name``."""
+    def register(handler):
+        SOAP_OPERATIONS[f'{{{namespace}}}{name}'] = handler
+        return handler
+
+    return register
+
+
+def _xml_text(value):
+    """Encode ``value`` as element content.
+
+    Text with markup characters is wrapped in CDATA rather than entity-escaped,
+    which needs a single ``]]>`` replace instead of one copy per character class.
+    """
+    if '&' in value or '<' in value or '>' in value:
+        return b''.join((b'<![CDATA[', value.replace(']]>', ']]]]><![CDATA[>').encode('utf-8'), b']]>'))
+    return value.encode('utf-8')
+
+
+class SoapTemplate:
+    """Response envelope for one operation, precompiled to bytes around a single payload element."""
+
+    def __init__(self, operation, element):
+        self.prefix = (f'<?xml version="1.0" encoding="UTF-8"?>\n'
+                       f'<soap:Envelope xmlns:soap="{SOAP_ENV_NS}"><soap:Body>'
+                       f'<{operation} xmlns="{ERP_NS}"><{element}>').encode('utf-8')
+        self.suffix = f'</{element}></{operation}></soap:Body></soap:Envelope>'.encode('utf-8')
+
+    def render(self, payload):
+        started = time.perf_counter()
+        body = b''.join((self.prefix, _xml_text(payload), self.suffix))
+        record_phase('serialize', time.perf_counter() - started)
+        return body
+
+    def stream(self, chunks):
+        yield self.prefix
+        for chunk in chunks:
+            yield _xml_text(chunk)
+        yield self.suffix
+
+
+SOAP_TEMPLATES = {
+    'AddCustomer': SoapTemplate('AddCustomerResponse', 'result'),
+    'GetCustomers': SoapTemplate('GetCustomersResponse', 'customers'),
+    'AddProduct': SoapTemplate('AddProductResponse', 'result'),
+    'GetProducts': SoapTemplate('GetProductsResponse', 'products'),
+    'CreateOrder': SoapTemplate('CreateOrderResponse', 'result'),
+    'GetOrders': SoapTemplate('GetOrdersResponse', 'orders'),
+    'AddCustomersBatch': SoapTemplate('AddCustomersBatchResponse', 'result'),
+    'AddProductsBatch': SoapTemplate('AddProductsBatchResponse', 'result'),
+    'CreateOrdersBatch': SoapTemplate('CreateOrdersBatchResponse', 'result'),
+    'GetChanges': SoapTemplate('GetChangesResponse', 'changes'),
+}
+
+_FAULT_PREFIX = (f'<?xml version="1.0" encoding="UTF-8"?>\n'
+                 f'<soap:Envelope xmlns:soap="{SOAP_ENV_NS}"><soap:Body>'
+                 f'<soap:Fault><faultcode>').encode('utf-8')
+_FAULT_MIDDLE = b'</faultcode><faultstring>'
+_FAULT_SUFFIX = b'</faultstring></soap:Fault></soap:Body></soap:Envelope>'
+
+
+def soap_fault(code, message):
+    return b''.join((_FAULT_PREFIX, _xml_text(code), _FAULT_MIDDLE, _xml_text(message), _FAULT_SUFFIX))
+
+
+SOAP_AUTH_FAULT = soap_fault('Server.Authentication', 'Authentication required. Please provide valid credentials.')
+
+
+def _required(params, name, convert=str):
+    value = params.get(name)
+    if value is None:
+        raise SoapFault('Client', f'Missing parameter: {name}')
+    try:
+        return convert(value)
+    except ValueError:
+        raise SoapFault('Client', f'Invalid value for parameter: {name}')
+
+
+def soap_list_params(params, with_status=False):
+    """Pick the optional paging/filter parameters of a Get* SOAP request.
+
+    ``stream`` is returned alongside the filters and must be popped by the
+    caller. Requests without a ``limit`` return every row, so GetCustomers
+    and GetOrders stream them as well; GetProducts serves them from the
+    product cache.
+    """
+    names = ['after_id', 'limit', 'fields', 'created_from', 'created_to']
+    if with_status:
+        names.append('status')
+    list_params = {name: params.get(name) or None for name in names}
+    list_params['stream'] = (params.get('stream') or '').lower() in ('1', 'true')
+    return list_params
+
+
+def soap_stream_response(template, table, params):
+    """Stream a Get* SOAP response, writing the envelope around a chunked JSON array."""
+    params.pop('limit', None)
+    try:
+        chunks = stream_json_array(iter_rows(table, **params))
+    except ValueError as e:
+        chunks = [json.dumps({"status": "error", "message": str(e)})]
+    return Response(stream_with_context(template.stream(chunks)), 200, content_type='text/xml')
+
+
+@soap_operation('AddCustomer')
+def soap_add_customer(params):
+    result = add_customer(_required(params, 'name'), _required(params, 'email'), _required(params, 'phone'))
+    return SOAP_TEMPLATES['AddCustomer'].render(result)
+
+
+@soap_operation('GetCustomers')
+def soap_get_customers(params):
+    params = soap_list_params(params)
+    if params.pop('stream') or params['limit'] is None:
+        return soap_stream_response(SOAP_TEMPLATES['GetCustomers'], 'customers', params)
+    return SOAP_TEMPLATES['GetCustomers'].render(get_customers(**params))
+
+
+@soap_operation('AddProduct')
+def soap_add_product(params):
+    result = add_product(_required(params, 'name'), _required(params, 'sku'),
+                         _required(params, 'price', float), _required(params, 'stock', int))
+    return SOAP_TEMPLATES['AddProduct'].render(result)
+
+
+@soap_operation('GetProducts')
+def soap_get_products(params):
+    params = soap_list_params(params)
+    if params.pop('stream'):
+        return soap_stream_response(SOAP_TEMPLATES['GetProducts'], 'products', params)
+    return SOAP_TEMPLATES['GetProducts'].render(get_products(**params))
+
+
+@soap_operation('CreateOrder')
+def soap_create_order(params):
+    result = create_order(_required(params, 'customer_id', int), _required(params, 'product_id', int),
+                          _required(params, 'quantity', int))
+    return SOAP_TEMPLATES['CreateOrder'].render(result)
+
+
+@soap_operation('GetOrders')
+def soap_get_orders(params):
+    params = soap_list_params(params, with_status=True)
+    if params.pop('stream') or params['limit'] is None:
+        return soap_stream_response(SOAP_TEMPLATES['GetOrders'], 'orders', params)
+    return SOAP_TEMPLATES['GetOrders'].render(get_orders(**params))
+
+
+@soap_operation('AddCustomersBatch')
+def soap_add_customers_batch(params):
+    return SOAP_TEMPLATES['AddCustomersBatch'].render(add_customers_batch(_required(params, 'customers', json.loads)))
+
+
+@soap_operation('AddProductsBatch')
+def soap_add_products_batch(params):
+    return SOAP_TEMPLATES['AddProductsBatch'].render(add_products_batch(_required(params, 'products', json.loads)))
+
+
+@soap_operation('CreateOrdersBatch')
+def soap_create_orders_batch(params):
+    return SOAP_TEMPLATES['CreateOrdersBatch'].render(create_orders_batch(_required(params, 'orders', json.loads)))
+
+
+@soap_operation('GetChanges')
+def soap_get_changes(params):
+    result = get_changes(params.get('since'), params.get('limit') or None, params.get('tables'))
+    return SOAP_TEMPLATES['GetChanges'].render(result)
+
+
+def dispatch_soap_request(body, username):
+    """Parse ``body`` once and run the registered handler for its operation as ``username``.
+
+    The tenant comes from a ``betrieb_id`` element in the operation, else
+    the ``X-Betrieb-ID`` header or query parameter.
+    """
+    started = time.perf_counter()
+    operation, params = parse_soap_request(body)
+    record_phase('parse', time.perf_counter() - started)
+    handler = SOAP_OPERATIONS.get(operation)
+    if handler is None:
+        raise SoapFault('Server', 'Unknown operation')
+    set_operation(f'SOAP {_local_name(operation)}')
+    try:
+        select_request_tenant(username, params.pop('betrieb_id', None) or request.headers.get(TENANT_HEADER)
+                              or request.args.get('betrieb_id'))
+    except (UnknownTenant, TenantForbidden) as e:
+        raise SoapFault('Client', str(e))
+    return handler(params)
+
+
+@bp.route('/soap', methods=['POST'])
 def soap_endpoint():
     # Check authentication
-    is_authenticated, username = check_soap_auth(request.data.decode('utf-8'))
+    is_authenticated, username = check_soap_auth()
 
     if not is_authenticated:
-        return '''<?xml version="1.0" encoding="UTF-8"?>
-        <soap:Envelope xmlns:soap="http://schemas.xmlsoap.org/soap/envelope/">
-            <soap:Body>
-                <soap:Fault>
-                    <faultcode>Server.Authentication</faultcode>
-                    <faultstring>Authentication required. Please provide valid credentials.</faultstring>
-                </soap:Fault>
-            </soap:Body>
-        </soap:Envelope>''', 401, {
+        return SOAP_AUTH_FAULT, 401, {
             'Content-Type': 'text/xml',
             'WWW-Authenticate': 'Basic realm="SOAP API"'
         }
 
-    soap_request = request.data.decode('utf-8')
-
-    if 'AddCustomer' in soap_request:
-        import xml.etree.ElementTree as ET
-        root = ET.fromstring(soap_request)
-        name = root.find('.//{http://erpsystem.local/soap}name').text
-        email = root.find('.//{http://erpsystem.local/soap}email').text
-        phone = root.find('.//{http://erpsystem.local/soap}phone').text
-        result = add_customer(name, email, phone)
-
-        response = f'''<?xml version="1.0" encoding="UTF-8"?>
-        <soap:Envelope xmlns:soap="http://schemas.xmlsoap.org/soap/envelope/">
-            <soap:Body>
-                <AddCustomerResponse xmlns="http://erpsystem.local/soap">
-                    <result>{result}</result>
-                </AddCustomerResponse>
-            </soap:Body>
-        </soap:Envelope>'''
-
-    elif 'GetCustomers' in soap_request:
-        result = get_customers()
-        response = f'''<?xml version="1.0" encoding="UTF-8"?>
-        <soap:Envelope xmlns:soap="http://schemas.xmlsoap.org/soap/envelope/">
-            <soap:Body>
-                <GetCustomersResponse xmlns="http://erpsystem.local/soap">
-                    <customers>{result}</customers>
-                </GetCustomersResponse>
-            </soap:Body>
-        </soap:Envelope>'''
-
-    elif 'AddProduct' in soap_request:
-        import xml.etree.ElementTree as ET
-        root = ET.fromstring(soap_request)
-        name = root.find('.//{http://erpsystem.local/soap}name').text
-        sku = root.find('.//{http://erpsystem.local/soap}sku').text
-        price = float(root.find('.//{http://erpsystem.local/soap}price').text)
-        stock = int(root.find('.//{http://erpsystem.local/soap}stock').text)
-        result = add_product(name, sku, price, stock)
-
-        response = f'''<?xml version="1.0" encoding="UTF-8"?>
-        <soap:Envelope xmlns:soap="http://schemas.xmlsoap.org/soap/envelope/">
-            <soap:Body>
-                <AddProductResponse xmlns="http://erpsystem.local/soap">
-                    <result>{result}</result>
-                </AddProductResponse>
-            </soap:Body>
-        </soap:Envelope>'''
-
-    elif 'GetProducts' in soap_request:
-        result = get_products()
-        response = f'''<?xml version="1.0" encoding="UTF-8"?>
-        <soap:Envelope xmlns:soap="http://schemas.xmlsoap.org/soap/envelope/">
-            <soap:Body>
-                <GetProductsResponse xmlns="http://erpsystem.local/soap">
-                    <products>{result}</products>
-                </GetProductsResponse>
-            </soap:Body>
-        </soap:Envelope>'''
-
-    elif 'CreateOrder' in soap_request:
-        import xml.etree.ElementTree as ET
-        root = ET.fromstring(soap_request)
-        customer_id = int(root.find('.//{http://erpsystem.local/soap}customer_id').text)
-        product_id = int(root.find('.//{http://erpsystem.local/soap}product_id').text)
-        quantity = int(root.find('.//{http://erpsystem.local/soap}quantity').text)
-        result = create_order(customer_id, product_id, quantity)
-
-        response = f'''<?xml version="1.0" encoding="UTF-8"?>
-        <soap:Envelope xmlns:soap="http://schemas.xmlsoap.org/soap/envelope/">
-            <soap:Body>
-                <CreateOrderResponse xmlns="http://erpsystem.local/soap">
-                    <result>{result}</result>
-                </CreateOrderResponse>
-            </soap:Body>
-        </soap:Envelope>'''
-
-    elif 'GetOrders' in soap_request:
-        result = get_orders()
-        response = f'''<?xml version="1.0" encoding="UTF-8"?>
-        <soap:Envelope xmlns:soap="http://schemas.xmlsoap.org/soap/envelope/">
-            <soap:Body>
-                <GetOrdersResponse xmlns="http://erpsystem.local/soap">
-                    <orders>{result}</orders>
-                </GetOrdersResponse>
-            </soap:Body>
-        </soap:Envelope>'''
-
-    else:
-        response = '''<?xml version="1.0" encoding="UTF-8"?>
-        <soap:Envelope xmlns:soap="http://schemas.xmlsoap.org/soap/envelope/">
-            <soap:Body>
-                <soap:Fault>
-                    <faultcode>Server</faultcode>
-                    <faultstring>Unknown operation</faultstring>
-                </soap:Fault>
-            </soap:Body>
-        </soap:Envelope>'''
+    try:
+        response = dispatch_soap_request(request.data, username)
+    except SoapFault as fault:
+        response = soap_fault(fault.code, fault.message)
 
+    if isinstance(response, Response):
+        return response
     return response, 200, {'Content-Type': 'text/xml'}
 
 
-@app.route('/wsdl', methods=['GET'])
+@bp.route('/wsdl', methods=['GET'])
 def wsdl_endpoint():
     return WSDL_CONTENT, 200, {'Content-Type': 'text/xml'}
 
 
 # ==================== REST API WITH AUTH ====================
 
-@app.route('/api/customers', methods=['GET', 'POST'])
+# requires_auth / the SOAP endpoint select the tenant after authenticating
+bp.teardown_app_request(reset_tenant)
+
+
+def versioned_get(table):
+    """Decorator adding ETag / If-None-Match handling to GETs of ``table``.
+
+    When the client's validator matches the table's current change version
+    the view is not called at all, so a 304 costs one indexed lookup.
+    """
+    def decorator(f):
+        @wraps(f)
+        def decorated(*args, **kwargs):
+            if request.method != 'GET':
+                return f(*args, **kwargs)
+            etag = table_versions.etag(table)
+            if request.if_none_match.contains(etag):
+                response = make_response('', 304)
+            else:
+                response = make_response(f(*args, **kwargs))
+            response.set_etag(etag)
+            response.headers['Cache-Control'] = 'no-cache'
+            return response
+
+        return decorated
+
+    return decorator
+
+
+def stream_list_response(table, mode, params):
+    """Stream a REST list as a chunked JSON array (``stream=json``) or NDJSON (``stream=ndjson``).
+
+    Customer and order lists requested without a ``limit`` are served this
+    way, so they are complete without the whole table being held in memory.
+    Any other ``mode`` is answered with 400.
+    """
+    if mode not in STREAM_MODES:
+        return jsonify({'status': 'error', 'message': f"Unsupported stream mode {mode!r}; "
+                                                      f"use one of: {', '.join(STREAM_MODES)}"}), 400
+    params.pop('limit', None)
+    try:
+        rows = iter_rows(table, **params)
+    except ValueError as e:
+        return json.dumps({"status": "error", "message": str(e)})
+    if mode == 'ndjson':
+        return Response(stream_with_context(stream_ndjson(rows)), mimetype='application/x-ndjson')
+    return Response(stream_with_context(stream_json_array(rows)), mimetype='application/json')
+
+
+def rest_list_params():
+    """Read ``?after_id=&limit=&fields=&created_from=&created_to=`` from the query string.
+
+    Values are validated by the list functions, so a malformed ``after_id``
+    or ``limit`` is an error rather than being ignored.
+    """
+    return {
+        'after_id': request.args.get('after_id'),
+        'limit': request.args.get('limit'),
+        'fields': request.args.get('fields'),
+        'created_from': request.args.get('created_from'),
+        'created_to': request.args.get('created_to'),
+    }
+
+
+@bp.route('/api/customers', methods=['GET', 'POST'])
 @requires_auth
+@versioned_get('customers')
 def customers_api():
     if request.method == 'POST':
         data = request.json
         return add_customer(data['name'], data['email'], data['phone'])
     else:
-        return get_customers()
+        params = rest_list_params()
+        if request.args.get('stream') or params['limit'] is None:
+            return stream_list_response('customers', request.args.get('stream', 'json'), params)
+        return get_customers(**params)
 
 
-@app.route('/api/products', methods=['GET', 'POST'])
+@bp.route('/api/products', methods=['GET', 'POST'])
 @requires_auth
+@versioned_get('products')
 def products_api():
     if request.method == 'POST':
         data = request.json
         return add_product(data['name'], data['sku'], data['price'], data['stock'])
     else:
-        return get_products()
+        if request.args.get('stream'):
+            return stream_list_response('products', request.args['stream'], rest_list_params())
+        # unpaged too: the whole catalog is served from the product cache until it changes
+        return get_products(**rest_list_params())
 
 
-@app.route('/api/orders', methods=['GET', 'POST'])
+@bp.route('/api/orders', methods=['GET', 'POST'])
 @requires_auth
+@versioned_get('orders')
 def orders_api():
     if request.method == 'POST':
         data = request.json
         return create_order(data['customer_id'], data['product_id'], data['quantity'])
     else:
-        return get_orders()
+        params = rest_list_params()
+        params['status'] = request.args.get('status')
+        if request.args.get('stream') or params['limit'] is None:
+            return stream_list_response('orders', request.args.get('stream', 'json'), params)
+        return get_orders(**params)
+
+
+@bp.route('/api/customers/batch', methods=['POST'])
+@requires_auth
+def customers_batch_api():
+    return add_customers_batch(request.json)
+
+
+@bp.route('/api/products/batch', methods=['POST'])
+@requires_auth
+def products_batch_api():
+    return add_products_batch(request.json)
+
+
+@bp.route('/api/orders/batch', methods=['POST'])
+@requires_auth
+def orders_batch_api():
+    return create_orders_batch(request.json)
+
+
+@bp.route('/api/products/<int:product_id>', methods=['GET'])
+@requires_auth
+@versioned_get('products')
+def product_api(product_id):
+    return get_product(product_id=product_id)
+
+
+@bp.route('/api/products/sku/<path:sku>', methods=['GET'])
+@requires_auth
+@versioned_get('products')
+def product_by_sku_api(sku):
+    return get_product(sku=sku)
+
+
+@bp.route('/api/changes', methods=['GET'])
+@requires_auth
+def changes_api():
+    return get_changes(request.args.get('since'), request.args.get('limit'), request.args.get('tables'))
+
+
+@bp.route('/api/events', methods=['GET'])
+@requires_auth
+def events_api():
+    """Server-Sent Events feed of row changes; reconnects resume from ``Last-Event-ID``."""
+    last_seq = request.headers.get('Last-Event-ID', type=int)
+    return Response(stream_with_context(sse_stream(last_seq)), mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
+
+@bp.route('/api/stats/pool', methods=['GET'])
+@requires_auth
+def pool_stats_api():
+    return jsonify(repository.stats())
+
+
+@bp.route('/api/stats/cache', methods=['GET'])
+@requires_auth
+def cache_stats_api():
+    return jsonify(product_cache.stats())
+
+
+@bp.route('/api/admin/summary', methods=['GET'])
+@requires_admin
+def admin_summary_api():
+    """Per-tenant and total counts, revenue and order status mix across every shard."""
+    return jsonify(tenant_summary(request.args.get('created_from'), request.args.get('created_to')))
+
+
+@bp.route('/api/admin/tenants', methods=['GET', 'POST'])
+@requires_admin
+def admin_tenants_api():
+    """List tenant ids, or create (and migrate) the shard for ``{"betrieb_id": N}``."""
+    if request.method == 'GET':
+        return jsonify({'status': 'success', 'tenants': storage.tenant_ids()})
+    try:
+        betrieb_id = parse_betrieb_id((request.get_json(silent=True) or {}).get('betrieb_id'))
+        create_tenant(betrieb_id)
+    except UnknownTenant as e:
+        return jsonify({'status': 'error', 'message': str(e)}), 400
+    return jsonify({'status': 'success', 'betrieb_id': betrieb_id}), 201
+
+
+@bp.route('/api/stats/slowest', methods=['GET'])
+@requires_auth
+def slowest_requests_api():
+    """Profiles of the slowest sampled requests (needs ``PROFILE_SAMPLE_RATE`` > 0)."""
+    return jsonify({'sample_rate': request_profiler.sample_rate, 'requests': request_profiler.slowest()})
+
+
+@bp.route('/metrics', methods=['GET'])
+@requires_auth
+def metrics_api():
+    return Response(render_metrics(), mimetype='text/plain; version=0.0.4')
 
 
 # ==================== WEB UI WITH LOGIN ====================
 
-@app.route('/login')
+@bp.route('/login')
 def login_page():
-    html = '''
-    <!DOCTYPE html>
-    <html>
-    <head>
-        <title>ERP System - Login</title>
-        <style>
-            * { margin: 0; padding: 0; box-sizing: border-box; }
-            body { 
-                font-family: Arial, sans-serif; 
-                background: linear-gradient(135deg, #667eea 0%, #764ba2 100%);
-                display: flex;
-                justify-content: center;
-                align-items: center;
-                min-height: 100vh;
-            }
-            .login-container {
-                background: white;
-                padding: 40px;
-                border-radius: 10px;
-                box-shadow: 0 10px 25px rgba(0,0,0,0.2);
-                width: 400px;
-            }
-            h1 { color: #333; margin-bottom: 30px; text-align: center; }
-            .form-group { margin-bottom: 20px; }
-            label { display: block; margin-bottom: 5px; color: #333; font-weight: bold; }
-            input { 
-                width: 100%; 
-                padding: 12px; 
-                border: 1px solid #ddd; 
-                border-radius: 5px; 
-                font-size: 14px; 
-            }
-            button { 
-                width: 100%;
-                background: #667eea; 
-                color: white; 
-                padding: 12px; 
-                border: none; 
-                border-radius: 5px; 
-                cursor: pointer; 
-                font-size: 16px;
-                font-weight: bold;
-            }
-            button:hover { background: #5568d3; }
-            .error { color: red; margin-top: 10px; text-align: center; }
-            .info { 
-                background: #f0f0f0; 
-                padding: 15px; 
-                border-radius: 5px; 
-                margin-top: 20px;
-                font-size: 12px;
-            }
-            .info h3 { margin-bottom: 10px; color: #667eea; }
-        </style>
-    </head>
-    <body>
-        <div class="login-container">
-            <h1>🔐 ERP System Login</h1>
-            <form id="loginForm">
-                <div class="form-group">
-                    <label>Username</label>
-                    <input type="text" id="username" required>
-                </div>
-                <div class="form-group">
-                    <label>Password</label>
-                    <input type="password" id="password" required>
-                </div>
-                <button type="submit">Login</button>
-                <div id="errorMsg" class="error"></div>
-            </form>
-
-            <div class="info">
-                <h3>Test Accounts:</h3>
-                <p><strong>Admin:</strong> admin / admin123</p>
-                <p><strong>User:</strong> user / user123</p>
-                <p><strong>Manager:</strong> manager / manager123</p>
-            </div>
-        </div>
-
-        <script>
-            document.getElementById('loginForm').addEventListener('submit', async (e) => {
-                e.preventDefault();
-                const username = document.getElementById('username').value;
-                const password = document.getElementById('password').value;
-
-                // Store credentials in base64
-                const credentials = btoa(username + ':' + password);
-
-                // Test authentication
-                const response = await fetch('/api/customers', {
-                    headers: {
-                        'Authorization': 'Basic ' + credentials
-                    }
-                });
-
-                if (response.ok) {
-                    localStorage.setItem('auth', credentials);
-                    localStorage.setItem('username', username);
-                    window.location.href = '/';
-                } else {
-                    document.getElementById('errorMsg').textContent = 'Invalid credentials';
-                }
-            });
-        </script>
-    </body>
-    </html>
-    '''
-    return render_template_string(html)
-
-
-@app.route('/')
+    return render_template('login.html')
+
+
+@bp.route('/')
 def dashboard():
-    html = '''
-    <!DOCTYPE html>
-    <html>
-    <head>
-        <title>ERP System Dashboard</title>
-        <style>
-            * { margin: 0; padding: 0; box-sizing: border-box; }
-            body { font-family: Arial, sans-serif; background: #f5f5f5; }
-            .header { 
-                background: linear-gradient(135deg, #667eea 0%, #764ba2 100%);
-                color: white;
-                padding: 15px 20px;
-                display: flex;
-                justify-content: space-between;
-                align-items: center;
-                box-shadow: 0 2px 5px rgba(0,0,0,0.1);
-            }
-            .header h1 { font-size: 24px; }
-            .user-info { display: flex; align-items: center; gap: 15px; }
-            .logout-btn {
-                background: rgba(255,255,255,0.2);
-                color: white;
-                border: 1px solid white;
-                padding: 8px 15px;
-                border-radius: 5px;
-                cursor: pointer;
-            }
-            .logout-btn:hover { background: rgba(255,255,255,0.3); }
-            .container { max-width: 1200px; margin: 0 auto; padding: 20px; }
-            .section { background: white; padding: 20px; margin-bottom: 20px; border-radius: 8px; box-shadow: 0 2px 4px rgba(0,0,0,0.1); }
-            .section h2 { color: #667eea; margin-bottom: 15px; border-bottom: 2px solid #667eea; padding-bottom: 10px; }
-            .form-group { margin-bottom: 15px; }
-            label { display: block; margin-bottom: 5px; color: #333; font-weight: bold; }
-            input, select { width: 100%; padding: 8px; border: 1px solid #ddd; border-radius: 4px; font-size: 14px; }
-            button { background: #667eea; color: white; padding: 10px 20px; border: none; border-radius: 4px; cursor: pointer; font-size: 14px; }
-            button:hover { background: #5568d3; }
-            table { width: 100%; border-collapse: collapse; margin-top: 15px; }
-            th { background: #f0f0f0; padding: 12px; text-align: left; border-bottom: 2px solid #ddd; }
-            td { padding: 12px; border-bottom: 1px solid #ddd; }
-            .success { color: green; }
-            .error { color: red; }
-            .grid { display: grid; grid-template-columns: 1fr 1fr; gap: 20px; }
-            @media (max-width: 768px) { .grid { grid-template-columns: 1fr; } }
-        </style>
-    </head>
-    <body>
-        <div class="header">
-            <h1>📊 ERP System Dashboard</h1>
-            <div class="user-info">
-                <span>👤 <span id="currentUser"></span></span>
-                <button class="logout-btn" onclick="logout()">Logout</button>
-            </div>
-        </div>
-
-        <div class="container">
-            <div class="grid">
-                <div class="section">
-                    <h2>👥 Customer Management</h2>
-                    <form id="customerForm">
-                        <div class="form-group">
-                            <label>Name</label>
-                            <input type="text" id="custName" required>
-                        </div>
-                        <div class="form-group">
-                            <label>Email</label>
-                            <input type="email" id="custEmail" required>
-                        </div>
-                        <div class="form-group">
-                            <label>Phone</label>
-                            <input type="tel" id="custPhone" required>
-                        </div>
-                        <button type="submit">Add Customer</button>
-                        <div id="customerMsg" style="margin-top: 10px;"></div>
-                    </form>
-                    <div id="customerList"></div>
-                </div>
-
-                <div class="section">
-                    <h2>📦 Product Management</h2>
-                    <form id="productForm">
-                        <div class="form-group">
-                            <label>Product Name</label>
-                            <input type="text" id="prodName" required>
-                        </div>
-                        <div class="form-group">
-                            <label>SKU</label>
-                            <input type="text" id="prodSku" required>
-                        </div>
-                        <div class="form-group">
-                            <label>Price</label>
-                            <input type="number" id="prodPrice" step="0.01" required>
-                        </div>
-                        <div class="form-group">
-                            <label>Stock</label>
-                            <input type="number" id="prodStock" required>
-                        </div>
-                        <button type="submit">Add Product</button>
-                        <div id="productMsg" style="margin-top: 10px;"></div>
-                    </form>
-                    <div id="productList"></div>
-                </div>
-            </div>
-
-            <div class="section">
-                <h2>📋 Order Management</h2>
-                <form id="orderForm">
-                    <div style="display: grid; grid-template-columns: 1fr 1fr 1fr 1fr; gap: 15px;">
-                        <div class="form-group">
-                            <label>Customer ID</label>
-                            <input type="number" id="ordCustomerId" required>
-                        </div>
-                        <div class="form-group">
-                            <label>Product ID</label>
-                            <input type="number" id="ordProductId" required>
-                        </div>
-                        <div class="form-group">
-                            <label>Quantity</label>
-                            <input type="number" id="ordQuantity" required>
-                        </div>
-                        <div style="display: flex; align-items: flex-end;">
-                            <button type="submit">Create Order</button>
-                        </div>
-                    </div>
-                    <div id="orderMsg" style="margin-top: 10px;"></div>
-                </form>
-                <div id="orderList"></div>
-            </div>
-        </div>
-
-        <script>
-            // Check authentication on page load
-            const auth = localStorage.getItem('auth');
-            const username = localStorage.getItem('username');
-
-            if (!auth) {
-                window.location.href = '/login';
-            } else {
-                document.getElementById('currentUser').textContent = username;
-            }
+    return render_template('dashboard.html')
+
+
+# ==================== APP FACTORY ====================
+
+DEFAULT_CONFIG = {
+    'STORAGE_BACKEND': 'sqlite',
+    'DB_PATH': DB_PATH,
+    'SHARD_PATH_TEMPLATE': SHARD_PATH_TEMPLATE,
+    'POSTGRES_DSN': None,
+    'POSTGRES_SCHEMA': 'public',
+    'POSTGRES_SCHEMA_TEMPLATE': SHARD_SCHEMA_TEMPLATE,
+    'TENANTS': None,
+    'USER_TENANTS': None,
+    'WRITE_BATCH_WINDOW': None,
+    'WRITE_BATCH_SIZE': WRITE_BATCH_SIZE,
+    'ADMIN_USERS': ('admin',),
+    'INIT_DB': True,
+    'METRICS_ENABLED': True,
+    'PROFILE_SAMPLE_RATE': 0.0,
+    'PROFILE_KEEP': 10,
+    'PROFILE_DIR': None,
+}
 
-            function logout() {
-                localStorage.removeItem('auth');
-                localStorage.removeItem('username');
-                window.location.href = '/login';
-            }
 
-            function getAuthHeaders() {
-                return {
-                    'Authorization': 'Basic ' + localStorage.getItem('auth'),
-                    'Content-Type': 'application/json'
-                };
-            }
+def create_app(config=None):
+    """Build the Flask app; ``config`` overrides ``DEFAULT_CONFIG``.
+
+    The schema is migrated here (not at import) unless ``INIT_DB`` is False,
+    in which case run ``flask --app erp_system init-db`` first.
+    ``STORAGE_BACKEND`` is ``'sqlite'`` (files ``DB_PATH`` and
+    ``SHARD_PATH_TEMPLATE``) or ``'postgres'`` (schemas ``POSTGRES_SCHEMA``
+    and ``POSTGRES_SCHEMA_TEMPLATE`` in the ``POSTGRES_DSN`` database).
+    ``WRITE_BATCH_WINDOW`` (seconds) turns on group commit; see WriteBatcher.
+    ``USER_TENANTS`` restricts users to tenants; see select_request_tenant.
+    """
+    app = Flask(__name__)
+    app.config.update(DEFAULT_CONFIG)
+    app.config.update(config or {})
+    CORS(app)
+    batching = {'batch_window': app.config['WRITE_BATCH_WINDOW'], 'batch_size': app.config['WRITE_BATCH_SIZE']}
+    if app.config['STORAGE_BACKEND'] == 'postgres':
+        configure_storage(app.config['POSTGRES_SCHEMA'], app.config['POSTGRES_SCHEMA_TEMPLATE'],
+                          app.config['TENANTS'], 'postgres', dsn=app.config['POSTGRES_DSN'], **batching)
+    else:
+        configure_storage(app.config['DB_PATH'], app.config['SHARD_PATH_TEMPLATE'], app.config['TENANTS'],
+                          app.config['STORAGE_BACKEND'], **batching)
+    if app.config['INIT_DB']:
+        init_db()
+    if app.config['METRICS_ENABLED']:
+        app.before_request(_start_request_metrics)
+        app.after_request(_finish_request_metrics)
+    request_profiler.sample_rate = app.config['PROFILE_SAMPLE_RATE']
+    request_profiler.keep = app.config['PROFILE_KEEP']
+    request_profiler.dump_dir = app.config['PROFILE_DIR']
+    app.register_blueprint(bp)
+    return app
+
+
+@bp.cli.command('init-db')
+def init_db_command():
+    """Create or migrate the database schema."""
+    print(f'{repository.location}: schema version {init_db()}')
+
+
+@bp.cli.command('compact-changes')
+@click.option('--keep', default=CHANGE_LOG_RETENTION, show_default=True, help='Change-log entries to keep per shard.')
+def compact_changes_command(keep):
+    """Delete superseded and old change-log entries in every shard (run it periodically)."""
+    for shard in [storage.default] + [storage.shard(betrieb_id) for betrieb_id in storage.tenant_ids()]:
+        deleted, min_since = shard.repository.compact_changes(keep)
+        print(f'{shard.repository.location}: deleted {deleted} changes, min_since {min_since}')
+
+
+@bp.cli.command('create-tenant')
+@click.argument('betrieb_id', type=int)
+def create_tenant_command(betrieb_id):
+    """Create and migrate the shard for BETRIEB_ID."""
+    print(f'{create_tenant(betrieb_id).repository.location}: created')
+
+
+def __getattr__(name):
+    # ``erp_system.app`` (e.g. ``gunicorn erp_system:app``) is built on first use
+    if name == 'app':
+        app = globals()['app'] = create_app()
+        return app
+    raise AttributeError(f'module {__name__!r} has no attribute {name!r}')
+
+
+# ==================== PRODUCTION SERVER ====================
+
+SERVER_WORKERS = 2
+SERVER_THREADS = 8
+SERVER_QUEUE_TIMEOUT = 10.0
+# extra server threads per worker for SSE clients, which hold no request slot
+SERVER_FEED_THREADS = 16
+UNLIMITED_PATHS = ('/api/events',)
+
+request_limiter = None  # set by serve(); reported on /metrics
+
+
+class ConcurrencyLimiter:
+    """WSGI middleware that lets at most ``limit`` requests run the app at once.
+
+    The server still accepts every connection, but requests beyond the limit
+    wait up to ``queue_timeout`` seconds for a slot and are then answered
+    with 503 and ``Retry-After``. A slot is held until the response body is
+    closed, so streamed lists count against it; long-lived SSE feeds in
+    ``exempt`` do not.
+    """
+
+    BUSY_BODY = b'{"message": "Server busy, retry later", "status": "error"}'
+
+    def __init__(self, app, limit=SERVER_THREADS, queue_timeout=SERVER_QUEUE_TIMEOUT, exempt=UNLIMITED_PATHS):
+        self.app = app
+        self.limit = limit
+        self.queue_timeout = queue_timeout
+        self.exempt = frozenset(exempt)
+        self._slots = threading.BoundedSemaphore(limit)
+        self._lock = threading.Lock()
+        self._active = 0
+        self._rejected = 0
+
+    def __call__(self, environ, start_response):
+        if environ.get('PATH_INFO') in self.exempt:
+            return self.app(environ, start_response)
+        if not self._slots.acquire(timeout=self.queue_timeout):
+            with self._lock:
+                self._rejected += 1
+            start_response('503 Service Unavailable', [('Content-Type', 'application/json'),
+                                                       ('Content-Length', str(len(self.BUSY_BODY))),
+                                                       ('Retry-After', '1')])
+            return [self.BUSY_BODY]
+        with self._lock:
+            self._active += 1
+        try:
+            return ClosingIterator(self.app(environ, start_response), self._release)
+        except BaseException:
+            self._release()
+            raise
+
+    def _release(self):
+        with self._lock:
+            self._active -= 1
+        self._slots.release()
+
+    def stats(self):
+        with self._lock:
+            return {'limit': self.limit, 'active': self._active, 'rejected': self._rejected}
+
+
+def serve(config=None, host='127.0.0.1', port=5000, workers=SERVER_WORKERS, threads=SERVER_THREADS,
+          queue_timeout=SERVER_QUEUE_TIMEOUT):
+    """Serve ``create_app(config)`` from gunicorn with ``workers`` processes of ``threads`` request slots.
+
+    The schema is migrated once in the master; each worker then builds its
+    own app, storage pools and caches after the fork. Every worker opens up
+    to ``threads`` connections per shard, so a shard sees up to
+    ``workers * threads`` of them: keep that under the PostgreSQL
+    ``max_connections`` (times the number of tenants in use). SQLite still
+    takes one writer at a time across all processes, so extra workers
+    mostly add read throughput there.
+
+    ETags and cached product lists follow the change log and stay correct
+    across workers. The product row cache, auth cache and the
+    ``/api/events`` feed are per worker: rows may be stale for up to
+    ``PRODUCT_CACHE_TTL`` and the feed only carries its own worker's
+    writes, so clients that need every change poll ``/api/changes``.
+    ``app.run`` (without ``--production``) is the Werkzeug dev server.
+    """
+    try:
+        from gunicorn.app.base import BaseApplication
+    except ImportError:
+        raise RuntimeError('serve() needs gunicorn: pip install gunicorn') from None
 
-            async function loadCustomers() {
-                try {
-                    const res = await fetch('/api/customers', { headers: getAuthHeaders() });
-                    if (res.status === 401) { logout(); return; }
-                    const data = await res.json();
-                    const html = '<h3>Customers:</h3><table><tr><th>ID</th><th>Name</th><th>Email</th><th>Phone</th></tr>' +
-                        data.map(c => `<tr><td>${c.id}</td><td>${c.name}</td><td>${c.email}</td><td>${c.phone}</td></tr>`).join('') +
-                        '</table>';
-                    document.getElementById('customerList').innerHTML = html;
-                } catch (e) {
-                    console.error('Error loading customers:', e);
-                }
-            }
+    config = dict(config or {})
+    create_app(config)
+    # no open database connections may be inherited by the workers
+    storage.close_all()
 
-            async function loadProducts() {
-                try {
-                    const res = await fetch('/api/products', { headers: getAuthHeaders() });
-                    if (res.status === 401) { logout(); return; }
-                    const data = await res.json();
-                    const html = '<h3>Products:</h3><table><tr><th>ID</th><th>Name</th><th>SKU</th><th>Price</th><th>Stock</th></tr>' +
-                        data.map(p => `<tr><td>${p.id}</td><td>${p.name}</td><td>${p.sku}</td><td>$${p.price.toFixed(2)}</td><td>${p.stock}</td></tr>`).join('') +
-                        '</table>';
-                    document.getElementById('productList').innerHTML = html;
-                } catch (e) {
-                    console.error('Error loading products:', e);
-                }
-            }
+    class Server(BaseApplication):
+        def load_config(self):
+            self.cfg.set('bind', f'{host}:{port}')
+            self.cfg.set('workers', workers)
+            self.cfg.set('worker_class', 'gthread')
+            self.cfg.set('threads', threads + SERVER_FEED_THREADS)
 
-            async function loadOrders() {
-                try {
-                    const res = await fetch('/api/orders', { headers: getAuthHeaders() });
-                    if (res.status === 401) { logout(); return; }
-                    const data = await res.json();
-                    const html = '<h3>Orders:</h3><table><tr><th>ID</th><th>Customer</th><th>Product</th><th>Qty</th><th>Total</th><th>Status</th></tr>' +
-                        data.map(o => `<tr><td>${o.id}</td><td>${o.customer_id}</td><td>${o.product_id}</td><td>${o.quantity}</td><td>$${o.total_price.toFixed(2)}</td><td>${o.status}</td></tr>`).join('') +
-                        '</table>';
-                    document.getElementById('orderList').innerHTML = html;
-                } catch (e) {
-                    console.error('Error loading orders:', e);
-                }
-            }
+        def load(self):
+            global request_limiter
+            app = create_app(dict(config, INIT_DB=False))
+            storage.set_max_connections(max(storage.max_connections, threads))
+            request_limiter = ConcurrencyLimiter(app, threads, queue_timeout)
+            return request_limiter
 
-            document.getElementById('customerForm').addEventListener('submit', async (e) => {
-                e.preventDefault();
-                const res = await fetch('/api/customers', {
-                    method: 'POST',
-                    headers: getAuthHeaders(),
-                    body: JSON.stringify({
-                        name: document.getElementById('custName').value,
-                        email: document.getElementById('custEmail').value,
-                        phone: document.getElementById('custPhone').value
-                    })
-                });
-                if (res.status === 401) { logout(); return; }
-                const data = await res.json();
-                document.getElementById('customerMsg').innerHTML = `<span class="success">${data.message}</span>`;
-                document.getElementById('customerForm').reset();
-                loadCustomers();
-            });
-
-            document.getElementById('productForm').addEventListener('submit', async (e) => {
-                e.preventDefault();
-                const res = await fetch('/api/products', {
-                    method: 'POST',
-                    headers: getAuthHeaders(),
-                    body: JSON.stringify({
-                        name: document.getElementById('prodName').value,
-                        sku: document.getElementById('prodSku').value,
-                        price: parseFloat(document.getElementById('prodPrice').value),
-                        stock: parseInt(document.getElementById('prodStock').value)
-                    })
-                });
-                if (res.status === 401) { logout(); return; }
-                const data = await res.json();
-                document.getElementById('productMsg').innerHTML = `<span class="success">${data.message}</span>`;
-                document.getElementById('productForm').reset();
-                loadProducts();
-            });
-
-            document.getElementById('orderForm').addEventListener('submit', async (e) => {
-                e.preventDefault();
-                const res = await fetch('/api/orders', {
-                    method: 'POST',
-                    headers: getAuthHeaders(),
-                    body: JSON.stringify({
-                        customer_id: parseInt(document.getElementById('ordCustomerId').value),
-                        product_id: parseInt(document.getElementById('ordProductId').value),
-                        quantity: parseInt(document.getElementById('ordQuantity').value)
-                    })
-                });
-                if (res.status === 401) { logout(); return; }
-                const data = await res.json();
-                if (data.status === 'success') {
-                    document.getElementById('orderMsg').innerHTML = `<span class="success">${data.message} - Total: $${data.total.toFixed(2)}</span>`;
-                } else {
-                    document.getElementById('orderMsg').innerHTML = `<span class="error">${data.message}</span>`;
-                }
-                document.getElementById('orderForm').reset();
-                loadOrders();
-            });
-
-            loadCustomers();
-            loadProducts();
-            loadOrders();
-            setInterval(() => { loadCustomers(); loadProducts(); loadOrders(); }, 5000);
-        </script>
-    </body>
-    </html>
-    '''
-    return render_template_string(html)
+    print(f"Serving on http://{host}:{port} ({workers} workers x {threads} request slots)")
+    Server().run()
 
 
 if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='ERP system with SOAP support')
+    parser.add_argument('--production', action='store_true',
+                        help='gunicorn with --workers processes of --threads request slots each, no debugger')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=5000)
+    parser.add_argument('--workers', type=int, default=SERVER_WORKERS, help='server processes in --production')
+    parser.add_argument('--threads', type=int, default=SERVER_THREADS, help='request slots per worker')
+    parser.add_argument('--backend', choices=sorted(REPOSITORIES), default='sqlite', help='storage backend')
+    parser.add_argument('--postgres-dsn', help='database for --backend postgres, e.g. postgresql://erp@localhost/erp')
+    parser.add_argument('--db', default=DB_PATH, help='SQLite database file (requests without a tenant)')
+    parser.add_argument('--shard-path', default=SHARD_PATH_TEMPLATE,
+                        help='per-tenant database file; {betrieb_id} is replaced by the tenant id')
+    parser.add_argument('--tenants', type=int, nargs='+', help='only accept these betrieb_ids')
+    parser.add_argument('--batch-window', type=float, metavar='MS',
+                        help='group-commit customer and order inserts, waiting up to MS milliseconds per batch')
+    parser.add_argument('--batch-size', type=int, default=WRITE_BATCH_SIZE, help='most writes per group commit')
+    parser.add_argument('--profile-rate', type=float, default=0.0,
+                        help='fraction of requests to profile; see /api/stats/slowest')
+    parser.add_argument('--profile-dir', help='also write the slowest profiles here as .prof files')
+    args = parser.parse_args()
+
+    config = {'STORAGE_BACKEND': args.backend, 'POSTGRES_DSN': args.postgres_dsn,
+              'DB_PATH': args.db, 'SHARD_PATH_TEMPLATE': args.shard_path, 'TENANTS': args.tenants,
+              'WRITE_BATCH_WINDOW': None if args.batch_window is None else args.batch_window / 1000,
+              'WRITE_BATCH_SIZE': args.batch_size,
+              'PROFILE_SAMPLE_RATE': args.profile_rate,
+              'PROFILE_DIR': args.profile_dir}
+    if args.production:
+        serve(config, args.host, args.port, args.workers, args.threads)
+        raise SystemExit
+
     print("=" * 60)
     print("🚀 ERP System with SOAP Support & Authentication")
     print("=" * 60)
-    print("📍 Web Dashboard: http://localhost:5000")
-    print("📍 Login Page: http://localhost:5000/login")
-    print("📍 WSDL: http://localhost:5000/wsdl")
-    print("📍 SOAP Endpoint: http://localhost:5000/soap")
+    print(f"📍 Web Dashboard: http://localhost:{args.port}")
+    print(f"📍 Login Page: http://localhost:{args.port}/login")
+    print(f"📍 WSDL: http://localhost:{args.port}/wsdl")
+    print(f"📍 SOAP Endpoint: http://localhost:{args.port}/soap")
     print("=" * 60)
     print("🔐 Test Accounts:")
     print("   Admin: admin / admin123")
     print("   User: user / user123")
     print("   Manager: manager / manager123")
     print("=" * 60)
-    app.run(debug=True, port=5000)
+    create_app(config).run(debug=True, host=args.host, port=args.port)
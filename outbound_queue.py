@@ -0,0 +1,243 @@
+"""Durable SQLite outbox for 4D SOAP pushes.
+
+Producers call ``OutboundQueue.enqueue`` (a single local insert, so the
+request path never waits on 4D); a worker drains the queue in batches with
+``process_batch``/``run``. Failed records are retried with exponential
+backoff and jitter and moved to ``dead_letters`` after ``max_attempts``, on
+a SOAP fault or when the record itself is malformed; ``replay`` puts them
+back in the queue.
+
+Usage: python outbound_queue.py [--db PATH] {run,stats,replay [ID ...]}
+"""
+import argparse
+import json
+import random
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+
+from soap_api import CustomerIdCache, FourDClient, push_orders
+
+QUEUE_DB_PATH = 'fourd_outbox.db'
+BATCH_SIZE = 50
+MAX_ATTEMPTS = 8
+RETRY_BASE = 2.0
+RETRY_MAX = 600.0
+LEASE_SECONDS = 300.0
+
+SCHEMA = '''
+    CREATE TABLE IF NOT EXISTS outbox (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        idempotency_key TEXT NOT NULL UNIQUE,
+        payload TEXT NOT NULL,
+        status TEXT NOT NULL DEFAULT 'pending',
+        attempts INTEGER NOT NULL DEFAULT 0,
+        next_attempt_at REAL NOT NULL,
+        kunde_id INTEGER,
+        order_id TEXT,
+        last_error TEXT,
+        created_at REAL NOT NULL,
+        updated_at REAL NOT NULL
+    );
+    CREATE INDEX IF NOT EXISTS idx_outbox_due ON outbox(status, next_attempt_at);
+    CREATE TABLE IF NOT EXISTS dead_letters (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        idempotency_key TEXT NOT NULL UNIQUE,
+        payload TEXT NOT NULL,
+        attempts INTEGER NOT NULL,
+        kunde_id INTEGER,
+        last_error TEXT,
+        failed_at REAL NOT NULL
+    );
+'''
+
+
+def idempotency_key(record):
+    """Default key: the webshop identification plus the shop's own order id.
+
+    The id is read from the record's ``"shop_order_id"`` (``push_orders``
+    ignores it). Without one there is nothing that tells two real orders
+    apart, so this raises instead of guessing; pass an explicit ``key`` to
+    ``enqueue`` if the id lives elsewhere.
+    """
+    webshop = record['customer'].get('webshop_identification')
+    shop_order_id = record.get('shop_order_id')
+    if not webshop or shop_order_id in (None, ''):
+        raise ValueError('record needs webshop_identification and shop_order_id; pass an explicit key')
+    return f'{webshop}:{shop_order_id}'
+
+
+def retry_delay(attempts, base=RETRY_BASE, cap=RETRY_MAX):
+    """Exponential backoff with jitter: half fixed, half random, capped at ``cap``."""
+    delay = min(cap, base * (2 ** (attempts - 1)))
+    return delay / 2 + random.uniform(0, delay / 2)
+
+
+class OutboundQueue:
+    """SQLite-backed outbox; safe to share between producer and worker threads."""
+
+    def __init__(self, path=QUEUE_DB_PATH, max_attempts=MAX_ATTEMPTS, retry_base=RETRY_BASE,
+                 retry_max=RETRY_MAX, lease_seconds=LEASE_SECONDS):
+        self.path = path
+        self.max_attempts = max_attempts
+        self.retry_base = retry_base
+        self.retry_max = retry_max
+        self.lease_seconds = lease_seconds
+        self._local = threading.local()
+        self._conn().executescript(SCHEMA)
+
+    def _conn(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30.0, isolation_level=None)
+            conn.row_factory = sqlite3.Row
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            self._local.conn = conn
+        return conn
+
+    @contextmanager
+    def _transaction(self):
+        conn = self._conn()
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            yield conn
+        except BaseException:
+            conn.execute('ROLLBACK')
+            raise
+        conn.execute('COMMIT')
+
+    def enqueue(self, record, key=None):
+        """Queue ``record`` (see ``soap_api.push_orders``).
+
+        Returns False if the same record is already queued under ``key``;
+        a different record under a known key raises ValueError rather than
+        being dropped.
+        """
+        key = key or idempotency_key(record)
+        payload = json.dumps(record)
+        now = time.time()
+        with self._transaction() as conn:
+            known = (conn.execute('SELECT payload FROM outbox WHERE idempotency_key = ?', (key,)).fetchone()
+                     or conn.execute('SELECT payload FROM dead_letters WHERE idempotency_key = ?', (key,)).fetchone())
+            if known is not None:
+                if known['payload'] != payload:
+                    raise ValueError(f'idempotency key {key!r} is already queued with a different record')
+                return False
+            conn.execute(
+                'INSERT INTO outbox (idempotency_key, payload, next_attempt_at, created_at, updated_at) '
+                'VALUES (?, ?, ?, ?, ?)', (key, payload, now, now, now))
+            return True
+
+    def claim(self, batch_size=BATCH_SIZE):
+        """Lease up to ``batch_size`` due records; expired leases are picked up again."""
+        now = time.time()
+        with self._transaction() as conn:
+            rows = conn.execute(
+                "SELECT id, payload, attempts, kunde_id FROM outbox "
+                "WHERE status IN ('pending', 'inflight') AND next_attempt_at <= ? "
+                "ORDER BY next_attempt_at LIMIT ?", (now, batch_size)).fetchall()
+            conn.executemany(
+                "UPDATE outbox SET status = 'inflight', attempts = attempts + 1, next_attempt_at = ?, "
+                "updated_at = ? WHERE id = ?", [(now + self.lease_seconds, now, row['id']) for row in rows])
+        return [(row['id'], row['attempts'] + 1, row['kunde_id'], json.loads(row['payload'])) for row in rows]
+
+    def process_batch(self, client, batch_size=BATCH_SIZE, max_workers=8):
+        """Push one claimed batch and record the outcome. Returns ``(succeeded, retried, dead)``."""
+        claimed = self.claim(batch_size)
+        if not claimed:
+            return 0, 0, 0
+        records = [dict(payload, kunde_id=kunde_id) if kunde_id else payload
+                   for _, _, kunde_id, payload in claimed]
+        try:
+            results = push_orders(records, client, max_workers=max_workers)
+        except Exception as e:
+            # push_orders reports per-record failures itself; this is the client or pool failing, so
+            # give every record its retry instead of leaving it leased until the lease expires
+            results = [{"status": "error", "kunde_id": kunde_id, "error": f"push failed: {e}", "retryable": True}
+                       for _, _, kunde_id, _ in claimed]
+
+        now = time.time()
+        done, retry, dead = [], [], []
+        for (row_id, attempts, _, _), result in zip(claimed, results):
+            if result['status'] == 'success':
+                done.append((result['kunde_id'], result.get('order_id'), now, row_id))
+            elif result.get('retryable') and attempts < self.max_attempts:
+                retry.append((now + retry_delay(attempts, self.retry_base, self.retry_max),
+                              result.get('kunde_id'), result['error'], now, row_id))
+            else:
+                dead.append((result.get('kunde_id'), result['error'], now, row_id))
+
+        with self._transaction() as conn:
+            conn.executemany(
+                "UPDATE outbox SET status = 'done', kunde_id = ?, order_id = ?, last_error = NULL, "
+                "updated_at = ? WHERE id = ?", done)
+            conn.executemany(
+                "UPDATE outbox SET status = 'pending', next_attempt_at = ?, kunde_id = ?, last_error = ?, "
+                "updated_at = ? WHERE id = ?", retry)
+            for kunde_id, error, failed_at, row_id in dead:
+                conn.execute(
+                    'INSERT INTO dead_letters (idempotency_key, payload, attempts, kunde_id, last_error, failed_at) '
+                    'SELECT idempotency_key, payload, attempts, ?, ?, ? FROM outbox WHERE id = ?',
+                    (kunde_id, error, failed_at, row_id))
+                conn.execute('DELETE FROM outbox WHERE id = ?', (row_id,))
+        return len(done), len(retry), len(dead)
+
+    def run(self, client, stop=None, batch_size=BATCH_SIZE, max_workers=8, idle_sleep=1.0):
+        """Drain the queue until ``stop`` (a ``threading.Event``) is set."""
+        stop = stop or threading.Event()
+        while not stop.is_set():
+            if not any(self.process_batch(client, batch_size, max_workers)):
+                stop.wait(idle_sleep)
+
+    def replay(self, ids=None):
+        """Move dead letters (all, or the given ids) back into the queue. Returns the count."""
+        now = time.time()
+        with self._transaction() as conn:
+            where, args = '', ()
+            if ids:
+                where = f" WHERE id IN ({', '.join('?' * len(ids))})"
+                args = tuple(ids)
+            rows = conn.execute(f'SELECT id, idempotency_key, payload, kunde_id FROM dead_letters{where}',
+                                args).fetchall()
+            for row in rows:
+                conn.execute(
+                    'INSERT OR REPLACE INTO outbox (idempotency_key, payload, kunde_id, next_attempt_at, '
+                    'created_at, updated_at) VALUES (?, ?, ?, ?, ?, ?)',
+                    (row['idempotency_key'], row['payload'], row['kunde_id'], now, now, now))
+                conn.execute('DELETE FROM dead_letters WHERE id = ?', (row['id'],))
+        return len(rows)
+
+    def stats(self):
+        conn = self._conn()
+        counts = dict(conn.execute('SELECT status, COUNT(*) FROM outbox GROUP BY status').fetchall())
+        counts['dead'] = conn.execute('SELECT COUNT(*) FROM dead_letters').fetchone()[0]
+        return counts
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--db', default=QUEUE_DB_PATH)
+    sub = parser.add_subparsers(dest='command', required=True)
+    sub.add_parser('run')
+    sub.add_parser('stats')
+    replay = sub.add_parser('replay')
+    replay.add_argument('ids', nargs='*', type=int)
+    args = parser.parse_args()
+
+    queue = OutboundQueue(args.db)
+    if args.command == 'stats':
+        print(queue.stats())
+    elif args.command == 'replay':
+        print(f'replayed {queue.replay(args.ids)} dead letters')
+    else:
+        with FourDClient(customer_cache=CustomerIdCache()) as client:
+            try:
+                queue.run(client)
+            except KeyboardInterrupt:
+                pass
+
+
+if __name__ == '__main__':
+    main()
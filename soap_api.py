@@ -1,83 +1,495 @@
+import hashlib
+import json
+import random
+import sqlite3
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from decimal import Decimal, InvalidOperation
+
 import requests
-from xml.etree import ElementTree as ET
+from requests.adapters import HTTPAdapter
+from lxml import etree
+from urllib3.util.retry import Retry
+from xml.sax.saxutils import escape
 
 endpoint = "https://185.243.116.132:22704/4DSOAP/"
 auth = ("WebUser", "Black-1981-Rose")
-headers = {
-"Content-Type": "text/xml; charset=utf-8",
-"SOAPAction": "A_WebService#ws_wes_kunde_save"
-}
-
-print('endpoint: ', endpoint)
-print('auth: ', auth)
-
-kunde_xml = """<?xml version="1.0" encoding="UTF-8"?>
-<SOAP-ENV:Envelope
-xmlns:SOAP-ENV="http://schemas.xmlsoap.org/soap/envelope/"
-xmlns:xsd="http://www.w3.org/2001/XMLSchema"
-xmlns:xsi="http://www.w3.org/2001/XMLSchema-instance"
-xmlns:tns="http://www.4d.com/namespace/default"
-SOAP-ENV:encodingStyle="http://schemas.xmlsoap.org/soap/encoding/">
-SOAP-ENV:Body
-tns:ws_wes_kunde_save
-<betrieb_id xsi:type="xsd:int">1</betrieb_id>
-<kunde_anrede xsi:type="xsd:string">Herr</kunde_anrede>
-<kunde_vorname xsi:type="xsd:string">Alice</kunde_vorname>
-<kunde_nachname xsi:type="xsd:string">Beispiel</kunde_nachname>
-<kunde_firmenname xsi:type="xsd:string">Example GmbH</kunde_firmenname>
-<kunde_strasse_nr xsi:type="xsd:string">Beispielweg 1</kunde_strasse_nr>
-<kunde_plz xsi:type="xsd:string">12345</kunde_plz>
-<kunde_ort xsi:type="xsd:string">Musterstadt</kunde_ort>
-<kunde_land xsi:type="xsd:string">Deutschland</kunde_land>
-<kunde_land_iso xsi:type="xsd:string">DE</kunde_land_iso>
-<kunde_telefon xsi:type="xsd:string">+49 111 2222</kunde_telefon>
-<kunde_email xsi:type="xsd:string">alice.beispiel@example.test</kunde_email>
-<kunde_id_input xsi:type="xsd:int" xsi:nil="true"/>
-<kontakt_id_input xsi:type="xsd:int" xsi:nil="true"/>
-<kunde_is_disabled xsi:type="xsd:boolean">false</kunde_is_disabled>
-<webshop_identification xsi:type="xsd:string">Shopify</webshop_identification>
-<optional_data xsi:type="tns:ArrayOfstring" xsi:nil="true"/>
-</tns:ws_wes_kunde_save>
-</SOAP-ENV:Body>
-</SOAP-ENV:Envelope>"""
-
-print('kunde_xml: ', kunde_xml)
-
-r = requests.post(endpoint, data=kunde_xml, headers=headers, auth=auth, timeout=30, verify=False)
-print(r.status_code)
-print(r.text)
-
-
-try:
-    ns = {'ns': 'http://www.4d.com/namespace/default'}
-    root = ET.fromstring(r.text)
-    kunde_id = root.find('.//{http://www.4d.com/namespace/default}kunde_id')
-    if kunde_id is not None:
-        print("kunde_id:", kunde_id.text)
-        order_headers = {
-        "Content-Type": "text/xml; charset=utf-8",
-        "SOAPAction": "A_WebService#ws_wes_order_save"
-        }
-        order_xml = """<SOAP-ENV:Envelope
-        xmlns:SOAP-ENV="http://schemas.xmlsoap.org/soap/envelope/"
-        xmlns:xsd="http://www.w3.org/2001/XMLSchema"
-        xmlns:xsi="http://www.w3.org/2001/XMLSchema-instance"
-        xmlns:tns="http://www.4d.com/namespace/default"
-        SOAP-ENV:encodingStyle="http://schemas.xmlsoap.org/soap/encoding/">
-        SOAP-ENV:Body
-        tns:ws_wes_order_save
-        <betrieb_id xsi:type="xsd:int">1</betrieb_id>
-        <kunde_id xsi:type="xsd:int">{}</kunde_id>
-        <order_date xsi:type="xsd:string">2025-12-01</order_date>
-        <order_total xsi:type="xsd:decimal">99.99</order_total>
-        </tns:ws_wes_order_save>
-        </SOAP-ENV:Body>
-        </SOAP-ENV:Envelope>""".format(kunde_id.text)
-
-        o = requests.post(endpoint, data=order_xml, headers=order_headers, auth=auth, timeout=30)
-        print(o.status_code)
-        print(o.text)
-    else:
-        print("kunde_id not found; cannot proceed with order creation.")
-except Exception as e:
-    print("Error parsing response:", e)
\ No newline at end of file
+
+TNS = "http://www.4d.com/namespace/default"
+SOAP_ENV = "http://schemas.xmlsoap.org/soap/envelope/"
+
+
+class FourDError(Exception):
+    """Transport or protocol error talking to the 4D SOAP server."""
+
+
+class FourDFault(FourDError):
+    """SOAP fault returned by the 4D server."""
+
+    def __init__(self, faultcode, faultstring):
+        super().__init__(f"{faultcode}: {faultstring}")
+        self.faultcode = faultcode
+        self.faultstring = faultstring
+
+
+class FourDBusy(FourDError):
+    """The 4D server is shedding load (HTTP 429/503)."""
+
+    def __init__(self, message, retry_after=None):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+# ==================== ENVELOPE TEMPLATES ====================
+
+def _format_value(xsd_type, value):
+    """Render one scalar; numbers are parsed first so nothing but digits reaches the XML."""
+    if xsd_type == "xsd:boolean":
+        return "true" if value else "false"
+    if xsd_type in ("xsd:int", "xsd:decimal"):
+        try:
+            number = Decimal(value if isinstance(value, int) else str(value))
+        except InvalidOperation:
+            number = None
+        if number is None or not number.is_finite() or (xsd_type == "xsd:int" and number != int(number)):
+            raise ValueError(f"not an {xsd_type}: {value!r}")
+        return str(int(number)) if xsd_type == "xsd:int" else f"{number:f}"
+    return escape(str(value))
+
+
+class EnvelopeTemplate:
+    """RPC envelope for one 4D operation, with per-parameter tags built once.
+
+    ``params`` lists ``(name, xsd_type)`` in the order 4D expects them.
+    ``None`` values are sent as ``xsi:nil``; lists are sent as string arrays.
+    """
+
+    def __init__(self, operation, params):
+        self.operation = operation
+        self.soap_action = f"A_WebService#{operation}"
+        self.prefix = (
+            '<?xml version="1.0" encoding="UTF-8"?>\n'
+            f'<SOAP-ENV:Envelope xmlns:SOAP-ENV="{SOAP_ENV}"'
+            ' xmlns:SOAP-ENC="http://schemas.xmlsoap.org/soap/encoding/"'
+            ' xmlns:xsd="http://www.w3.org/2001/XMLSchema"'
+            ' xmlns:xsi="http://www.w3.org/2001/XMLSchema-instance"'
+            f' xmlns:tns="{TNS}"'
+            ' SOAP-ENV:encodingStyle="http://schemas.xmlsoap.org/soap/encoding/">'
+            f'<SOAP-ENV:Body><tns:{operation}>'
+        )
+        self.suffix = f'</tns:{operation}></SOAP-ENV:Body></SOAP-ENV:Envelope>'
+        self.params = [
+            (name, xsd_type, f'<{name} xsi:type="{xsd_type}">', f'</{name}>',
+             f'<{name} xsi:type="{xsd_type}" xsi:nil="true"/>')
+            for name, xsd_type in params
+        ]
+
+    def render(self, values):
+        parts = [self.prefix]
+        for name, xsd_type, open_tag, close_tag, nil_tag in self.params:
+            value = values.get(name)
+            if value is None:
+                parts.append(nil_tag)
+            elif isinstance(value, (list, tuple)):
+                parts.append(f'<{name} xsi:type="{xsd_type}" SOAP-ENC:arrayType="xsd:string[{len(value)}]">')
+                parts.extend(f'<item xsi:type="xsd:string">{escape(str(item))}</item>' for item in value)
+                parts.append(close_tag)
+            else:
+                parts.append(open_tag)
+                parts.append(_format_value(xsd_type, value))
+                parts.append(close_tag)
+        parts.append(self.suffix)
+        return "".join(parts).encode("utf-8")
+
+
+KUNDE_SAVE = EnvelopeTemplate("ws_wes_kunde_save", [
+    ("betrieb_id", "xsd:int"),
+    ("kunde_anrede", "xsd:string"),
+    ("kunde_vorname", "xsd:string"),
+    ("kunde_nachname", "xsd:string"),
+    ("kunde_firmenname", "xsd:string"),
+    ("kunde_strasse_nr", "xsd:string"),
+    ("kunde_plz", "xsd:string"),
+    ("kunde_ort", "xsd:string"),
+    ("kunde_land", "xsd:string"),
+    ("kunde_land_iso", "xsd:string"),
+    ("kunde_telefon", "xsd:string"),
+    ("kunde_email", "xsd:string"),
+    ("kunde_id_input", "xsd:int"),
+    ("kontakt_id_input", "xsd:int"),
+    ("kunde_is_disabled", "xsd:boolean"),
+    ("webshop_identification", "xsd:string"),
+    ("optional_data", "tns:ArrayOfstring"),
+])
+
+ORDER_SAVE = EnvelopeTemplate("ws_wes_order_save", [
+    ("betrieb_id", "xsd:int"),
+    ("kunde_id", "xsd:int"),
+    ("order_date", "xsd:string"),
+    ("order_total", "xsd:decimal"),
+])
+
+
+# ==================== RESPONSE PARSING ====================
+
+RESPONSE_CHUNK_SIZE = 16 * 1024
+DRAIN_LIMIT = 256 * 1024
+FAULT_TAGS = frozenset(("Fault", "faultcode", "faultstring"))
+
+
+def _drain(chunks):
+    """Read (without parsing) what is left of a response, so the connection can be reused.
+
+    Bodies with more than ``DRAIN_LIMIT`` bytes left are abandoned instead;
+    closing the response then drops that connection.
+    """
+    drained = 0
+    for chunk in chunks:
+        drained += len(chunk)
+        if drained > DRAIN_LIMIT:
+            return
+
+
+# ==================== CUSTOMER ID CACHE ====================
+
+CUSTOMER_CACHE_PATH = "fourd_customers.db"
+CUSTOMER_CACHE_TTL = 7 * 24 * 3600.0
+
+
+class CustomerIdCache:
+    """Persistent map of (email, webshop_identification, betrieb_id) -> 4D ``kunde_id``.
+
+    Each entry stores a hash of the customer fields that were last sent, so a
+    lookup only hits when the customer is unchanged and the entry is younger
+    than ``ttl`` seconds. Entries are kept in memory and written through to
+    SQLite so they survive restarts. ``push_orders`` invalidates an entry
+    when 4D faults the order saved for it (e.g. the customer was deleted).
+    """
+
+    def __init__(self, path=CUSTOMER_CACHE_PATH, ttl=CUSTOMER_CACHE_TTL):
+        self.ttl = ttl
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        columns = [row[1] for row in self.conn.execute("PRAGMA table_info(customer_ids)")]
+        if columns and "betrieb_id" not in columns:
+            # entries from before betrieb_id was part of the key cannot be attributed to a tenant
+            self.conn.execute("DROP TABLE customer_ids")
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS customer_ids ("
+            " email TEXT NOT NULL, webshop_identification TEXT NOT NULL, betrieb_id INTEGER NOT NULL,"
+            " kunde_id INTEGER NOT NULL, content_hash TEXT NOT NULL, saved_at REAL NOT NULL,"
+            " PRIMARY KEY (email, webshop_identification, betrieb_id))")
+        self.entries = {(email, webshop, betrieb_id): (kunde_id, content_hash, saved_at)
+                        for email, webshop, betrieb_id, kunde_id, content_hash, saved_at
+                        in self.conn.execute("SELECT * FROM customer_ids")}
+
+    @staticmethod
+    def key(fields):
+        return (fields.get("kunde_email", "").strip().lower(), fields.get("webshop_identification") or "",
+                int(fields["betrieb_id"]))
+
+    @staticmethod
+    def content_hash(fields):
+        return hashlib.sha256(json.dumps(fields, sort_keys=True, default=str).encode("utf-8")).hexdigest()
+
+    def get(self, fields):
+        """Return the cached ``kunde_id`` if these exact fields were saved within the TTL."""
+        key = self.key(fields)
+        with self.lock:
+            entry = self.entries.get(key)
+            if (entry is not None and time.time() - entry[2] < self.ttl
+                    and entry[1] == self.content_hash(fields)):
+                self.hits += 1
+                return entry[0]
+            self.misses += 1
+            return None
+
+    def put(self, fields, kunde_id):
+        key = self.key(fields)
+        if not key[0]:
+            return
+        entry = (kunde_id, self.content_hash(fields), time.time())
+        with self.lock:
+            self.entries[key] = entry
+            self.conn.execute("INSERT OR REPLACE INTO customer_ids VALUES (?, ?, ?, ?, ?, ?)", key + entry)
+
+    def invalidate(self, fields):
+        """Drop the entry for ``fields``; returns whether there was one."""
+        key = self.key(fields)
+        with self.lock:
+            entry = self.entries.pop(key, None)
+            self.conn.execute(
+                "DELETE FROM customer_ids WHERE email = ? AND webshop_identification = ? AND betrieb_id = ?", key)
+        return entry is not None
+
+    def stats(self):
+        with self.lock:
+            return {"entries": len(self.entries), "hits": self.hits, "misses": self.misses}
+
+
+# ==================== CLIENT ====================
+
+class FourDClient:
+    """Client for the 4D ``A_WebService`` SOAP operations.
+
+    One ``requests.Session`` is kept for the client's lifetime, so TCP/TLS
+    connections are reused (up to ``pool_size`` per host). Only failures to
+    connect, which happen before the request is sent, are retried with
+    backoff, since the save operations are not idempotent: a 502/504 or a
+    read timeout may come after 4D has already saved the record. 429/503
+    are raised at once as ``FourDBusy`` so that ``push_orders`` can pause
+    every worker instead of each one retrying on its own.
+
+    With a ``customer_cache`` (``CustomerIdCache``), ``save_customer`` skips
+    the round trip for customers whose fields have not changed.
+    """
+
+    def __init__(self, endpoint=endpoint, auth=auth, timeout=(5, 30), retries=3, backoff=0.3,
+                 pool_size=10, verify=True, customer_cache=None):
+        self.endpoint = endpoint
+        self.customer_cache = customer_cache
+        self._customer_source = threading.local()
+        self.timeout = timeout
+        self.session = requests.Session()
+        self.session.auth = auth
+        self.session.verify = verify
+        retry = Retry(total=retries, connect=retries, read=0, other=0, status=0, backoff_factor=backoff,
+                      allowed_methods=None, raise_on_status=False)
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size, max_retries=retry)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+    def close(self):
+        self.session.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def call(self, template, values, fields=None):
+        """POST one operation and return leaf elements of its response as a dict.
+
+        The body is fed to a pull parser as it arrives. With ``fields`` (an
+        iterable of element names) only those elements (and faults) are
+        reported, and reading stops as soon as all of them have been seen;
+        otherwise every leaf element is returned.
+        """
+        try:
+            response = self.session.post(
+                self.endpoint, data=template.render(values), timeout=self.timeout, stream=True,
+                headers={"Content-Type": "text/xml; charset=utf-8", "SOAPAction": template.soap_action})
+            try:
+                return self._parse_response(template, response, fields)
+            finally:
+                response.close()
+        except requests.RequestException as e:
+            raise FourDError(f"{template.operation} failed: {e}") from e
+
+    @staticmethod
+    def _parse_response(template, response, fields=None):
+        if response.status_code in (429, 503):
+            retry_after = response.headers.get("Retry-After")
+            raise FourDBusy(f"{template.operation} returned HTTP {response.status_code}",
+                            float(retry_after) if retry_after and retry_after.isdigit() else None)
+
+        wanted = frozenset(fields) if fields else None
+        parser = etree.XMLPullParser(events=("end",), resolve_entities=False, no_network=True)
+        found = {}
+        fault = {}
+        chunks = response.iter_content(RESPONSE_CHUNK_SIZE)
+        try:
+            for chunk in chunks:
+                parser.feed(chunk)
+                for _, element in parser.read_events():
+                    name = element.tag.rpartition("}")[2]
+                    if len(element) == 0:
+                        if name in FAULT_TAGS:
+                            fault[name] = element.text
+                        elif wanted is None or name in wanted:
+                            found[name] = element.text
+                    elif name == "Fault":
+                        raise FourDFault(fault.get("faultcode"), fault.get("faultstring"))
+                    # keep only the open path and the last finished element, however long the body is
+                    element.clear(keep_tail=False)
+                    if element.getprevious() is not None:
+                        del element.getparent()[0]
+                if wanted is not None and response.status_code < 400 and wanted <= found.keys():
+                    _drain(chunks)
+                    return found
+            parser.close()
+        except etree.XMLSyntaxError:
+            raise FourDError(f"{template.operation} returned HTTP {response.status_code} "
+                             f"with a non-XML body") from None
+
+        if response.status_code >= 400:
+            raise FourDError(f"{template.operation} returned HTTP {response.status_code}")
+        return found
+
+    def save_customer(self, *, betrieb_id: int, kunde_vorname: str, kunde_nachname: str, kunde_email: str,
+                      kunde_anrede: str = "", kunde_firmenname: str = "", kunde_strasse_nr: str = "",
+                      kunde_plz: str = "", kunde_ort: str = "", kunde_land: str = "", kunde_land_iso: str = "",
+                      kunde_telefon: str = "", kunde_id_input: int = None, kontakt_id_input: int = None,
+                      kunde_is_disabled: bool = False, webshop_identification: str = "",
+                      optional_data: list = None) -> int:
+        """Create or update a customer via ``ws_wes_kunde_save`` and return its ``kunde_id``."""
+        fields = {name: value for name, value in locals().items() if name != "self"}
+        self._customer_source.cached = False
+        if self.customer_cache is not None:
+            kunde_id = self.customer_cache.get(fields)
+            if kunde_id is not None:
+                self._customer_source.cached = True
+                return kunde_id
+
+        result = self.call(KUNDE_SAVE, fields, ("kunde_id",))
+        kunde_id = result.get("kunde_id")
+        if not kunde_id:
+            raise FourDError("ws_wes_kunde_save response has no kunde_id")
+        kunde_id = int(kunde_id)
+        if self.customer_cache is not None:
+            self.customer_cache.put(fields, kunde_id)
+        return kunde_id
+
+    def customer_id_was_cached(self):
+        """Whether this thread's last ``save_customer`` answered from ``customer_cache``."""
+        return getattr(self._customer_source, "cached", False)
+
+    def save_order(self, *, betrieb_id: int, kunde_id: int, order_date: str, order_total) -> dict:
+        """Create an order via ``ws_wes_order_save`` and return the response fields."""
+        return self.call(ORDER_SAVE, locals())
+
+
+# ==================== BULK PUSH ====================
+
+BUSY_RETRIES = 5
+BUSY_BACKOFF = 0.5
+
+
+class _Backpressure:
+    """Shared pause gate: when the server reports it is busy, every worker waits."""
+
+    def __init__(self, backoff):
+        self.backoff = backoff
+        self.lock = threading.Lock()
+        self.resume_at = 0.0
+
+    def wait(self):
+        delay = self.resume_at - time.monotonic()
+        if delay > 0:
+            time.sleep(delay)
+
+    def busy(self, attempt, retry_after=None):
+        delay = retry_after or self.backoff * (2 ** attempt) * (0.5 + random.random())
+        with self.lock:
+            self.resume_at = max(self.resume_at, time.monotonic() + delay)
+
+
+def _push_record(client, gate, index, record, busy_retries):
+    kunde_id = record.get("kunde_id")
+    result = {"index": index, "status": "error", "kunde_id": kunde_id}
+    cache = getattr(client, "customer_cache", None)
+    from_cache = refreshed = False
+    for attempt in range(busy_retries + 1):
+        gate.wait()
+        try:
+            if kunde_id is None:
+                kunde_id = client.save_customer(**record["customer"])
+                result["kunde_id"] = kunde_id
+                from_cache = cache is not None and client.customer_id_was_cached()
+            result.update(client.save_order(kunde_id=kunde_id, **record["order"]))
+            result["status"] = "success"
+            result.pop("error", None)
+            result.pop("retryable", None)
+            return result
+        except FourDBusy as e:
+            gate.busy(attempt, e.retry_after)
+            result["error"] = str(e)
+            result["retryable"] = True
+        except FourDFault as e:
+            result["error"] = str(e)
+            result["retryable"] = False
+            # a cached kunde_id may no longer exist in 4D: drop it and save the customer once more
+            if from_cache and not refreshed:
+                cache.invalidate(record["customer"])
+                kunde_id = result["kunde_id"] = None
+                result["retryable"] = refreshed = True
+                continue
+            return result
+        except FourDError as e:
+            result["error"] = str(e)
+            result["retryable"] = True
+            return result
+        except Exception as e:
+            # a malformed record (unknown payload key, non-numeric id, ...) fails the same way every time
+            result["error"] = f"{type(e).__name__}: {e}"
+            result["retryable"] = False
+            return result
+    return result
+
+
+def push_orders(records, client=None, max_workers=8, busy_retries=BUSY_RETRIES, busy_backoff=BUSY_BACKOFF):
+    """Save each record's customer and then its order, ``max_workers`` records at a time.
+
+    ``records`` is an iterable of ``{"customer": {...save_customer kwargs},
+    "order": {...save_order kwargs without kunde_id}}`` (plus ``"kunde_id"``
+    if the customer is already saved) and is consumed lazily, so at most
+    ``2 * max_workers`` records are held in memory. When the server
+    answers 429/503 all workers pause (``Retry-After`` or exponential backoff
+    with jitter) and the failed step is retried; a customer that was already
+    saved is not saved again. If 4D faults an order whose ``kunde_id`` came
+    from the client's customer cache, the entry is invalidated and the
+    customer saved once more before giving up. Returns one result dict per
+    record, in input order: ``{"index", "status": "success"|"error", "kunde_id", "order_id"|"error"}``;
+    errors also carry ``"retryable"`` (False for SOAP faults and for records
+    that raise anything else, e.g. a bad payload key).
+    """
+    own_client = client is None
+    if own_client:
+        client = FourDClient(pool_size=max_workers)
+    gate = _Backpressure(busy_backoff)
+    results = []
+    pending = set()
+    try:
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            for index, record in enumerate(records):
+                if len(pending) >= 2 * max_workers:
+                    done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                    results.extend(f.result() for f in done)
+                pending.add(executor.submit(_push_record, client, gate, index, record, busy_retries))
+            results.extend(f.result() for f in pending)
+    finally:
+        if own_client:
+            client.close()
+    results.sort(key=lambda r: r["index"])
+    return results
+
+
+if __name__ == "__main__":
+    print('endpoint: ', endpoint)
+
+    with FourDClient(endpoint, auth, verify=False) as client:
+        try:
+            kunde_id = client.save_customer(
+                betrieb_id=1,
+                kunde_anrede="Herr",
+                kunde_vorname="Alice",
+                kunde_nachname="Beispiel",
+                kunde_firmenname="Example GmbH",
+                kunde_strasse_nr="Beispielweg 1",
+                kunde_plz="12345",
+                kunde_ort="Musterstadt",
+                kunde_land="Deutschland",
+                kunde_land_iso="DE",
+                kunde_telefon="+49 111 2222",
+                kunde_email="alice.beispiel@example.test",
+                webshop_identification="Shopify",
+            )
+            print("kunde_id:", kunde_id)
+            print(client.save_order(betrieb_id=1, kunde_id=kunde_id, order_date="2025-12-01", order_total="99.99"))
+        except FourDError as e:
+            print("Error:", e)
@@ -0,0 +1,131 @@
+import base64
+import json
+import sqlite3
+import threading
+
+import pytest
+
+import erp_system
+
+HEADERS = {'Authorization': 'Basic ' + base64.b64encode(b'admin:admin123').decode()}
+
+
+@pytest.fixture
+def client(tmp_path):
+    app = erp_system.create_app({'DB_PATH': str(tmp_path / 'erp.db'),
+                                 'SHARD_PATH_TEMPLATE': str(tmp_path / 'erp_tenant_{betrieb_id}.db')})
+    yield app.test_client()
+    erp_system.storage.close_all()
+
+
+def test_etag_changes_on_writes_from_another_process(client, tmp_path):
+    first = client.get('/api/products', headers=HEADERS)
+    etag = first.headers['ETag']
+    assert client.get('/api/products', headers=dict(HEADERS, **{'If-None-Match': etag})).status_code == 304
+
+    # another worker process writes to the same database file
+    conn = sqlite3.connect(tmp_path / 'erp.db')
+    conn.execute("INSERT INTO products (name, sku, price, stock) VALUES ('Other', 'SKU-OTHER', 1.0, 1)")
+    conn.commit()
+    conn.close()
+
+    second = client.get('/api/products', headers=dict(HEADERS, **{'If-None-Match': etag}))
+    assert second.status_code == 200 and second.headers['ETag'] != etag
+    assert [row['sku'] for row in json.loads(second.data)] == ['SKU-OTHER']
+
+
+def test_unpaged_product_lists_are_served_from_the_cache(client):
+    client.post('/api/products', headers=HEADERS,
+                json={'name': 'Widget', 'sku': 'SKU-1', 'price': 2.5, 'stock': 3})
+    envelope = (f'<soap:Envelope xmlns:soap="{erp_system.SOAP_ENV_NS}"><soap:Body>'
+                f'<GetProducts xmlns="{erp_system.ERP_NS}"/></soap:Body></soap:Envelope>')
+    for _ in range(3):
+        rest = client.get('/api/products', headers=HEADERS)
+        soap = client.post('/soap', headers=dict(HEADERS, **{'Content-Type': 'text/xml'}), data=envelope)
+        assert [row['sku'] for row in json.loads(rest.data)] == ['SKU-1']
+        assert b'SKU-1' in soap.data and b'Fault' not in soap.data
+
+    stats = erp_system.storage.default.product_cache.stats()
+    assert stats['response_hits'] >= 4
+
+
+def test_concurrent_migrations_apply_each_step_once(tmp_path):
+    path = str(tmp_path / 'race.db')
+    conns = [sqlite3.connect(path, timeout=30, check_same_thread=False) for _ in range(8)]
+    # every migrator has read the old version before any of them takes the write lock
+    barrier = threading.Barrier(len(conns))
+    versions, errors = [], []
+
+    class Connection:
+        def __init__(self, conn):
+            self.conn = conn
+            self.reads = 0
+
+        def execute(self, sql, *args):
+            result = self.conn.execute(sql, *args)
+            if sql == 'PRAGMA user_version' and self.reads == 0:
+                self.reads += 1
+                barrier.wait()
+            return result
+
+        def __getattr__(self, name):
+            return getattr(self.conn, name)
+
+    def run(conn):
+        try:
+            versions.append(erp_system.migrate(Connection(conn)))
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=run, args=(conn,)) for conn in conns]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    for conn in conns:
+        conn.close()
+    assert errors == []
+    assert versions == [len(erp_system.MIGRATIONS)] * len(conns)
+
+
+def test_sync_with_an_expired_token_reloads_and_continues(client):
+    def add(sku):
+        client.post('/api/products', headers=HEADERS, json={'name': sku, 'sku': sku, 'price': 1.0, 'stock': 1})
+
+    add('SKU-0')
+    token = json.loads(client.get('/api/changes?since=0', headers=HEADERS).data)['token']
+    for i in range(1, 6):
+        add(f'SKU-{i}')
+    deleted, min_since = erp_system.compact_changes(keep=2)
+    assert deleted > 0 and min_since > token
+
+    expired = json.loads(client.get(f'/api/changes?since={token}', headers=HEADERS).data)
+    assert expired['status'] == 'error' and expired['min_since'] == min_since
+
+    # full resync, then continue from min_since
+    products = json.loads(client.get('/api/products', headers=HEADERS).data)
+    assert [row['sku'] for row in products] == [f'SKU-{i}' for i in range(6)]
+    add('SKU-6')
+    resumed = json.loads(client.get(f"/api/changes?since={expired['min_since']}", headers=HEADERS).data)
+    assert resumed['status'] == 'success'
+    assert 'SKU-6' in [row['sku'] for row in resumed['changes']['products']]
+
+
+def test_duplicate_skus_fail_only_their_own_batch_items(client):
+    client.post('/api/products', headers=HEADERS, json={'name': 'A', 'sku': 'SKU-A', 'price': 1.0, 'stock': 1})
+    batch = [{'name': 'A again', 'sku': 'SKU-A', 'price': 1.0, 'stock': 1},
+             {'name': 'B', 'sku': 'SKU-B', 'price': 2.0, 'stock': 2},
+             {'name': 'B again', 'sku': 'SKU-B', 'price': 2.0, 'stock': 2}]
+    result = json.loads(client.post('/api/products/batch', headers=HEADERS, json=batch).data)
+    assert result['status'] == 'partial' and (result['succeeded'], result['failed']) == (1, 2)
+    assert [item['status'] for item in result['results']] == ['error', 'success', 'error']
+    assert result['results'][0]['message'] == 'SKU already exists: SKU-A'
+    products = json.loads(client.get('/api/products', headers=HEADERS).data)
+    assert [row['sku'] for row in products] == ['SKU-A', 'SKU-B']
+
+
+def test_unknown_stream_mode_is_rejected(client):
+    for table in ('customers', 'products', 'orders'):
+        response = client.get(f'/api/{table}?stream=csv', headers=HEADERS)
+        assert response.status_code == 400 and 'csv' in json.loads(response.data)['message']
+    assert client.get('/api/orders?stream=ndjson', headers=HEADERS).status_code == 200
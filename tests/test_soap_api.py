@@ -0,0 +1,97 @@
+import pytest
+
+import soap_api
+from soap_api import CustomerIdCache, FourDClient, FourDFault, push_orders
+
+CUSTOMER = {'betrieb_id': 1, 'kunde_vorname': 'Alice', 'kunde_nachname': 'Beispiel',
+            'kunde_email': 'alice@example.test', 'webshop_identification': 'Shopify'}
+ORDER = {'betrieb_id': 1, 'order_date': '2025-12-01', 'order_total': '99.99'}
+
+
+class FakeFourD(FourDClient):
+    """Answers ``call`` in memory: kunde_save hands out new ids, order_save faults for unknown ones."""
+
+    def __init__(self, customer_cache=None):
+        super().__init__('http://4d.invalid/', ('user', 'secret'), customer_cache=customer_cache)
+        self.known = set()
+        self.kunde_saves = 0
+        self.order_fault = None
+
+    def call(self, template, values, fields=None):
+        if template is soap_api.KUNDE_SAVE:
+            self.kunde_saves += 1
+            kunde_id = 100 + self.kunde_saves
+            self.known.add(kunde_id)
+            return {'kunde_id': str(kunde_id)}
+        if self.order_fault or values['kunde_id'] not in self.known:
+            raise FourDFault('Client', self.order_fault or 'unknown kunde_id')
+        return {'order_id': f"O-{values['kunde_id']}"}
+
+
+def test_order_fault_for_new_customer_saves_it_once(tmp_path):
+    client = FakeFourD(CustomerIdCache(str(tmp_path / 'customers.db')))
+    client.order_fault = 'order rejected'
+
+    (result,) = push_orders([{'customer': CUSTOMER, 'order': ORDER}], client, max_workers=1)
+
+    assert client.kunde_saves == 1
+    assert result['status'] == 'error' and result['retryable'] is False
+    assert result['kunde_id'] == 101
+
+
+def test_order_fault_for_cached_customer_resaves_it(tmp_path):
+    client = FakeFourD(CustomerIdCache(str(tmp_path / 'customers.db')))
+    assert push_orders([{'customer': CUSTOMER, 'order': ORDER}], client, max_workers=1)[0]['status'] == 'success'
+    client.known.clear()  # 4D no longer knows the cached kunde_id
+
+    (result,) = push_orders([{'customer': CUSTOMER, 'order': ORDER}], client, max_workers=1)
+
+    assert client.kunde_saves == 2
+    assert result == {'index': 0, 'status': 'success', 'kunde_id': 102, 'order_id': 'O-102'}
+
+
+def test_customer_cache_is_per_betrieb(tmp_path):
+    client = FakeFourD(CustomerIdCache(str(tmp_path / 'customers.db')))
+    records = [{'customer': dict(CUSTOMER, betrieb_id=betrieb_id), 'order': ORDER} for betrieb_id in (1, 2, 1)]
+
+    results = push_orders(records, client, max_workers=1)
+
+    assert [r['kunde_id'] for r in results] == [101, 102, 101]
+    assert client.kunde_saves == 2
+
+
+def test_numeric_parameters_are_parsed_not_pasted():
+    body = soap_api.ORDER_SAVE.render({'betrieb_id': '7', 'kunde_id': 12, 'order_total': 19.5})
+    assert b'<betrieb_id xsi:type="xsd:int">7</betrieb_id>' in body
+    assert b'<order_total xsi:type="xsd:decimal">19.5</order_total>' in body
+    for values in ({'betrieb_id': '1</betrieb_id><injected/>'}, {'betrieb_id': '1.5'},
+                   {'order_total': '1<x/>'}, {'order_total': 'NaN'}):
+        with pytest.raises(ValueError):
+            soap_api.ORDER_SAVE.render(values)
+
+
+class FakeResponse:
+    status_code = 200
+    headers = {}
+
+    def __init__(self, body):
+        self.body = body.encode('utf-8')
+
+    def iter_content(self, size):
+        return (self.body[i:i + size] for i in range(0, len(self.body), size))
+
+
+def envelope(body):
+    return (f'<SOAP-ENV:Envelope xmlns:SOAP-ENV="{soap_api.SOAP_ENV}"><SOAP-ENV:Body>{body}'
+            '</SOAP-ENV:Body></SOAP-ENV:Envelope>')
+
+
+def test_parse_response_reads_leaves_past_a_long_array():
+    items = '<item>x</item>' * 50000
+    response = FakeResponse(envelope(f'<r><optional_data>{items}</optional_data><kunde_id>7</kunde_id></r>'))
+    assert FourDClient._parse_response(soap_api.KUNDE_SAVE, response, ['kunde_id']) == {'kunde_id': '7'}
+
+    fault = FakeResponse(envelope('<SOAP-ENV:Fault><faultcode>Server</faultcode>'
+                                  '<faultstring>no such kunde</faultstring></SOAP-ENV:Fault>'))
+    with pytest.raises(FourDFault, match='no such kunde'):
+        FourDClient._parse_response(soap_api.ORDER_SAVE, fault, ['order_id'])